@@ -1,12 +1,21 @@
-from sqladmin import Admin, ModelView
+import asyncio
+from datetime import UTC, datetime, timedelta
+
+from sqladmin import Admin, BaseView, ModelView, action, expose
 from sqladmin.authentication import AuthenticationBackend
+from sqladmin.filters import ForeignKeyFilter
 from starlette.requests import Request
+from starlette.responses import FileResponse, RedirectResponse, Response
 from sqlalchemy import func, select
 
 from config import settings
-from core.security import hash_password, verify_password
+from core import lesson_order, profiling, rollups, tasks, thumbnails
+from core.admin_lists import ScalableModelView
+from core.security import hash_password_async, verify_password_async
 from database import AsyncSessionLocal, engine
-from models import User, Course, Enrollment, Lesson
+from models import (
+    User, Course, CategoryWeeklyStats, Checkpoint, CourseDailyStats, Enrollment, Job, Lesson,
+)
 
 
 # ── Authentication ───────────────────────────────────────────────────────────
@@ -29,7 +38,7 @@ class AdminAuth(AuthenticationBackend):
             )
             user = result.scalars().first()
 
-        if not user or not verify_password(str(password), user.hashed_password):
+        if not user or not await verify_password_async(str(password), user.hashed_password):
             return False
 
         request.session.update({"user_id": user.id})
@@ -44,9 +53,12 @@ class AdminAuth(AuthenticationBackend):
 
 
 # ── Model Views ──────────────────────────────────────────────────────────────
+# Users, lessons and enrollments grow without bound: their list pages use
+# ScalableModelView, and every sortable column there has an index ending in
+# the primary key so keyset paging is a seek.
 
 
-class UserAdmin(ModelView, model=User):
+class UserAdmin(ScalableModelView, model=User):
     name = "User"
     name_plural = "Users"
     icon = "fa-solid fa-user"
@@ -69,7 +81,7 @@ class UserAdmin(ModelView, model=User):
     async def on_model_change(self, data: dict, model: User, is_created: bool, request: Request) -> None:
         """Hash the plain-text password before it reaches the database."""
         if "hashed_password" in data and data["hashed_password"]:
-            data["hashed_password"] = hash_password(data["hashed_password"])
+            data["hashed_password"] = await hash_password_async(data["hashed_password"])
 
 
 class CourseAdmin(ModelView, model=Course):
@@ -79,18 +91,37 @@ class CourseAdmin(ModelView, model=Course):
 
     # List page
     column_list = [
-        Course.id, Course.title, Course.category,
+        Course.id, Course.title, Course.category, Course.language,
         Course.youtube_playlist_id, Course.lesson_count, Course.created_at,
     ]
-    column_searchable_list = [Course.title, Course.category]
-    column_sortable_list = [Course.title, Course.category, Course.created_at]
+    column_searchable_list = [Course.title, Course.category, Course.language]
+    column_sortable_list = [Course.title, Course.category, Course.language, Course.created_at]
     column_default_sort = (Course.created_at, True)
 
     # Forms
-    form_excluded_columns = [Course.id, Course.created_at, Course.updated_at, Course.enrollments, Course.lessons]
+    form_excluded_columns = [
+        Course.id, Course.created_at, Course.updated_at, Course.enrollments, Course.lessons,
+        Course.thumbnail_variants,
+    ]
+
+    async def on_model_change(self, data: dict, model: Course, is_created: bool, request: Request) -> None:
+        """Remember whether the thumbnail URL changed before the form is applied."""
+        request.state.thumbnail_changed = bool(data.get("thumbnail_url")) and (
+            is_created or data["thumbnail_url"] != model.thumbnail_url
+        )
+
+    async def after_model_change(self, data: dict, model: Course, is_created: bool, request: Request) -> None:
+        """Queue thumbnail generation for a new or changed image URL."""
+        if getattr(request.state, "thumbnail_changed", False):
+            async with AsyncSessionLocal() as session:
+                await tasks.request_thumbnails(session, model.id)
+
+    async def after_model_delete(self, model: Course, request: Request) -> None:
+        """Remove the deleted course's thumbnail variants from disk."""
+        await asyncio.to_thread(thumbnails.remove_variants, model.id)
 
 
-class LessonAdmin(ModelView, model=Lesson):
+class LessonAdmin(ScalableModelView, model=Lesson):
     name = "Lesson"
     name_plural = "Lessons"
     icon = "fa-solid fa-play"
@@ -99,14 +130,49 @@ class LessonAdmin(ModelView, model=Lesson):
         Lesson.id, Lesson.position, Lesson.title,
         Lesson.youtube_video_id, Lesson.duration_seconds, Lesson.course_id,
     ]
+    column_filters = [ForeignKeyFilter(Lesson.course_id, Course.title, title="Course")]
     column_searchable_list = [Lesson.title]
-    column_sortable_list = [Lesson.position, Lesson.title, Lesson.course_id]
-    column_default_sort = (Lesson.position, False)
-
-    form_excluded_columns = [Lesson.id, Lesson.created_at]
-
-
-class EnrollmentAdmin(ModelView, model=Enrollment):
+    # Lessons read in course order; (course_id, position, id) is indexed.
+    column_default_sort = [(Lesson.course_id, False), (Lesson.position, False)]
+
+    # Positions are sparse (see core.lesson_order): new lessons go last, and
+    # the Move up / Move down actions reorder selected lessons.
+    form_excluded_columns = [Lesson.id, Lesson.created_at, Lesson.position]
+
+    async def on_model_change(self, data: dict, model: Lesson, is_created: bool, request: Request) -> None:
+        """Append new lessons, and lessons moved to another course, to the end."""
+        course_id = data.get("course")
+        if is_created or (course_id and course_id != model.course_id):
+            async with AsyncSessionLocal() as session:
+                model.position = await lesson_order.next_position(session, course_id)
+
+    @action("move_up", "Move up")
+    async def move_up(self, request: Request) -> Response:
+        return await self._shift(request, -1)
+
+    @action("move_down", "Move down")
+    async def move_down(self, request: Request) -> Response:
+        return await self._shift(request, 1)
+
+    async def _shift(self, request: Request, offset: int) -> Response:
+        lesson_ids = [pk for pk in request.query_params.get("pks", "").split(",") if pk]
+        async with AsyncSessionLocal() as session:
+            try:
+                moved = await lesson_order.shift(session, lesson_ids, offset)
+            except lesson_order.ReorderError:
+                moved = None  # a selection spanning courses: nothing to move
+            if moved is not None:
+                lessons, crowded = moved
+                await session.commit()
+                if crowded:
+                    await tasks.request_rebalance(session, lessons[0].course_id)
+        return RedirectResponse(
+            request.headers.get("referer") or request.url_for("admin:list", identity=self.identity),
+            status_code=303,
+        )
+
+
+class EnrollmentAdmin(ScalableModelView, model=Enrollment):
     name = "Enrollment"
     name_plural = "Enrollments"
     icon = "fa-solid fa-graduation-cap"
@@ -120,6 +186,107 @@ class EnrollmentAdmin(ModelView, model=Enrollment):
     form_excluded_columns = [Enrollment.id, Enrollment.enrolled_at]
 
 
+class JobAdmin(ModelView, model=Job):
+    name = "Job"
+    name_plural = "Jobs"
+    icon = "fa-solid fa-gears"
+
+    # Jobs are created through the queue API; the panel is for inspection.
+    can_create = False
+    can_edit = False
+
+    column_list = [
+        Job.id, Job.kind, Job.status, Job.attempts,
+        Job.run_after, Job.created_at, Job.finished_at,
+    ]
+    column_searchable_list = [Job.kind, Job.dedup_key]
+    column_sortable_list = [Job.kind, Job.status, Job.created_at]
+    column_default_sort = (Job.created_at, True)
+
+
+# ── Custom Views ─────────────────────────────────────────────────────────────
+
+
+class ProfilesView(BaseView):
+    name = "Profiles"
+    icon = "fa-solid fa-stopwatch"
+
+    @expose("/profiles", methods=["GET"], identity="profiles")
+    async def list_profiles(self, request: Request):
+        """List recently captured request profiles, newest first."""
+        return await self.templates.TemplateResponse(
+            request,
+            "admin/profiles.html",
+            {
+                "profiles": profiling.recent_profiles(),
+                "enabled": profiling.is_enabled(),
+                "sample_rate": settings.profiling_sample_rate,
+            },
+        )
+
+    @expose("/profiles/{filename}", methods=["GET"], identity="profile-download")
+    async def show_profile(self, request: Request):
+        """Download a pstats file (open with ``python -m pstats`` or snakeviz)."""
+        path = profiling.resolve(request.path_params["filename"])
+        if path is None:
+            return Response(status_code=404)
+        return FileResponse(path, media_type="application/octet-stream", filename=path.name)
+
+
+class AnalyticsView(BaseView):
+    name = "Analytics"
+    icon = "fa-solid fa-chart-line"
+
+    @expose("/analytics", methods=["GET"], identity="analytics")
+    async def analytics(self, request: Request):
+        """Enrollment and lesson activity, read only from the rollup tables."""
+        today = datetime.now(UTC).date()
+        since_day = today - timedelta(days=29)
+        since_week = today - timedelta(weeks=11, days=today.weekday())
+        totals = (
+            func.sum(CourseDailyStats.enrollments).label("enrollments"),
+            func.sum(CourseDailyStats.lessons_started).label("lessons_started"),
+            func.sum(CourseDailyStats.lessons_completed).label("lessons_completed"),
+        )
+
+        async with AsyncSessionLocal() as session:
+            daily = (await session.execute(
+                select(CourseDailyStats.day, *totals)
+                .where(CourseDailyStats.day >= since_day)
+                .group_by(CourseDailyStats.day)
+                .order_by(CourseDailyStats.day.desc())
+            )).all()
+            top_courses = (await session.execute(
+                select(Course.id, Course.title, *totals)
+                .join(Course, Course.id == CourseDailyStats.course_id)
+                .where(CourseDailyStats.day >= since_day)
+                .group_by(Course.id, Course.title)
+                .order_by(totals[0].desc())
+                .limit(20)
+            )).all()
+            weekly = (await session.execute(
+                select(CategoryWeeklyStats)
+                .where(CategoryWeeklyStats.week_start >= since_week)
+                .order_by(CategoryWeeklyStats.week_start.desc(), CategoryWeeklyStats.enrollments.desc())
+            )).scalars().all()
+            marks = (await session.execute(
+                select(Checkpoint)
+                .where(Checkpoint.name.in_([source[0] for source in rollups.SOURCES]))
+            )).scalars().all()
+
+        return await self.templates.TemplateResponse(
+            request,
+            "admin/analytics.html",
+            {
+                "daily": daily,
+                "top_courses": top_courses,
+                "weekly": weekly,
+                "checkpoints": marks,
+                "since_day": since_day,
+            },
+        )
+
+
 # ── Setup helper ─────────────────────────────────────────────────────────────
 
 
@@ -136,4 +303,7 @@ def setup_admin(app) -> Admin:
     admin.add_view(CourseAdmin)
     admin.add_view(EnrollmentAdmin)
     admin.add_view(LessonAdmin)
+    admin.add_view(JobAdmin)
+    admin.add_view(AnalyticsView)
+    admin.add_view(ProfilesView)
     return admin
@@ -0,0 +1,63 @@
+"""cascade deletes
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 08:02:11.412907
+
+"""
+from itertools import groupby
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, Sequence[str], None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The original foreign keys are unnamed; batch mode names them by this
+# convention when it reflects the table, so they can be dropped.
+NAMING_CONVENTION = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+
+# (table, column, referred table) — every reference to courses, users or lessons.
+FOREIGN_KEYS = [
+    ('course_cooccurrence', 'course_id', 'courses'),
+    ('course_cooccurrence', 'other_course_id', 'courses'),
+    ('course_daily_stats', 'course_id', 'courses'),
+    ('course_recommendations', 'course_id', 'courses'),
+    ('course_recommendations', 'related_course_id', 'courses'),
+    ('enrollments', 'course_id', 'courses'),
+    ('enrollments', 'user_id', 'users'),
+    ('lessons', 'course_id', 'courses'),
+    ('progress_events', 'course_id', 'courses'),
+    ('progress_events', 'lesson_id', 'lessons'),
+    ('progress_events', 'user_id', 'users'),
+]
+
+
+def _recreate_foreign_keys(ondelete: str | None) -> None:
+    for table, keys in groupby(FOREIGN_KEYS, key=lambda fk: fk[0]):
+        with op.batch_alter_table(table, schema=None, naming_convention=NAMING_CONVENTION) as batch_op:
+            for _, column, referred in keys:
+                name = f"fk_{table}_{column}_{referred}"
+                batch_op.drop_constraint(name, type_='foreignkey')
+                batch_op.create_foreign_key(name, referred, [column], ['id'], ondelete=ondelete)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Foreign keys were never enforced before; drop rows left pointing at
+    # deleted parents so enforcement starts from a consistent database.
+    for table, column, referred in FOREIGN_KEYS:
+        op.execute(sa.text(
+            f"DELETE FROM {table} WHERE {column} NOT IN (SELECT id FROM {referred})"
+        ))
+    _recreate_foreign_keys(ondelete='CASCADE')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _recreate_foreign_keys(ondelete=None)
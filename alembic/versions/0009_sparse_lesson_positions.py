@@ -0,0 +1,40 @@
+"""sparse lesson positions
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 08:24:40.118352
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, Sequence[str], None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# models.lesson.POSITION_GAP when this revision was written.
+POSITION_GAP = 1024
+
+RENUMBER = """
+UPDATE lessons SET position = (
+    SELECT ranked.n * {step} FROM (
+        SELECT id, row_number() OVER (PARTITION BY course_id ORDER BY position, id) AS n
+        FROM lessons
+    ) AS ranked
+    WHERE ranked.id = lessons.id
+)
+"""
+
+
+def upgrade() -> None:
+    """Renumber each course's lessons 1, 2, 3, ... -> 1024, 2048, 3072, ..."""
+    op.execute(RENUMBER.format(step=POSITION_GAP))
+
+
+def downgrade() -> None:
+    """Back to dense positions, in the same order."""
+    op.execute(RENUMBER.format(step=1))
@@ -0,0 +1,33 @@
+"""backfill course lesson_count
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19 10:02:13.540211
+
+"""
+from typing import Sequence, Union
+
+from core.backfill import Backfill, run_in_migration
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0010'
+down_revision: Union[str, Sequence[str], None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COUNT_LESSONS = """
+UPDATE courses SET lesson_count = (
+    SELECT count(*) FROM lessons WHERE lessons.course_id = courses.id
+)
+WHERE rowid > :lo AND rowid <= :hi
+"""
+
+
+def upgrade() -> None:
+    """Recount lessons per course; only the seed ever set lesson_count."""
+    run_in_migration(Backfill("course_lesson_count", "courses", COUNT_LESSONS))
+
+
+def downgrade() -> None:
+    """Nothing to undo: the counts are correct under either revision."""
@@ -0,0 +1,37 @@
+"""dedup only queued jobs
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-19 13:05:41.227309
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0012'
+down_revision: Union[str, Sequence[str], None] = '0011'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """A running job no longer blocks queueing a follow-up with its dedup key."""
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.drop_index('uq_jobs_active_dedup_key', sqlite_where=sa.text("status IN ('queued', 'running')"))
+        batch_op.create_index('uq_jobs_queued_dedup_key', ['dedup_key'], unique=True, sqlite_where=sa.text("status = 'queued'"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # A running job and its queued follow-up can't both keep the key.
+    op.execute(
+        "UPDATE jobs SET dedup_key = NULL WHERE status = 'running' "
+        "AND dedup_key IN (SELECT dedup_key FROM jobs WHERE status = 'queued')"
+    )
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.drop_index('uq_jobs_queued_dedup_key', sqlite_where=sa.text("status = 'queued'"))
+        batch_op.create_index('uq_jobs_active_dedup_key', ['dedup_key'], unique=True, sqlite_where=sa.text("status IN ('queued', 'running')"))
@@ -0,0 +1,48 @@
+"""Compare two benchmark JSON reports (e.g. from two commits).
+
+Usage::
+
+    python -m benchmarks.compare baseline.json candidate.json
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+METRICS = ("throughput_rps", "ops_per_s", "p50_ms", "p95_ms", "p99_ms")
+
+
+def _delta(before: float, after: float) -> str:
+    if not before:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.1f}%"
+
+
+def cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    args = parser.parse_args()
+
+    baseline = json.loads(Path(args.baseline).read_text())
+    candidate = json.loads(Path(args.candidate).read_text())
+    print(f"baseline  {baseline['meta'].get('commit')}  {baseline['meta']['timestamp']}")
+    print(f"candidate {candidate['meta'].get('commit')}  {candidate['meta']['timestamp']}")
+    print()
+
+    for name, after in candidate["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"{name}: only in candidate")
+            continue
+        print(name)
+        for metric in METRICS:
+            if metric in after and metric in before:
+                print(
+                    f"  {metric:<15} {before[metric]:>12} → {after[metric]:>12}  "
+                    f"{_delta(before[metric], after[metric])}"
+                )
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,54 @@
+"""Generated benchmark databases at fixed scales.
+
+Databases are built once per scale with the seeding CLI (``seed.generate``)
+under ``benchmarks/.data`` and reused by later runs so that timings do not
+include data generation.
+"""
+
+from pathlib import Path
+
+DATA_DIR = Path(__file__).parent / ".data"
+
+# Every generated user shares this password so login scenarios can succeed.
+BENCH_PASSWORD = "benchmark-password"
+
+# lessons_per_course is the median playlist length.
+SCALES = {
+    "small": {"users": 1_000, "courses": 50, "lessons_per_course": 40, "enrollments": 5_000},
+    "medium": {"users": 50_000, "courses": 1_000, "lessons_per_course": 40, "enrollments": 200_000},
+    "large": {"users": 500_000, "courses": 10_000, "lessons_per_course": 40, "enrollments": 2_000_000},
+}
+
+
+def database_path(scale: str) -> Path:
+    return DATA_DIR / f"{scale}.db"
+
+
+def discard(path: Path) -> None:
+    """Delete the database at *path* along with its ``-wal`` and ``-shm`` files."""
+    for suffix in ("", "-wal", "-shm"):
+        Path(f"{path}{suffix}").unlink(missing_ok=True)
+
+
+def build(scale: str, *, force: bool = False, seed: int = 42) -> Path:
+    """Create (or reuse) the database for *scale* and return its path."""
+    path = database_path(scale)
+    if path.exists() and not force:
+        return path
+
+    import seed as seeding
+
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    discard(path)
+
+    spec = SCALES[scale]
+    seeding.generate(
+        f"sqlite:///{path}",
+        users=spec["users"],
+        courses=spec["courses"],
+        lessons_per_course=spec["lessons_per_course"],
+        enrollments=spec["enrollments"],
+        seed=seed,
+        password=BENCH_PASSWORD,
+    )
+    return path
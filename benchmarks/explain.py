@@ -0,0 +1,285 @@
+"""Query-plan audit: fail when a page or API call falls back to a full table scan.
+
+Usage::
+
+    python -m benchmarks.explain
+    python -m benchmarks.explain --verbose --output benchmarks/results/plans.json
+
+Builds a fresh database from the current models (``seed.generate``), drives
+every web route, admin API endpoint and admin view in-process, records each
+SQL statement they issue and runs ``EXPLAIN QUERY PLAN`` on it. A ``SCAN``
+of a table without an index fails the audit unless that (request, table)
+pair is listed in ``ALLOWED_SCANS`` with the reason. Every foreign key must
+also lead some index: ``ON DELETE CASCADE`` looks children up by it, and
+those lookups never show up in a plan. Exits 1 on failure, so index coverage
+can't regress silently.
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from benchmarks._common import configure_environment, run_metadata, write_report
+
+SCALE = {"users": 2_000, "courses": 60, "lessons_per_course": 20, "enrollments": 8_000}
+PASSWORD = "explain-password"
+
+# (request label, table) -> why reading the whole table is intended.
+ALLOWED_SCANS = {
+    ("GET /", "courses"): "the catalog lists every course",
+    ("GET / (member)", "courses"): "the catalog lists every course",
+    ("GET /admin/user/list?search", "users"): "substring search; counting stops at admin_count_limit",
+    ("GET /admin/lesson/list?search", "lessons"): "substring search; counting stops at admin_count_limit",
+    ("GET /admin/lesson/list", "courses"): "the course filter lists every course",
+    ("GET /admin/lesson/list?course_id", "courses"): "the course filter lists every course",
+    ("GET /admin/lesson/list?search", "courses"): "the course filter lists every course",
+}
+
+_SCAN = re.compile(r"^SCAN (\w+)$")
+_TABLE_REF = re.compile(r"\b(?:FROM|JOIN|UPDATE|INTO)\s+\"?(\w+)\"?(?:\s+AS\s+\"?(\w+)\"?)?", re.I)
+_EXPLAINABLE = ("SELECT", "UPDATE", "DELETE", "INSERT", "WITH")
+
+
+@dataclass
+class Capture:
+    """Statements issued while handling each request, in order."""
+
+    label: str = ""
+    statements: dict[str, list[tuple[str, object]]] = field(default_factory=dict)
+
+    def record(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        if self.label and not executemany and statement.lstrip().upper().startswith(_EXPLAINABLE):
+            self.statements.setdefault(self.label, []).append((statement, parameters))
+
+
+# ── Requests ─────────────────────────────────────────────────────────────────
+
+
+def sample_ids(path: Path) -> dict[str, str]:
+    conn = sqlite3.connect(path)
+    try:
+        course_id, video_id = conn.execute(
+            # The second lesson: positions step by models.lesson.POSITION_GAP.
+            "SELECT course_id, youtube_video_id FROM lessons WHERE position = 2048 LIMIT 1"
+        ).fetchone()
+        lesson_id = conn.execute(
+            "SELECT id FROM lessons WHERE course_id = ? LIMIT 1", (course_id,)
+        ).fetchone()[0]
+        user_id, username = conn.execute("SELECT id, username FROM users LIMIT 1").fetchone()
+        other_course = conn.execute(
+            "SELECT id FROM courses WHERE id != ? LIMIT 1", (course_id,)
+        ).fetchone()[0]
+    finally:
+        conn.close()
+    return {
+        "course_id": course_id, "video_id": video_id, "lesson_id": lesson_id,
+        "user_id": user_id, "username": username, "other_course_id": other_course,
+    }
+
+
+async def drive(app, capture: Capture, ids: dict[str, str]) -> dict[str, int]:
+    """Issue one request per route/view; returns the status code per label."""
+    import httpx
+
+    statuses: dict[str, int] = {}
+    transport = httpx.ASGITransport(app=app)
+    anon = httpx.AsyncClient(transport=transport, base_url="http://explain")
+    member = httpx.AsyncClient(transport=transport, base_url="http://explain")
+
+    async def call(label: str, client, method: str, url: str, **kwargs) -> httpx.Response:
+        capture.label = label
+        try:
+            response = await client.request(method, url, **kwargs)
+        finally:
+            capture.label = ""
+        statuses[label] = response.status_code
+        return response
+
+    c, u = ids["course_id"], ids["user_id"]
+    async with anon, member:
+        await call("POST /signup", member, "POST", "/signup", data={
+            "username": "explain_admin", "email": "explain_admin@example.com",
+            "password": PASSWORD, "confirm_password": PASSWORD,
+        })
+        await call("POST /login", anon, "POST", "/login",
+                   data={"username": ids["username"], "password": PASSWORD})
+        anon.cookies.clear()
+        await call("POST /admin/login", member, "POST", "/admin/login",
+                   data={"username": "explain_admin", "password": PASSWORD})
+
+        await call("GET /", anon, "GET", "/")
+        await call("GET /course/{id}", anon, "GET", f"/course/{c}?v={ids['video_id']}")
+        await call("GET / (member)", member, "GET", "/")
+        await call("GET /course/{id} (member)", member, "GET", f"/course/{c}")
+        await call("POST /course/{id}/enroll", member, "POST", f"/course/{c}/enroll")
+        await call("POST /course/{id}/progress", member, "POST", f"/course/{c}/progress",
+                   json={"lesson_id": ids["lesson_id"], "event": "completed"})
+        await call("GET /account", member, "GET", "/account")
+        await call("GET /api/courses", anon, "GET", "/api/courses?limit=5")
+        await call("GET /api/courses?category&language", anon, "GET", "/api/courses",
+                   params={"category": "Algorithms", "language": "Python", "sort": "recent"})
+
+        await call("GET /api/admin/users", member, "GET", "/api/admin/users?skip=100&limit=50")
+        await call("GET /api/admin/users/{id}", member, "GET", f"/api/admin/users/{u}")
+        await call("GET /api/admin/courses", member, "GET", "/api/admin/courses?skip=10&limit=20")
+        await call("GET /api/admin/courses/{id}", member, "GET", f"/api/admin/courses/{c}")
+        await call("GET /api/admin/courses/{id}?users", member, "GET",
+                   f"/api/admin/courses/{c}?load_enrollments=true")
+        await call("PATCH /api/admin/courses/{id}", member, "PATCH", f"/api/admin/courses/{c}",
+                   json={"description": "Audited."})
+        await call("POST /api/admin/courses/{id}/lessons/reorder", member, "POST",
+                   f"/api/admin/courses/{c}/lessons/reorder", json={"lesson_ids": [ids["lesson_id"]]})
+        await call("GET /api/admin/jobs", member, "GET", "/api/admin/jobs")
+
+        await call("GET /admin/user/list", member, "GET", "/admin/user/list")
+        await call("GET /admin/user/list?search", member, "GET", "/admin/user/list?search=user_00")
+        await call("GET /admin/user/list?sortBy=username", member, "GET",
+                   "/admin/user/list?sortBy=username&sort=asc&page=3")
+        await call("GET /admin/user/details", member, "GET", f"/admin/user/details/{u}")
+        await call("GET /admin/course/list", member, "GET", "/admin/course/list")
+        await call("GET /admin/lesson/list", member, "GET", "/admin/lesson/list?page=4")
+        await call("GET /admin/lesson/list?course_id", member, "GET", f"/admin/lesson/list?course_id={c}")
+        await call("GET /admin/lesson/list?search", member, "GET", "/admin/lesson/list?search=intro")
+        await call("GET /admin/enrollment/list", member, "GET", "/admin/enrollment/list?page=2")
+        await call("GET /admin/job/list", member, "GET", "/admin/job/list")
+        await call("GET /admin/analytics", member, "GET", "/admin/analytics")
+
+        await call("DELETE /api/admin/courses/{id}", member, "DELETE",
+                   f"/api/admin/courses/{ids['other_course_id']}")
+        await call("DELETE /api/admin/users/{id}", member, "DELETE", f"/api/admin/users/{u}")
+    return statuses
+
+
+# ── Plans ────────────────────────────────────────────────────────────────────
+
+
+def full_scans(conn: sqlite3.Connection, statement: str, parameters, tables: set[str]) -> list[str]:
+    """Tables the plan for *statement* reads without an index."""
+    names = {}
+    for table, alias in _TABLE_REF.findall(statement):
+        names[table] = table
+        if alias:
+            names[alias] = table
+    plan = conn.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ()).fetchall()
+    scans = []
+    for *_, detail in plan:
+        match = _SCAN.match(detail)
+        if match and names.get(match[1], match[1]) in tables:
+            scans.append(names.get(match[1], match[1]))
+    return scans
+
+
+def unindexed_foreign_keys(conn: sqlite3.Connection, tables: set[str]) -> list[str]:
+    """``table.column`` of every single-column foreign key no index starts with."""
+    missing = []
+    for table in sorted(tables):
+        leading = {
+            row[1] for row in conn.execute(f"PRAGMA table_info('{table}')") if row[5] == 1
+        }
+        for index in conn.execute(f"PRAGMA index_list('{table}')").fetchall():
+            first = conn.execute(f"PRAGMA index_info('{index[1]}')").fetchone()
+            if first is not None and first[2] is not None:
+                leading.add(first[2])
+        for fk in conn.execute(f"PRAGMA foreign_key_list('{table}')"):
+            if fk[3] not in leading:
+                missing.append(f"{table}.{fk[3]}")
+    return missing
+
+
+def audit(path: Path, capture: Capture) -> dict:
+    conn = sqlite3.connect(path)
+    try:
+        tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        findings = {
+            "schema": [
+                {"sql": f"foreign key {column} has no index", "table": column.split(".")[0]}
+                for column in unindexed_foreign_keys(conn, tables)
+            ]
+        }
+        for label, statements in capture.statements.items():
+            seen = set()
+            for statement, parameters in statements:
+                if statement in seen:
+                    continue
+                seen.add(statement)
+                try:
+                    scans = full_scans(conn, statement, parameters, tables)
+                except sqlite3.Error as exc:
+                    findings.setdefault(label, []).append({"sql": statement, "error": str(exc)})
+                    continue
+                for table in scans:
+                    findings.setdefault(label, []).append({
+                        "sql": " ".join(statement.split()),
+                        "table": table,
+                        "allowed": ALLOWED_SCANS.get((label, table)),
+                    })
+    finally:
+        conn.close()
+    return findings
+
+
+async def main_async(path: Path, capture: Capture) -> dict[str, int]:
+    import main as app_module
+    from database import engine
+    from sqlalchemy import event
+
+    event.listen(engine.sync_engine, "before_cursor_execute", capture.record)
+    async with app_module.app.router.lifespan_context(app_module.app):
+        return await drive(app_module.app, capture, sample_ids(path))
+
+
+def cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--verbose", action="store_true", help="Also print allowed scans.")
+    parser.add_argument("--output", help="Write the JSON report here as well.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "explain.db"
+        configure_environment(f"sqlite+aiosqlite:///{path}")
+        # Plain routers only: no background jobs, no prerendered pages.
+        os.environ["JOBS_ENABLED"] = "false"
+        os.environ["PRERENDER_ENABLED"] = "false"
+        os.environ["ADMISSION_ENABLED"] = "false"
+
+        import seed
+
+        seed.generate(f"sqlite:///{path}", password=PASSWORD, **SCALE)
+        capture = Capture()
+        statuses = asyncio.run(main_async(path, capture))
+        findings = audit(path, capture)
+
+    failed = bool(findings["schema"])
+    print(f"{'FAIL' if failed else 'ok  '} schema  (foreign key indexes)")
+    for finding in findings["schema"]:
+        print(f"     {finding['sql']}")
+    for label, status in statuses.items():
+        problems = [f for f in findings.get(label, []) if not f.get("allowed")]
+        allowed = [f for f in findings.get(label, []) if f.get("allowed")]
+        if status >= 400:
+            problems.append({"sql": f"HTTP {status}", "table": "-"})
+        failed |= bool(problems)
+        marker = "FAIL" if problems else "ok  "
+        print(f"{marker} {label}  ({len(capture.statements.get(label, []))} statements)")
+        for finding in problems:
+            print(f"     full scan of {finding.get('table')}: {finding.get('error') or finding['sql']}")
+        if args.verbose:
+            for finding in allowed:
+                print(f"     allowed scan of {finding['table']} ({finding['allowed']})")
+
+    if args.output:
+        write_report(
+            {"kind": "explain", "meta": run_metadata(scale=SCALE), "statuses": statuses, "findings": findings},
+            args.output,
+        )
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,248 @@
+"""In-process load test: drive scripted scenarios over an ASGI transport.
+
+Usage::
+
+    python -m benchmarks.load --scale small --concurrency 16 --requests 2000
+    python -m benchmarks.load --scale medium --scenario home --scenario course \\
+        --duration 30 --output benchmarks/results/medium.json
+
+The app runs in this process against the generated database for ``--scale``
+(see ``benchmarks.dataset``), so results measure the application stack
+without socket or server overhead.
+"""
+
+import argparse
+import asyncio
+import random
+import shutil
+import sqlite3
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+
+from benchmarks import dataset
+from benchmarks._common import configure_environment, run_metadata, summarize, write_report
+
+
+@dataclass
+class Context:
+    """Ids sampled from the benchmark database for scenarios to request."""
+
+    courses: list[tuple[str, str]]  # (course_id, youtube_video_id)
+    usernames: list[str]
+    user_count: int
+    course_count: int
+    categories: list[str]
+    languages: list[str]
+    run_id: str = field(default_factory=lambda: uuid.uuid4().hex[:8])
+    rng: random.Random = field(default_factory=lambda: random.Random(1234))
+
+
+def load_context(scale: str) -> Context:
+    conn = sqlite3.connect(dataset.database_path(scale))
+    try:
+        courses = conn.execute(
+            "SELECT course_id, youtube_video_id FROM lessons "
+            "WHERE position = 2048 LIMIT 500"  # the second lesson (POSITION_GAP steps)
+        ).fetchall()
+        usernames = [r[0] for r in conn.execute("SELECT username FROM users LIMIT 1000")]
+        user_count = conn.execute("SELECT count(*) FROM users").fetchone()[0]
+        course_count = conn.execute("SELECT count(*) FROM courses").fetchone()[0]
+        categories = [r[0] for r in conn.execute("SELECT DISTINCT category FROM courses WHERE category IS NOT NULL")]
+        languages = [r[0] for r in conn.execute("SELECT DISTINCT language FROM courses WHERE language IS NOT NULL")]
+    finally:
+        conn.close()
+    return Context(courses, usernames, user_count, course_count, categories, languages)
+
+
+# ── Scenarios ────────────────────────────────────────────────────────────────
+# Each scenario issues one request and returns its HTTP status code.
+
+Scenario = Callable[["httpx.AsyncClient", Context, int], Awaitable[int]]
+
+
+async def home(client, ctx: Context, i: int) -> int:
+    return (await client.get("/")).status_code
+
+
+async def course(client, ctx: Context, i: int) -> int:
+    course_id, video_id = ctx.courses[i % len(ctx.courses)]
+    return (await client.get(f"/course/{course_id}", params={"v": video_id})).status_code
+
+
+async def catalog(client, ctx: Context, i: int) -> int:
+    params = {"sort": ("popular", "recent")[i % 2]}
+    if i % 3 and ctx.categories:
+        params["category"] = ctx.rng.choice(ctx.categories)
+    if i % 4 == 1 and ctx.languages:
+        params["language"] = ctx.rng.choice(ctx.languages)
+    return (await client.get("/api/courses", params=params)).status_code
+
+
+async def signup(client, ctx: Context, i: int) -> int:
+    name = f"bench-{ctx.run_id}-{i}"
+    response = await client.post("/signup", data={
+        "username": name,
+        "email": f"{name}@example.com",
+        "password": dataset.BENCH_PASSWORD,
+    })
+    return response.status_code
+
+
+async def login(client, ctx: Context, i: int) -> int:
+    response = await client.post("/login", data={
+        "username": ctx.rng.choice(ctx.usernames),
+        "password": dataset.BENCH_PASSWORD,
+    })
+    return response.status_code
+
+
+async def admin_list(client, ctx: Context, i: int) -> int:
+    limit = 100
+    if i % 2:
+        skip = ctx.rng.randrange(max(ctx.user_count // limit, 1)) * limit
+        response = await client.get("/api/admin/users", params={"skip": skip, "limit": limit})
+    else:
+        skip = ctx.rng.randrange(max(ctx.course_count // limit, 1)) * limit
+        response = await client.get("/api/admin/courses", params={"skip": skip, "limit": limit})
+    return response.status_code
+
+
+async def bulk_writes(client, ctx: Context, i: int) -> int:
+    response = await client.post("/api/admin/courses", json={
+        "title": f"Bench course {ctx.run_id}-{i}",
+        "description": "Created by the bulk write scenario.",
+    })
+    return response.status_code
+
+
+SCENARIOS: dict[str, Scenario] = {
+    "home": home,
+    "course": course,
+    "catalog": catalog,
+    "signup": signup,
+    "login": login,
+    "admin_list": admin_list,
+    "bulk_writes": bulk_writes,
+}
+
+
+# ── Runner ───────────────────────────────────────────────────────────────────
+
+
+async def run_scenario(
+    client,
+    ctx: Context,
+    scenario: Scenario,
+    *,
+    concurrency: int,
+    requests: int,
+    duration: float | None,
+    warmup: int,
+) -> dict:
+    for i in range(warmup):
+        await scenario(client, ctx, -1 - i)
+
+    latencies: list[float] = []
+    errors = 0
+    issued = 0
+    deadline = time.perf_counter() + duration if duration else None
+
+    async def worker() -> None:
+        nonlocal errors, issued
+        while True:
+            if deadline is not None:
+                if time.perf_counter() >= deadline:
+                    return
+            elif issued >= requests:
+                return
+            i = issued
+            issued += 1
+            start = time.perf_counter()
+            try:
+                status = await scenario(client, ctx, i)
+            except Exception:
+                status = 599
+            if status >= 400:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+async def main_async(args: argparse.Namespace) -> dict:
+    import httpx
+
+    import main as app_module
+
+    ctx = load_context(args.scale)
+    results = {}
+    async with app_module.app.router.lifespan_context(app_module.app):
+        transport = httpx.ASGITransport(app=app_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name in args.scenario or list(SCENARIOS):
+                print(f"→ {name} (concurrency={args.concurrency})", flush=True)
+                results[name] = await run_scenario(
+                    client,
+                    ctx,
+                    SCENARIOS[name],
+                    concurrency=args.concurrency,
+                    requests=args.requests,
+                    duration=args.duration,
+                    warmup=args.warmup,
+                )
+                print(
+                    f"  {results[name]['throughput_rps']} req/s  "
+                    f"p50={results[name]['p50_ms']}ms  p95={results[name]['p95_ms']}ms  "
+                    f"p99={results[name]['p99_ms']}ms  errors={results[name]['errors']}",
+                    flush=True,
+                )
+    return results
+
+
+def cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=list(dataset.SCALES), default="small")
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS),
+                        help="Scenario to run (repeatable). Defaults to all.")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=500,
+                        help="Requests per scenario (ignored when --duration is set).")
+    parser.add_argument("--duration", type=float, default=None,
+                        help="Seconds to run each scenario instead of a fixed count.")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Regenerate the benchmark database first.")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout.")
+    args = parser.parse_args()
+
+    # Writes from earlier runs would skew the next one, so every run gets a
+    # fresh copy of the generated database. A journal left next to the old
+    # copy would be replayed onto the new one: remove it too.
+    run_path = dataset.DATA_DIR / f"{args.scale}-run.db"
+    configure_environment(f"sqlite+aiosqlite:///{run_path}")
+    dataset.discard(run_path)
+    shutil.copyfile(dataset.build(args.scale, force=args.rebuild), run_path)
+    results = asyncio.run(main_async(args))
+
+    write_report(
+        {
+            "kind": "load",
+            "meta": run_metadata(
+                scale=args.scale,
+                concurrency=args.concurrency,
+                requests=args.requests,
+                duration=args.duration,
+            ),
+            "results": results,
+        },
+        args.output,
+    )
+
+
+if __name__ == "__main__":
+    cli()
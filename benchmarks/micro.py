@@ -0,0 +1,124 @@
+"""Micro-benchmarks for hot helpers: password hashing, JWT checks, rendering.
+
+Usage::
+
+    python -m benchmarks.micro --output benchmarks/results/micro.json
+    python -m benchmarks.micro --bench render_course --iterations 2000
+"""
+
+import argparse
+import time
+from collections.abc import Callable
+from types import SimpleNamespace
+
+from benchmarks._common import configure_environment, run_metadata, summarize, write_report
+
+
+def _fake_request():
+    """A bare Starlette request that can resolve ``url_for('static', ...)``."""
+    from starlette.requests import Request
+
+    import main
+
+    return Request({
+        "type": "http",
+        "app": main.app,
+        "router": main.app.router,
+        "method": "GET",
+        "scheme": "http",
+        "server": ("bench", 80),
+        "root_path": "",
+        "path": "/",
+        "query_string": b"",
+        "headers": [],
+    })
+
+
+def build_benchmarks() -> dict[str, tuple[Callable[[], object], int]]:
+    """Return ``name -> (callable, default iterations)``."""
+    from core.security import create_access_token, hash_password, verify_access_token, verify_password
+    from core.templating import templates
+    from models import Course, Lesson
+
+    hashed = hash_password("benchmark-password")
+    token = create_access_token({"sub": "00000000-0000-0000-0000-000000000000"})
+
+    request = _fake_request()
+    course = Course(id="c1", title="C Programming", description="Generated course.")
+    lessons = [
+        Lesson(id=f"l{i}", title=f"Lesson {i}", youtube_video_id=f"vid{i:05d}",
+               position=i, duration_seconds=300 + i, course_id="c1")
+        for i in range(1, 41)
+    ]
+    courses = [
+        SimpleNamespace(id=f"c{i}", title=f"C Programming {i}", description="Generated.",
+                        category="Programming Languages")
+        for i in range(50)
+    ]
+    base_template = templates.get_template("base.html")
+    course_template = templates.get_template("course.html")
+
+    def render_home():
+        return base_template.render({"request": request, "user": None, "courses": courses})
+
+    def render_course():
+        return course_template.render({
+            "request": request,
+            "user": None,
+            "course": course,
+            "lessons": lessons,
+            "active_lesson": lessons[0],
+            "active_video_id": lessons[0].youtube_video_id,
+        })
+
+    return {
+        "hash_password": (lambda: hash_password("benchmark-password"), 50),
+        "verify_password": (lambda: verify_password("benchmark-password", hashed), 50),
+        "verify_access_token": (lambda: verify_access_token(token), 20_000),
+        "render_home": (render_home, 2_000),
+        "render_course": (render_course, 2_000),
+    }
+
+
+def time_calls(fn: Callable[[], object], iterations: int, warmup: int) -> dict:
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    result = summarize(latencies, 0, time.perf_counter() - started)
+    result["ops_per_s"] = result.pop("throughput_rps")
+    return result
+
+
+def cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bench", action="append",
+                        help="Benchmark to run (repeatable). Defaults to all.")
+    parser.add_argument("--iterations", type=int, default=None,
+                        help="Override the per-benchmark iteration count.")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout.")
+    args = parser.parse_args()
+
+    configure_environment()
+    benchmarks = build_benchmarks()
+
+    results = {}
+    for name in args.bench or list(benchmarks):
+        fn, iterations = benchmarks[name]
+        results[name] = time_calls(fn, args.iterations or iterations, args.warmup)
+        print(
+            f"{name:<22} {results[name]['ops_per_s']:>12} ops/s  "
+            f"p50={results[name]['p50_ms']}ms  p99={results[name]['p99_ms']}ms",
+            flush=True,
+        )
+
+    write_report({"kind": "micro", "meta": run_metadata(), "results": results}, args.output)
+
+
+if __name__ == "__main__":
+    cli()
@@ -12,5 +12,135 @@ class Settings(BaseSettings):
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
 
+    # Database
+    database_url: str = "sqlite+aiosqlite:///./codeatlas.db"
+    # Logs every statement (through the log queue); for development only
+    database_echo: bool = False
+
+    # HTTP caching: max-age for anonymous catalog/course pages
+    page_cache_max_age: int = 60
+
+    # Serving (python -m serve): 0 workers means one per CPU; a worker is
+    # recycled after about serve_max_requests (+ jitter) requests
+    serve_host: str = "127.0.0.1"
+    serve_port: int = 8000
+    serve_workers: int = 0
+    serve_backlog: int = 2048
+    serve_max_requests: int = 10_000
+    serve_max_requests_jitter: int = 1_000
+    serve_graceful_timeout: float = 30.0
+    serve_memory_report_seconds: float = 60.0
+
+    # Background jobs
+    jobs_enabled: bool = True
+    jobs_workers: int = 4
+    jobs_executor: str = "thread"  # "thread" or "process" for sync handlers
+    jobs_poll_interval: float = 1.0
+    jobs_lease_seconds: int = 300
+    jobs_retry_base_seconds: float = 2.0
+    jobs_retry_max_seconds: float = 600.0
+
+    # Course thumbnails (resizing needs the optional Pillow dependency)
+    thumbnail_widths: list[int] = [160, 320, 640]
+    thumbnail_quality: int = 80
+    thumbnail_max_source_bytes: int = 10 * 1024 * 1024
+    thumbnail_fetcher: str | None = None  # "module:Class" implementing fetch(url) -> bytes
+    # Hosts (and their subdomains) thumbnail URLs may point at; empty allows
+    # any host with a public address. Private addresses are always refused.
+    thumbnail_allowed_hosts: list[str] = []
+
+    # Course recommendations ("learners also took")
+    recommendations_top_k: int = 6
+    recommendations_min_shared: int = 2
+    recommendations_refresh_delay: float = 30.0
+    recommendations_batch_size: int = 10_000
+
+    # Analytics rollups (course/day and category/week)
+    rollups_refresh_delay: float = 60.0
+    rollups_batch_size: int = 50_000
+
+    # Learner dashboard summaries cached per worker (entries, LRU)
+    dashboard_cache_size: int = 10_000
+
+    # Prerendered anonymous home/course pages (see core.prerender)
+    prerender_enabled: bool = True
+    prerender_dir: str = ".run/prerendered"
+    prerender_refresh_delay: float = 10.0
+
+    # Admin list pages: seconds an unfiltered row count is reused, and the most
+    # rows counted for a filtered or searched list (see core.admin_lists)
+    admin_count_cache_seconds: float = 60.0
+    admin_count_limit: int = 10_000
+
+    # Cache invalidation between workers on one host (Unix datagram sockets)
+    invalidation_enabled: bool = True
+    invalidation_dir: str = ".run/invalidation"
+
+    # Group commit (see core.writes): signups, enrollments and progress events
+    # are queued to one writer task per worker and committed in batches of up
+    # to writes_max_batch
+    writes_batching: bool = True
+    writes_max_batch: int = 64
+
+    # Online SQLite backups (see core.backup): a compressed snapshot every
+    # backup_interval_hours, the newest backup_keep kept. The copy advances
+    # backup_pages_per_step pages at a time, pausing between steps for writers.
+    backup_enabled: bool = True
+    backup_dir: str = ".run/backups"
+    backup_interval_hours: float = 24.0
+    backup_keep: int = 7
+    backup_pages_per_step: int = 256
+    backup_step_pause: float = 0.01
+    backup_max_restarts: int = 3
+
+    # Data backfills in migrations (see core.backfill): rows per transaction,
+    # the most of the time a backfill may hold the write lock, and how often
+    # it logs progress
+    backfill_chunk_size: int = 1_000
+    backfill_duty_cycle: float = 0.5
+    backfill_report_seconds: float = 5.0
+
+    # Admission control: concurrent requests per class (see core.admission),
+    # queued requests per slot, and how long a request may wait for a slot.
+    # Writes wait on the group-commit queue, not on a pooled connection.
+    admission_enabled: bool = True
+    admission_limits: dict[str, int] = {"cached": 256, "read": 32, "write": 32, "password": 4}
+    admission_queue_factor: int = 4
+    admission_max_wait: float = 2.0
+    admission_retry_after: float = 2.0
+    # Per-client token bucket on login/signup
+    auth_rate_per_minute: float = 10.0
+    auth_rate_burst: int = 5
+
+    # Observability
+    metrics_enabled: bool = True
+
+    # Logging: JSON lines on stderr, written by a background thread (see
+    # core.log). SQL slower than log_slow_query_ms is logged with its
+    # duration, plus a log_sql_sample_rate share of the rest (0 disables).
+    log_level: str = "INFO"
+    log_format: str = "json"  # "json" or "text"
+    log_queue_size: int = 10_000
+    log_requests: bool = True
+    log_slow_query_ms: float = 100.0
+    log_sql_sample_rate: float = 0.0
+
+    # Request tracing (see core.tracing). Traces slower than tracing_slow_ms or
+    # failing are always kept, a tracing_sample_rate share of the rest; they go
+    # to tracing_file as JSON lines, or to an OTLP/HTTP collector if set.
+    tracing_enabled: bool = False
+    tracing_slow_ms: float = 500.0
+    tracing_sample_rate: float = 0.01
+    tracing_file: str = ".run/traces.jsonl"
+    tracing_otlp_endpoint: str | None = None  # e.g. http://127.0.0.1:4318/v1/traces
+    tracing_max_spans: int = 1000
+    tracing_queue_size: int = 1000
+
+    # Request profiling (off unless a token or sample rate is configured)
+    profiling_token: SecretStr | None = None
+    profiling_sample_rate: float = 0.0
+    profiling_dir: str = "profiles"
+    profiling_keep: int = 200
+
 
 settings = Settings()
@@ -0,0 +1,215 @@
+"""sqladmin list pages that stay fast on very large tables.
+
+Stock ``ModelView.list`` runs an exact ``COUNT(*)`` over the filtered query
+and pages with ``OFFSET``, so page 5 000 reads and discards 500 000 rows.
+:class:`ScalableModelView` instead:
+
+* counts an unfiltered table once per ``admin_count_cache_seconds`` per
+  worker, and a filtered or searched one only up to ``admin_count_limit``
+  rows (the page then shows "of 10000" and keeps paging);
+* learns whether there is a next page by fetching one extra row, so the
+  pager never depends on the count being exact;
+* puts a keyset cursor (the sort key of the last row shown) on the "next"
+  link, so walking forward is an index seek rather than an offset scan.
+  Jumping to an arbitrary page number still uses ``OFFSET``.
+
+Keyset paging needs a deterministic order: the primary key is appended to
+every sort as a tie-breaker, and the sort columns should be covered by an
+index ending in the primary key.
+"""
+
+import base64
+import binascii
+import hashlib
+import json
+import time
+from datetime import date, datetime
+from typing import Any
+
+from sqladmin import ModelView
+from sqladmin.pagination import Pagination
+from sqlalchemy import Select, func, literal, select, tuple_
+from sqlalchemy.orm import selectinload
+from starlette.datastructures import URL
+from starlette.requests import Request
+
+from config import settings
+
+CURSOR_PARAM = "after"
+# Query parameters that move through a result set rather than define it.
+_PAGING_PARAMS = {"page", CURSOR_PARAM}
+
+# View identity -> (monotonic time counted, row count)
+_counts: dict[str, tuple[float, int]] = {}
+
+
+class KeysetPagination(Pagination):
+    """A Pagination whose "next" link carries a keyset cursor."""
+
+    def __init__(self, *args: Any, cursor: str | None = None, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.cursor = cursor
+
+    def add_pagination_urls(self, base_url: URL) -> None:
+        super().add_pagination_urls(base_url.remove_query_params(CURSOR_PARAM))
+        if self.cursor is None:
+            return
+        for control in self.page_controls:
+            if control.number == self.page + 1:
+                control.url = str(URL(control.url).include_query_params(**{CURSOR_PARAM: self.cursor}))
+
+
+class ScalableModelView(ModelView):
+    """ModelView with cached/bounded counts and keyset "next page" links."""
+
+    # ── Ordering ─────────────────────────────────────────────────────────────
+
+    def _ordering(self, request: Request) -> list[tuple[str, bool]]:
+        sort_by = request.query_params.get("sortBy")
+        if sort_by:
+            return [(sort_by, request.query_params.get("sort", "asc") == "desc")]
+        return [(self._get_prop_name(field), is_desc) for field, is_desc in self._get_default_sort()]
+
+    def _keyset_columns(self, request: Request) -> tuple[list, bool] | None:
+        """The full ordering (sort columns + primary key) and its direction.
+
+        None when the ordering can't be expressed as one row-value comparison:
+        mixed directions or a sort through a relationship.
+        """
+        fields = self._ordering(request)
+        directions = {is_desc for _, is_desc in fields}
+        if len(directions) != 1 or any("." in name for name, _ in fields):
+            return None
+        names = [name for name, _ in fields]
+        names += [pk.name for pk in self.pk_columns if pk.name not in names]
+        return [getattr(self.model, name) for name in names], directions.pop()
+
+    def sort_query(self, stmt: Select, request: Request) -> Select:
+        stmt = super().sort_query(stmt, request)
+        fields = self._ordering(request)
+        names = {name for name, _ in fields}
+        is_desc = fields[-1][1]
+        for pk in self.pk_columns:
+            if pk.name not in names:
+                column = getattr(self.model, pk.name)
+                stmt = stmt.order_by(column.desc() if is_desc else column.asc())
+        return stmt
+
+    # ── Cursors ──────────────────────────────────────────────────────────────
+
+    def _signature(self, request: Request, page: int) -> str:
+        """Binds a cursor to the page it leads to and to the current sort/filters."""
+        params = sorted(
+            (key, value) for key, value in request.query_params.multi_items()
+            if key not in _PAGING_PARAMS
+        )
+        raw = json.dumps([self.identity, page, params]).encode()
+        return hashlib.blake2b(raw, digest_size=8).hexdigest()
+
+    def _encode_cursor(self, request: Request, page: int, columns: list, row: Any) -> str | None:
+        values = [getattr(row, column.key) for column in columns]
+        if any(value is None for value in values):
+            return None  # NULLs don't compare; fall back to OFFSET
+        values = [v.isoformat() if isinstance(v, (date, datetime)) else v for v in values]
+        payload = json.dumps({"s": self._signature(request, page), "k": values}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    def _decode_cursor(self, request: Request, page: int, columns: list) -> list | None:
+        """Sort-key values from a valid cursor for *page*, else None."""
+        raw = request.query_params.get(CURSOR_PARAM)
+        if not raw:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(raw + "=" * (-len(raw) % 4)))
+            if payload["s"] != self._signature(request, page) or len(payload["k"]) != len(columns):
+                return None
+            values = []
+            for column, value in zip(columns, payload["k"]):
+                python_type = column.type.python_type
+                if python_type in (date, datetime):
+                    value = python_type.fromisoformat(value)
+                values.append(value)
+            return values
+        except (ValueError, KeyError, TypeError, binascii.Error, NotImplementedError):
+            return None
+
+    # ── Counting ─────────────────────────────────────────────────────────────
+
+    async def _total(self) -> int:
+        """Unfiltered row count, recounted at most every ``admin_count_cache_seconds``."""
+        cached = _counts.get(self.identity)
+        now = time.monotonic()
+        if cached is not None and now - cached[0] < settings.admin_count_cache_seconds:
+            return cached[1]
+        total = (await self._run_query(select(func.count()).select_from(self.model)))[0]
+        _counts[self.identity] = (now, total)
+        return total
+
+    async def _bounded_count(self, stmt: Select) -> int:
+        """Rows matching *stmt*, counting no further than ``admin_count_limit``."""
+        capped = stmt.order_by(None).limit(settings.admin_count_limit).subquery()
+        return (await self._run_query(select(func.count()).select_from(capped)))[0]
+
+    # ── Listing ──────────────────────────────────────────────────────────────
+
+    async def _filtered_query(self, request: Request) -> tuple[Select, bool]:
+        """The list query with filters and search applied, and whether any were."""
+        stmt = self.list_query(request)
+        narrowed = False
+        for filter_ in self.get_filters():
+            value = request.query_params.get(filter_.parameter_name)
+            if not value:
+                continue
+            if getattr(filter_, "has_operator", False):
+                operation = request.query_params.get(f"{filter_.parameter_name}_op")
+                if operation:
+                    stmt = await filter_.get_filtered_query(stmt, operation, value, self.model)
+                    narrowed = True
+            else:
+                stmt = await filter_.get_filtered_query(stmt, value, self.model)
+                narrowed = True
+
+        search = request.query_params.get("search")
+        if search:
+            stmt = self.search_query(stmt=stmt, term=search)
+            narrowed = True
+        return stmt, narrowed
+
+    async def list(self, request: Request) -> Pagination:
+        page = self.validate_page_number(request.query_params.get("page"), 1)
+        page_size = self.validate_page_number(request.query_params.get("pageSize"), 0)
+        page_size = min(page_size or self.page_size, max(self.page_size_options))
+        offset = (page - 1) * page_size
+
+        stmt, narrowed = await self._filtered_query(request)
+        count = await (self._bounded_count(stmt) if narrowed else self._total())
+
+        stmt = self.sort_query(stmt, request)
+        for relation in self._list_relations:
+            stmt = stmt.options(selectinload(relation))
+
+        keyset = self._keyset_columns(request)
+        after = self._decode_cursor(request, page, keyset[0]) if keyset else None
+        if after is not None:
+            columns, is_desc = keyset
+            key = tuple_(*columns)
+            bound = tuple_(*(literal(v, c.type) for c, v in zip(columns, after)))
+            stmt = stmt.where(key < bound if is_desc else key > bound)
+        else:
+            stmt = stmt.offset(offset)
+
+        rows = list(await self._run_query(stmt.limit(page_size + 1)))
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+
+        # The count may be cached or capped; what was just read is exact.
+        if rows:
+            count = max(count, offset + len(rows) + has_more)
+            if not has_more:
+                count = offset + len(rows)
+
+        cursor = None
+        if has_more and keyset is not None:
+            cursor = self._encode_cursor(request, page + 1, keyset[0], rows[-1])
+
+        return KeysetPagination(rows=rows, page=page, page_size=page_size, count=count, cursor=cursor)
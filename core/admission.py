@@ -0,0 +1,186 @@
+"""Admission control: per-class concurrency limits and per-client rate limits.
+
+Every HTTP request is put in a class before it reaches the routers:
+
+* ``read``     – GET/HEAD requests;
+* ``write``    – everything else that touches the database;
+* ``password`` – requests that hash or verify a password (Argon2);
+* ``cached``   – conditional GETs once they are answered with a 304.
+
+A validator header alone doesn't make a request cheap: a stale one gets
+the full page. So conditional GETs are charged to ``read`` like the rest,
+and only when the response starts as a 304 does the middleware move them
+to ``cached`` and hand their read slot on.
+
+Each class has its own concurrency limit and a bounded FIFO wait queue. A
+request that finds the queue full, or is not admitted within
+``admission_max_wait`` seconds, is rejected immediately with 503 and
+``Retry-After`` instead of piling up on the connection pool. A saturated
+class never slows down the others. Login and signup are additionally
+rate-limited per client with a token bucket (429).
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+
+from starlette.types import Scope
+
+from config import settings
+from core import metrics
+
+CACHED = "cached"
+READ = "read"
+WRITE = "write"
+PASSWORD = "password"
+
+# Never limited: assets and monitoring must stay reachable under load.
+_EXEMPT_PREFIXES = ("/static/", "/metrics")
+_PASSWORD_ROUTES = {
+    ("POST", "/login"),
+    ("POST", "/signup"),
+    ("POST", "/admin/login"),
+    ("POST", "/api/admin/users"),
+}
+_RATE_LIMITED_ROUTES = {("POST", "/login"), ("POST", "/signup"), ("POST", "/admin/login")}
+
+ADMISSION_REJECTED = metrics.counter(
+    "codeatlas_admission_rejected_total",
+    "Requests turned away by admission control, by class and reason.",
+    ("class", "reason"),
+)
+ADMISSION_WAIT = metrics.histogram(
+    "codeatlas_admission_wait_seconds",
+    "Time admitted requests spent queued, by class.",
+    ("class",),
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+
+def classify(scope: Scope) -> str | None:
+    """Return the admission class for an HTTP *scope*, or None if exempt."""
+    path = scope["path"]
+    if path.startswith(_EXEMPT_PREFIXES):
+        return None
+    method = scope["method"]
+    if (method, path.rstrip("/") or "/") in _PASSWORD_ROUTES:
+        return PASSWORD
+    if method in ("GET", "HEAD"):
+        return READ
+    return WRITE
+
+
+def is_conditional(scope: Scope) -> bool:
+    """True if the request carries ``If-None-Match`` or ``If-Modified-Since``."""
+    return any(name in (b"if-none-match", b"if-modified-since") for name, _ in scope["headers"])
+
+
+def is_rate_limited_route(scope: Scope) -> bool:
+    return (scope["method"], scope["path"].rstrip("/")) in _RATE_LIMITED_ROUTES
+
+
+# ── Concurrency limits ───────────────────────────────────────────────────────
+
+
+class Limiter:
+    """At most *limit* holders; up to *queue_size* FIFO waiters with a deadline."""
+
+    def __init__(self, name: str, limit: int, queue_size: int, max_wait: float) -> None:
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.active = 0
+        self._waiters: deque[asyncio.Future] = deque()
+
+    async def acquire(self) -> bool:
+        """Take a slot; False if the queue is full or the deadline passes first."""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return True
+        if len(self._waiters) >= self.queue_size:
+            ADMISSION_REJECTED.inc(self.name, "queue_full")
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        start = time.perf_counter()
+        try:
+            async with asyncio.timeout(self.max_wait):
+                await waiter
+        except (TimeoutError, asyncio.CancelledError) as exc:
+            if waiter.done() and not waiter.cancelled():
+                self.release()  # handed a slot just as we gave up: pass it on
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            if isinstance(exc, asyncio.CancelledError):
+                raise
+            ADMISSION_REJECTED.inc(self.name, "timeout")
+            return False
+        ADMISSION_WAIT.observe(time.perf_counter() - start, self.name)
+        return True
+
+    def try_acquire(self) -> bool:
+        """Take a slot only if one is free right now."""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return True
+        return False
+
+    def release(self) -> None:
+        # Hand the slot straight to the oldest live waiter, if any.
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+
+def build_limiters() -> dict[str, Limiter]:
+    return {
+        name: Limiter(
+            name,
+            limit,
+            queue_size=limit * settings.admission_queue_factor,
+            max_wait=settings.admission_max_wait,
+        )
+        for name, limit in settings.admission_limits.items()
+    }
+
+
+# ── Per-client rate limits ───────────────────────────────────────────────────
+
+
+class TokenBucket:
+    """Per-key token buckets: *rate* tokens per second, holding at most *burst*."""
+
+    def __init__(self, rate: float, burst: int, max_keys: int = 100_000) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: dict[str, tuple[float, float]] = {}
+
+    def take(self, key: str) -> float:
+        """Consume a token for *key*; return 0 if allowed, else seconds until one is free."""
+        now = time.monotonic()
+        tokens, last = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+        if tokens < 1:
+            self._buckets[key] = (tokens, now)
+            return (1 - tokens) / self.rate
+        if len(self._buckets) >= self.max_keys and key not in self._buckets:
+            self._prune(now)
+        self._buckets[key] = (tokens - 1, now)
+        return 0.0
+
+    def _prune(self, now: float) -> None:
+        # Buckets that have refilled completely carry no state worth keeping.
+        refill = self.burst / self.rate
+        self._buckets = {k: v for k, v in self._buckets.items() if now - v[1] < refill}
+
+
+def retry_after(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds)))
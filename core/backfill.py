@@ -0,0 +1,153 @@
+"""Chunked, resumable data backfills that don't hold the write lock for long.
+
+A single ``UPDATE big_table SET ...`` holds SQLite's write lock until it has
+rewritten every row, and the app can't write in the meantime. A
+:class:`Backfill` instead walks the table in key order, ``chunk_size`` rows
+at a time. Each chunk is one short ``BEGIN IMMEDIATE`` transaction that
+updates the rows and saves the last key as the ``backfill:<name>``
+checkpoint. Between chunks it sleeps, so it holds the lock for about
+``duty_cycle`` of the time at most. Progress (keys done, rate, ETA) is
+logged every few seconds.
+
+If the run is interrupted, running it again resumes after the last
+committed chunk. The checkpoint is deleted once the table is done.
+
+From an Alembic revision, after any schema change the backfill needs::
+
+    from core.backfill import Backfill, run_in_migration
+
+    def upgrade() -> None:
+        op.add_column("users", sa.Column("username_lower", sa.String(100)))
+        run_in_migration(Backfill(
+            "users_username_lower", "users",
+            "UPDATE users SET username_lower = lower(username) WHERE rowid > :lo AND rowid <= :hi",
+        ))
+
+``run_in_migration`` commits the revision's work so far and runs the chunks
+outside its transaction. A failed or interrupted upgrade leaves the
+revision unapplied, and ``alembic upgrade`` picks the backfill up where it
+stopped. The chunk work must therefore be idempotent, and the revision's
+schema steps must tolerate being repeated (or come in an earlier revision).
+"""
+
+import logging
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import UTC, datetime
+
+from sqlalchemy import Connection, delete, select, text
+from sqlalchemy.dialects.sqlite import insert
+
+from config import settings
+from models import Checkpoint
+
+# Under "alembic" so revisions show progress with alembic.ini's log levels.
+logger = logging.getLogger("alembic.backfill")
+
+ChunkFunc = Callable[[Connection, int, int], None]
+
+
+@dataclass(frozen=True)
+class Backfill:
+    """Rewrite *table* chunk by chunk.
+
+    *work* is SQL run once per chunk with ``:lo`` (exclusive) and ``:hi``
+    (inclusive) bound to the chunk's range of *key*, or a function called as
+    ``work(conn, lo, hi)``. *key* must be an integer column with an index;
+    ``rowid`` always is.
+    """
+
+    name: str
+    table: str
+    work: str | ChunkFunc
+    key: str = "rowid"
+
+    @property
+    def checkpoint(self) -> str:
+        return f"backfill:{self.name}"
+
+
+def _load(conn: Connection, name: str) -> int | None:
+    return conn.execute(select(Checkpoint.value).where(Checkpoint.name == name)).scalar_one_or_none()
+
+
+def _save(conn: Connection, name: str, value: int) -> None:
+    now = datetime.now(UTC)
+    conn.execute(
+        insert(Checkpoint)
+        .values(name=name, value=value, updated_at=now)
+        .on_conflict_do_update(index_elements=[Checkpoint.name], set_={"value": value, "updated_at": now})
+    )
+
+
+def run(
+    conn: Connection,
+    backfill: Backfill,
+    *,
+    chunk_size: int | None = None,
+    duty_cycle: float | None = None,
+) -> int:
+    """Run *backfill* to the end on an autocommit *conn*; returns chunks committed."""
+    chunk_size = chunk_size or settings.backfill_chunk_size
+    duty_cycle = min(max(duty_cycle or settings.backfill_duty_cycle, 0.01), 1.0)
+    table, key = backfill.table, backfill.key
+    begin = "BEGIN IMMEDIATE" if conn.dialect.name == "sqlite" else "BEGIN"
+    next_hi = text(
+        f"SELECT max({key}) FROM (SELECT {key} FROM {table} WHERE {key} > :lo ORDER BY {key} LIMIT :n)"
+    )
+    work = text(backfill.work) if isinstance(backfill.work, str) else None
+
+    first, last = conn.execute(text(f"SELECT min({key}) - 1, max({key}) FROM {table}")).one()
+    first, last = first or 0, last or 0
+    resumed = _load(conn, backfill.checkpoint)
+    lo = start = resumed if resumed is not None else first
+    if resumed is not None:
+        logger.info("Backfill %s: resuming after %s=%d", backfill.name, key, resumed)
+
+    chunks = 0
+    started = reported = time.monotonic()
+    while True:
+        chunk_started = time.monotonic()
+        conn.exec_driver_sql(begin)
+        try:
+            hi = conn.execute(next_hi, {"lo": lo, "n": chunk_size}).scalar()
+            if hi is None:
+                conn.execute(delete(Checkpoint).where(Checkpoint.name == backfill.checkpoint))
+                conn.exec_driver_sql("COMMIT")
+                break
+            if work is not None:
+                conn.execute(work, {"lo": lo, "hi": hi})
+            else:
+                backfill.work(conn, lo, hi)
+            _save(conn, backfill.checkpoint, hi)
+            conn.exec_driver_sql("COMMIT")
+        except BaseException:
+            conn.exec_driver_sql("ROLLBACK")
+            raise
+        chunks += 1
+        lo = hi
+
+        now = time.monotonic()
+        if now - reported >= settings.backfill_report_seconds:
+            reported = now
+            done = (lo - first) / max(last - first, 1)
+            rate = (lo - start) / (now - started)
+            logger.info(
+                "Backfill %s: %.1f%% (%s=%d of %d), %.0f keys/s, about %.0fs left",
+                backfill.name, min(done, 1.0) * 100, key, lo, last, rate,
+                max(last - lo, 0) / rate if rate else 0,
+            )
+        # Hold the lock for at most duty_cycle of the time: writers go between chunks.
+        time.sleep((now - chunk_started) * (1 / duty_cycle - 1))
+
+    logger.info("Backfill %s: done, %d chunk(s) in %.1fs", backfill.name, chunks, time.monotonic() - started)
+    return chunks
+
+
+def run_in_migration(backfill: Backfill, **options) -> int:
+    """Run *backfill* from an Alembic revision, outside the revision's transaction."""
+    from alembic import op
+
+    with op.get_context().autocommit_block():
+        return run(op.get_bind(), backfill, **options)
@@ -0,0 +1,315 @@
+"""Online backups of the SQLite database, and verified restores.
+
+A snapshot is taken with SQLite's online backup API, ``backup_pages_per_step``
+pages at a time, pausing ``backup_step_pause`` seconds between steps. Each
+step holds the source's read lock only briefly, so writers are never held up
+for long. A write from another connection makes SQLite restart the copy;
+after ``backup_max_restarts`` restarts the rest is copied in one step.
+
+The copy is checked (``PRAGMA quick_check``), gzip-compressed and written as
+``codeatlas-<UTC time>.db.gz`` in ``backup_dir``. It has a ``.json``
+manifest next to it, holding the SHA-256 of the database and of the
+archive. The manifest is written last, so a snapshot without one is
+incomplete and ignored. Only the newest ``backup_keep`` snapshots are kept.
+
+The app takes a snapshot every ``backup_interval_hours`` through the
+``backup_database`` job (see ``core.tasks``). From the command line::
+
+    python -m core.backup create
+    python -m core.backup list
+    python -m core.backup verify codeatlas-20260101T000000Z
+    python -m core.backup restore codeatlas-20260101T000000Z [--to path] [--force]
+
+``restore`` checks both checksums and the database's integrity before it
+replaces anything; the file it replaces is kept as ``<path>.pre-restore``.
+Stop the app first.
+"""
+
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import sys
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+
+from sqlalchemy.engine import make_url
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "codeatlas-"
+_CHUNK = 1024 * 1024
+
+
+class BackupError(Exception):
+    """A snapshot could not be taken, or failed verification."""
+
+
+class _Restart(Exception):
+    """Raised from the progress callback to give up on stepping."""
+
+
+def database_path() -> Path:
+    url = make_url(settings.database_url)
+    if not url.drivername.startswith("sqlite") or not url.database or url.database == ":memory:":
+        raise BackupError(f"Backups need a file-backed SQLite database, not {url.drivername}")
+    return Path(url.database)
+
+
+def backup_dir() -> Path:
+    return Path(settings.backup_dir)
+
+
+def _sha256(path: Path, opener=open) -> str:
+    digest = hashlib.sha256()
+    with opener(path, "rb") as f:
+        while chunk := f.read(_CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# ── Snapshots ────────────────────────────────────────────────────────────────
+
+
+def _copy(source: Path, target: Path) -> dict:
+    """Online-copy *source* into *target*; returns pages copied and restarts."""
+    src = sqlite3.connect(f"file:{source}?mode=ro", uri=True)
+    dst = sqlite3.connect(target)
+    last_remaining = None
+    restarts = 0
+    pages = 0
+
+    def progress(status: int, remaining: int, total: int) -> None:
+        nonlocal last_remaining, restarts, pages
+        pages = total
+        if last_remaining is not None and remaining > last_remaining:
+            restarts += 1  # the source changed under us; SQLite started over
+            if restarts > settings.backup_max_restarts:
+                raise _Restart
+        last_remaining = remaining
+        time.sleep(settings.backup_step_pause)  # let writers in between steps
+
+    try:
+        try:
+            src.backup(dst, pages=settings.backup_pages_per_step, progress=progress)
+        except _Restart:
+            src.backup(dst)  # one step: a single short read transaction
+        (result,) = dst.execute("PRAGMA quick_check").fetchone()
+        if result != "ok":
+            raise BackupError(f"Snapshot failed quick_check: {result}")
+    finally:
+        dst.close()
+        src.close()
+    return {"pages": pages, "restarts": restarts}
+
+
+def create_snapshot() -> dict:
+    """Take, check, compress and record one snapshot; then apply retention."""
+    source = database_path()
+    directory = backup_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    created_at = datetime.now(UTC)
+    name = f"{PREFIX}{created_at:%Y%m%dT%H%M%SZ}"
+    raw = directory / f".{name}.db.tmp"
+    archive = directory / f"{name}.db.gz"
+    partial = directory / f".{name}.db.gz.tmp"
+
+    try:
+        copied = _copy(source, raw)
+        digest = hashlib.sha256()
+        with open(raw, "rb") as f, gzip.open(partial, "wb", compresslevel=6) as out:
+            while chunk := f.read(_CHUNK):
+                digest.update(chunk)
+                out.write(chunk)
+        manifest = {
+            "name": name,
+            "created_at": created_at.isoformat(),
+            "source": str(source),
+            "size": raw.stat().st_size,
+            "sha256": digest.hexdigest(),
+            "archive_size": partial.stat().st_size,
+            "archive_sha256": _sha256(partial),
+            **copied,
+        }
+        os.replace(partial, archive)
+        _write_manifest(directory / f"{name}.json", manifest)
+    finally:
+        raw.unlink(missing_ok=True)
+        partial.unlink(missing_ok=True)
+
+    manifest["pruned"] = prune()
+    return manifest
+
+
+def _write_manifest(path: Path, manifest: dict) -> None:
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    os.replace(tmp, path)
+
+
+def snapshots() -> list[dict]:
+    """Manifests of complete snapshots, newest first."""
+    found = []
+    for path in backup_dir().glob(f"{PREFIX}*.json"):
+        try:
+            manifest = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        if (path.parent / f"{manifest['name']}.db.gz").exists():
+            found.append(manifest)
+    return sorted(found, key=lambda m: m["created_at"], reverse=True)
+
+
+def prune() -> list[str]:
+    """Delete all but the newest ``backup_keep`` snapshots; returns their names."""
+    removed = []
+    for manifest in snapshots()[max(settings.backup_keep, 1):]:
+        name = manifest["name"]
+        (backup_dir() / f"{name}.json").unlink(missing_ok=True)
+        (backup_dir() / f"{name}.db.gz").unlink(missing_ok=True)
+        removed.append(name)
+    return removed
+
+
+def seconds_until_due() -> float:
+    """Seconds until the next scheduled snapshot (0 if one is due now)."""
+    newest = next(iter(snapshots()), None)
+    if newest is None:
+        return 0.0
+    age = (datetime.now(UTC) - datetime.fromisoformat(newest["created_at"])).total_seconds()
+    return max(0.0, settings.backup_interval_hours * 3600 - age)
+
+
+# ── Verify / restore ─────────────────────────────────────────────────────────
+
+
+def _manifest(name: str) -> dict:
+    name = name.removesuffix(".json").removesuffix(".db.gz")
+    try:
+        return json.loads((backup_dir() / f"{name}.json").read_text())
+    except (OSError, ValueError) as exc:
+        raise BackupError(f"No usable manifest for snapshot '{name}'") from exc
+
+
+def verify(name: str, extract_to: Path | None = None) -> dict:
+    """Check a snapshot's archive and database checksums and its integrity.
+
+    With *extract_to*, the verified database is left there.
+    """
+    manifest = _manifest(name)
+    archive = backup_dir() / f"{manifest['name']}.db.gz"
+    if _sha256(archive) != manifest["archive_sha256"]:
+        raise BackupError(f"{archive.name}: archive checksum mismatch")
+
+    target = extract_to or backup_dir() / f".{manifest['name']}.verify.tmp"
+    try:
+        digest = hashlib.sha256()
+        with gzip.open(archive, "rb") as f, open(target, "wb") as out:
+            while chunk := f.read(_CHUNK):
+                digest.update(chunk)
+                out.write(chunk)
+        if digest.hexdigest() != manifest["sha256"]:
+            raise BackupError(f"{archive.name}: database checksum mismatch")
+        # Nothing else has the extracted file open: skip locking and the
+        # -wal/-shm files a WAL-mode copy would otherwise leave behind.
+        conn = sqlite3.connect(f"file:{target}?immutable=1", uri=True)
+        try:
+            (result,) = conn.execute("PRAGMA integrity_check").fetchone()
+        finally:
+            conn.close()
+        if result != "ok":
+            raise BackupError(f"{archive.name}: integrity_check failed: {result}")
+    except BaseException:
+        target.unlink(missing_ok=True)
+        raise
+    if extract_to is None:
+        target.unlink(missing_ok=True)
+    return manifest
+
+
+def restore(name: str, target: Path | None = None, *, force: bool = False) -> Path:
+    """Replace *target* (the configured database) with a verified snapshot."""
+    _manifest(name)
+    target = target or database_path()
+    if target.exists() and not force:
+        raise BackupError(f"{target} exists; pass --force to replace it")
+    target.parent.mkdir(parents=True, exist_ok=True)
+    staged = target.with_name(f".{target.name}.restore.tmp")
+    verify(name, extract_to=staged)
+    if target.exists():
+        shutil.copy2(target, target.with_name(f"{target.name}.pre-restore"))
+    # A journal left by the old file would be applied to the restored one.
+    for suffix in ("-journal", "-wal", "-shm"):
+        target.with_name(target.name + suffix).unlink(missing_ok=True)
+    os.replace(staged, target)
+    return target
+
+
+# ── Scheduling ───────────────────────────────────────────────────────────────
+
+
+async def schedule() -> None:
+    """Queue a ``backup_database`` job whenever the newest snapshot is too old.
+
+    Runs in every app worker; the job's dedup key keeps it to one at a time.
+    """
+    from core import tasks
+    from database import AsyncSessionLocal
+
+    try:
+        database_path()
+    except BackupError as exc:
+        logger.warning("Scheduled backups are off: %s", exc)
+        return
+    while True:
+        wait = await asyncio.to_thread(seconds_until_due)
+        if wait:
+            await asyncio.sleep(min(wait, 3600))
+            continue
+        async with AsyncSessionLocal() as db:
+            await tasks.request_backup(db)
+        await asyncio.sleep(settings.backup_interval_hours * 3600 / 2)
+
+
+# ── CLI ──────────────────────────────────────────────────────────────────────
+
+
+def cli() -> None:
+    parser = argparse.ArgumentParser(description="Back up and restore the SQLite database.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("create", help="take a snapshot now")
+    commands.add_parser("list", help="list snapshots, newest first")
+    verify_cmd = commands.add_parser("verify", help="check a snapshot's checksums and integrity")
+    verify_cmd.add_argument("name")
+    restore_cmd = commands.add_parser("restore", help="restore a verified snapshot")
+    restore_cmd.add_argument("name")
+    restore_cmd.add_argument("--to", type=Path, help="restore here instead of DATABASE_URL")
+    restore_cmd.add_argument("--force", action="store_true", help="replace an existing database")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "create":
+            print(json.dumps(create_snapshot(), indent=2))
+        elif args.command == "list":
+            for manifest in snapshots():
+                print(f"{manifest['name']}  {manifest['size']:>12,} bytes  "
+                      f"{manifest['archive_size']:>12,} compressed")
+        elif args.command == "verify":
+            verify(args.name)
+            print(f"{args.name}: ok")
+        else:
+            print(f"Restored {args.name} to {restore(args.name, args.to, force=args.force)}")
+    except BackupError as exc:
+        sys.exit(f"error: {exc}")
+
+
+if __name__ == "__main__":
+    cli()
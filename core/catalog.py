@@ -0,0 +1,69 @@
+from datetime import datetime
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from core import metrics
+from core.invalidation import bus
+from models import Course, CourseRecommendation, Lesson
+
+# (course generation when read, value); see core.invalidation.
+_cached_version: tuple[int, tuple[int, datetime | None]] | None = None
+
+
+async def catalog_version(db: AsyncSession) -> tuple[int, datetime | None]:
+    """Course count and newest ``updated_at``: changes whenever the catalog does.
+
+    Cached per worker until the invalidation bus reports a course change.
+    """
+    global _cached_version
+    generation = bus.generation("course")
+    if _cached_version is not None and _cached_version[0] == generation:
+        metrics.record_cache("catalog_version", hit=True)
+        return _cached_version[1]
+
+    metrics.record_cache("catalog_version", hit=False)
+    result = await db.execute(select(func.count(Course.id), func.max(Course.updated_at)))
+    count, last_modified = result.one()
+    # A change committed while we were querying may not be in this result.
+    if bus.generation("course") == generation:
+        _cached_version = (generation, (count, last_modified))
+    return count, last_modified
+
+
+# ── Page data (shared by the web routes and core.prerender) ─────────────────
+
+
+async def load_courses(db: AsyncSession) -> list[Course]:
+    """Every course, for the catalog on the home page."""
+    result = await db.execute(select(Course))
+    return list(result.scalars().all())
+
+
+async def load_course_page(
+    db: AsyncSession, course_id: str
+) -> tuple[Course, list[Lesson], list[Course]] | None:
+    """A course, its lessons in order and its recommended courses.
+
+    None if the course doesn't exist or has no lessons (nothing to play).
+    """
+    result = await db.execute(
+        select(Course)
+        .where(Course.id == course_id)
+        .options(selectinload(Course.lessons))
+    )
+    course = result.scalars().first()
+    if not course or not course.lessons:
+        return None
+
+    lessons = sorted(course.lessons, key=lambda l: l.position)
+
+    # Precomputed by core.recommendations; one primary-key range scan.
+    result = await db.execute(
+        select(Course)
+        .join(CourseRecommendation, CourseRecommendation.related_course_id == Course.id)
+        .where(CourseRecommendation.course_id == course_id)
+        .order_by(CourseRecommendation.rank)
+    )
+    return course, lessons, list(result.scalars().all())
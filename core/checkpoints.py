@@ -0,0 +1,25 @@
+"""Named high-water marks for incremental jobs, stored in ``checkpoints``."""
+
+from datetime import UTC, datetime
+
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Checkpoint
+
+
+async def load(db: AsyncSession, name: str) -> int:
+    """Return the stored value for *name*, or 0 if it was never saved."""
+    result = await db.execute(select(Checkpoint.value).where(Checkpoint.name == name))
+    return result.scalar_one_or_none() or 0
+
+
+async def save(db: AsyncSession, name: str, value: int) -> None:
+    """Upsert *name*; committed with the caller's transaction."""
+    now = datetime.now(UTC)
+    await db.execute(
+        insert(Checkpoint)
+        .values(name=name, value=value, updated_at=now)
+        .on_conflict_do_update(index_elements=[Checkpoint.name], set_={"value": value, "updated_at": now})
+    )
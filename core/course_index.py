@@ -0,0 +1,242 @@
+"""Per-worker facet index behind the public catalog API (``GET /api/courses``).
+
+Filtering the catalog by category and language, sorting it by popularity or
+recency and counting each facet would take a ``GROUP BY`` over courses and
+enrollments on every request. Instead each worker keeps, for every
+(category, language) pair, its course keys sorted both ways. A page is then
+a bisect into the matching buckets and a merge of at most ``limit`` keys, and
+the facet counts are the bucket sizes. Only the page's course rows are read
+from the database, by primary key.
+
+The index is built once at startup. After that it follows the invalidation
+bus: a ``course`` notice (edits, new lessons and enrollments all send one)
+marks that course dirty, and the next read reloads just the dirty courses.
+``"*"`` notices (bulk statements, cascaded deletes) rebuild it in full.
+"""
+
+import base64
+import binascii
+import heapq
+import json
+import logging
+from bisect import bisect_right, insort
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import islice
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core import metrics
+from core.invalidation import ANY, bus
+from models import Course, Enrollment
+
+logger = logging.getLogger(__name__)
+
+POPULAR = "popular"
+RECENT = "recent"
+SORTS = (POPULAR, RECENT)
+
+# Ids per IN (...) when reloading dirty courses.
+_REFRESH_CHUNK = 500
+
+Key = tuple  # ascending sort key, ending in the course id
+_KEY_LENGTHS = {POPULAR: 3, RECENT: 2}
+
+
+@dataclass(slots=True)
+class Entry:
+    """What the index knows about one course: its facets and sort inputs."""
+
+    id: str
+    category: str | None
+    language: str | None
+    enrollments: int
+    created: float
+
+    def key(self, sort: str) -> Key:
+        # Newest / most enrolled first; the id breaks ties so keys are unique.
+        if sort == POPULAR:
+            return (-self.enrollments, -self.created, self.id)
+        return (-self.created, self.id)
+
+
+def _timestamp(value: datetime | None) -> float:
+    return value.timestamp() if value is not None else 0.0
+
+
+class CourseIndex:
+    def __init__(self) -> None:
+        self._entries: dict[str, Entry] = {}
+        # (category, language) -> sort -> sorted keys
+        self._buckets: dict[tuple[str | None, str | None], dict[str, list[Key]]] = {}
+        self._dirty: set[str] = set()
+        self._stale = True
+        self._rebuilding = False
+
+    # ── Invalidation ─────────────────────────────────────────────────────────
+
+    def invalidate(self, entity: str, key: str) -> None:
+        """Bus subscriber: reload one course next time, or everything for ``"*"``."""
+        if key == ANY:
+            self._stale = True
+        elif entity == "course":
+            self._dirty.add(key)
+
+    async def refresh(self, db: AsyncSession) -> None:
+        """Apply the changes reported since the last read."""
+        if self._stale and not self._rebuilding:
+            self._stale, self._rebuilding = False, True
+            self._dirty.clear()
+            try:
+                await self._rebuild(db)
+            except BaseException:
+                self._stale = True
+                raise
+            finally:
+                self._rebuilding = False
+            metrics.record_cache("course_index", hit=False)
+            return
+        if not self._dirty or self._rebuilding:
+            # While rebuilding, serve the old index; dirty ids wait for the new one.
+            metrics.record_cache("course_index", hit=True)
+            return
+        # Notices arriving while we query land in the fresh set: next read.
+        dirty, self._dirty = list(self._dirty), set()
+        try:
+            for start in range(0, len(dirty), _REFRESH_CHUNK):
+                ids = dirty[start:start + _REFRESH_CHUNK]
+                loaded = {entry.id: entry for entry in await self._load(db, ids)}
+                for course_id in ids:
+                    self._put(course_id, loaded.get(course_id))
+        except BaseException:
+            self._dirty.update(dirty)
+            raise
+        metrics.record_cache("course_index", hit=False)
+
+    async def _load(self, db: AsyncSession, ids: list[str] | None = None) -> list[Entry]:
+        courses = select(Course.id, Course.category, Course.language, Course.created_at)
+        counts = select(Enrollment.course_id, func.count()).group_by(Enrollment.course_id)
+        if ids is not None:
+            courses = courses.where(Course.id.in_(ids))
+            counts = counts.where(Enrollment.course_id.in_(ids))
+        enrollments = dict((await db.execute(counts)).all())
+        return [
+            Entry(id, category, language, enrollments.get(id, 0), _timestamp(created))
+            for id, category, language, created in (await db.execute(courses)).all()
+        ]
+
+    async def _rebuild(self, db: AsyncSession) -> None:
+        entries = await self._load(db)
+        buckets: dict[tuple[str | None, str | None], dict[str, list[Key]]] = {}
+        for entry in entries:
+            bucket = buckets.setdefault((entry.category, entry.language), {sort: [] for sort in SORTS})
+            for sort in SORTS:
+                bucket[sort].append(entry.key(sort))
+        for bucket in buckets.values():
+            for keys in bucket.values():
+                keys.sort()
+        # Swapped in whole, so reads during the rebuild see the old index.
+        self._entries = {entry.id: entry for entry in entries}
+        self._buckets = buckets
+        logger.debug("Course index rebuilt: %d courses, %d buckets", len(entries), len(buckets))
+
+    def _put(self, course_id: str, entry: Entry | None) -> None:
+        """Replace (or, for None, drop) one course's keys."""
+        old = self._entries.pop(course_id, None)
+        if old is not None:
+            facet = (old.category, old.language)
+            bucket = self._buckets[facet]
+            for sort in SORTS:
+                keys = bucket[sort]
+                del keys[bisect_right(keys, old.key(sort)) - 1]
+            if not bucket[RECENT]:
+                del self._buckets[facet]
+        if entry is not None:
+            self._entries[course_id] = entry
+            bucket = self._buckets.setdefault((entry.category, entry.language), {sort: [] for sort in SORTS})
+            for sort in SORTS:
+                insort(bucket[sort], entry.key(sort))
+
+    # ── Reads ────────────────────────────────────────────────────────────────
+
+    def _matching(self, category: str | None, language: str | None):
+        for (bucket_category, bucket_language), bucket in self._buckets.items():
+            if (category is None or bucket_category == category) and (
+                language is None or bucket_language == language
+            ):
+                yield bucket
+
+    def page(
+        self,
+        sort: str,
+        *,
+        category: str | None = None,
+        language: str | None = None,
+        after: Key | None = None,
+        limit: int = 20,
+    ) -> tuple[list[Entry], Key | None]:
+        """Up to *limit* courses after the *after* key, and the key to continue from."""
+        streams = []
+        for bucket in self._matching(category, language):
+            keys = bucket[sort]
+            start = bisect_right(keys, after) if after is not None else 0
+            streams.append(map(keys.__getitem__, range(start, len(keys))))
+        keys = list(islice(heapq.merge(*streams), limit + 1))
+        more = len(keys) > limit
+        keys = keys[:limit]
+        return [self._entries[key[-1]] for key in keys], keys[-1] if more else None
+
+    def facets(self, category: str | None = None, language: str | None = None) -> tuple[int, dict, dict]:
+        """Matching total, and course counts per category and per language.
+
+        Each facet counts under the other facet's filter only, so it lists the
+        alternatives to the current choice. Courses without one aren't counted.
+        """
+        total = 0
+        categories: Counter[str] = Counter()
+        languages: Counter[str] = Counter()
+        for (bucket_category, bucket_language), bucket in self._buckets.items():
+            size = len(bucket[RECENT])
+            in_category = category is None or bucket_category == category
+            in_language = language is None or bucket_language == language
+            if in_category and in_language:
+                total += size
+            if in_language and bucket_category is not None:
+                categories[bucket_category] += size
+            if in_category and bucket_language is not None:
+                languages[bucket_language] += size
+        return total, dict(categories.most_common()), dict(languages.most_common())
+
+
+# ── Cursors ──────────────────────────────────────────────────────────────────
+
+
+def encode_cursor(sort: str, key: Key) -> str:
+    payload = json.dumps({"s": sort, "k": list(key)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(sort: str, raw: str) -> Key:
+    """The key in a cursor made by :func:`encode_cursor` for *sort*; ValueError if not one."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(raw + "=" * (-len(raw) % 4)))
+        *numbers, course_id = key = payload["k"]
+        valid = (
+            payload["s"] == sort
+            and len(key) == _KEY_LENGTHS[sort]
+            and isinstance(course_id, str)
+            and all(isinstance(n, (int, float)) and not isinstance(n, bool) for n in numbers)
+        )
+    except (binascii.Error, ValueError, TypeError, KeyError, AttributeError):
+        valid = False
+    if not valid:
+        raise ValueError("Invalid cursor")
+    return tuple(key)
+
+
+index = CourseIndex()
+bus.subscribe("course", index.invalidate)
+# Enrollment notices name their course too; only bulk ones need handling here.
+bus.subscribe("enrollment", index.invalidate)
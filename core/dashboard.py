@@ -0,0 +1,164 @@
+"""Learner dashboard summary: enrolled courses with progress, cached per user.
+
+The summary is built with one aggregated query and cached per worker until
+the invalidation bus reports a change for that user (enrollments and
+progress events both publish ``("user", <id>)``) or for the content of one
+of the user's courses (course edits and lesson changes publish
+``("course_content", <id>)``, which evicts every cached user enrolled in
+that course; enrollments by other users leave the cache alone).
+"""
+
+import hashlib
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import case, distinct, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from config import settings
+from core import metrics
+from core.invalidation import ANY, bus
+from models import Course, Enrollment, Lesson, ProgressEvent
+from models.progress import PROGRESS_COMPLETED
+
+
+@dataclass(frozen=True)
+class DashboardCourse:
+    id: str
+    title: str
+    lesson_count: int
+    completed_lessons: int
+    enrolled_at: datetime
+    last_lesson_title: str | None
+    last_video_id: str | None
+    last_watched_at: datetime | None
+
+    @property
+    def progress_percent(self) -> int:
+        if not self.lesson_count:
+            return 0
+        return min(100, round(self.completed_lessons * 100 / self.lesson_count))
+
+
+@dataclass(frozen=True)
+class LearnerSummary:
+    courses: tuple[DashboardCourse, ...]
+    enrolled_ids: frozenset[str]
+
+    @property
+    def fingerprint(self) -> str:
+        """Short digest of the enrolled set, for ETags of pages that mark enrollments."""
+        return hashlib.blake2b(",".join(sorted(self.enrolled_ids)).encode(), digest_size=8).hexdigest()
+
+
+EMPTY_SUMMARY = LearnerSummary(courses=(), enrolled_ids=frozenset())
+
+
+async def _load(db: AsyncSession, user_id: str) -> LearnerSummary:
+    progress = (
+        select(
+            ProgressEvent.course_id,
+            func.max(ProgressEvent.id).label("last_event_id"),
+            func.count(distinct(case(
+                (ProgressEvent.event == PROGRESS_COMPLETED, ProgressEvent.lesson_id),
+            ))).label("completed"),
+        )
+        .where(ProgressEvent.user_id == user_id)
+        .group_by(ProgressEvent.course_id)
+        .subquery()
+    )
+    last_event = aliased(ProgressEvent)
+
+    result = await db.execute(
+        select(
+            Course.id,
+            Course.title,
+            Course.lesson_count,
+            func.coalesce(progress.c.completed, 0),
+            Enrollment.enrolled_at,
+            Lesson.title,
+            Lesson.youtube_video_id,
+            last_event.occurred_at,
+        )
+        .select_from(Enrollment)
+        .join(Course, Course.id == Enrollment.course_id)
+        .outerjoin(progress, progress.c.course_id == Enrollment.course_id)
+        .outerjoin(last_event, last_event.id == progress.c.last_event_id)
+        .outerjoin(Lesson, Lesson.id == last_event.lesson_id)
+        .where(Enrollment.user_id == user_id)
+        .order_by(func.coalesce(last_event.occurred_at, Enrollment.enrolled_at).desc())
+    )
+    courses = tuple(DashboardCourse(*row) for row in result)
+    return LearnerSummary(courses=courses, enrolled_ids=frozenset(c.id for c in courses))
+
+
+# ── Cache ────────────────────────────────────────────────────────────────────
+
+_cache: OrderedDict[str, LearnerSummary] = OrderedDict()
+# Loads in flight, each with the courses whose content changed since it
+# started. A user notice drops the entry; a load that lists a changed
+# course (or was dropped) isn't stored.
+_loading: dict[str, set[str]] = {}
+# Course id -> users whose cached summary lists that course.
+_users_by_course: defaultdict[str, set[str]] = defaultdict(set)
+
+
+def _forget(user_id: str) -> None:
+    summary = _cache.pop(user_id, None)
+    if summary is None:
+        return
+    for course_id in summary.enrolled_ids:
+        users = _users_by_course.get(course_id)
+        if users is not None:
+            users.discard(user_id)
+            if not users:
+                del _users_by_course[course_id]
+
+
+def _invalidate(entity: str, key: str) -> None:
+    if key == ANY:
+        _cache.clear()
+        _loading.clear()
+        _users_by_course.clear()
+    elif entity == "user":
+        _forget(key)
+        _loading.pop(key, None)
+    elif entity == "course_content":
+        for user_id in _users_by_course.pop(key, set()):
+            _forget(user_id)
+        for changed in _loading.values():
+            changed.add(key)
+
+
+bus.subscribe("user", _invalidate)
+bus.subscribe("course_content", _invalidate)
+# Bulk statements and cascades only send ("course" | "lesson", "*"); keyed
+# course notices also come from enrollments and are left to course_content.
+bus.subscribe("course", _invalidate)
+bus.subscribe("lesson", _invalidate)
+
+
+async def get_summary(db: AsyncSession, user_id: str) -> LearnerSummary:
+    """The learner's enrolled courses and progress, from cache when current."""
+    summary = _cache.get(user_id)
+    if summary is not None:
+        _cache.move_to_end(user_id)
+        metrics.record_cache("dashboard", hit=True)
+        return summary
+
+    metrics.record_cache("dashboard", hit=False)
+    changed = _loading[user_id] = set()
+    try:
+        summary = await _load(db, user_id)
+    finally:
+        current = _loading.pop(user_id, None) is changed
+    if current and changed.isdisjoint(summary.enrolled_ids):
+        _forget(user_id)
+        _cache[user_id] = summary
+        for course_id in summary.enrolled_ids:
+            _users_by_course[course_id].add(user_id)
+        while len(_cache) > settings.dashboard_cache_size:
+            _forget(next(iter(_cache)))
+    return summary
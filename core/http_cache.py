@@ -0,0 +1,76 @@
+"""HTTP validators (ETag / Last-Modified) and conditional request handling."""
+
+import hashlib
+from datetime import UTC, datetime
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request, Response, status
+
+from config import settings
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes even for timezone-aware columns.
+    return value.replace(tzinfo=UTC) if value.tzinfo is None else value.astimezone(UTC)
+
+
+def make_etag(*parts: object) -> str:
+    """Weak ETag derived from *parts* (ids, ``updated_at`` values, viewer, ...)."""
+    digest = hashlib.blake2b(
+        "\x1f".join("" if p is None else str(p) for p in parts).encode(),
+        digest_size=12,
+    ).hexdigest()
+    return f'W/"{digest}"'
+
+
+def http_date(value: datetime) -> str:
+    return format_datetime(_as_utc(value).replace(microsecond=0), usegmt=True)
+
+
+def is_not_modified(request: Request, etag: str, last_modified: datetime | None) -> bool:
+    """Evaluate ``If-None-Match`` (preferred) or ``If-Modified-Since`` per RFC 9110."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        wanted = etag.removeprefix("W/")
+        return any(
+            tag.strip().removeprefix("W/") == wanted for tag in if_none_match.split(",")
+        )
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return _as_utc(last_modified).replace(microsecond=0) <= _as_utc(since)
+    return False
+
+
+def validator_headers(
+    etag: str,
+    last_modified: datetime | None,
+    *,
+    public: bool,
+) -> dict[str, str]:
+    """ETag, Last-Modified and Cache-Control for a response.
+
+    Public (anonymous) pages may be cached briefly by browsers and proxies;
+    everything else must be revalidated on each use.
+    """
+    headers = {"ETag": etag, "Vary": "Cookie"}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    if public:
+        headers["Cache-Control"] = (
+            f"public, max-age={settings.page_cache_max_age}, "
+            f"stale-while-revalidate={settings.page_cache_max_age * 5}"
+        )
+    else:
+        headers["Cache-Control"] = "private, no-cache"
+    return headers
+
+
+def not_modified(headers: dict[str, str]) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
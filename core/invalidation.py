@@ -0,0 +1,283 @@
+"""Cross-worker cache invalidation bus.
+
+Every committed ORM change is turned into ``(entity, id)`` notices, e.g.
+``("course", "<uuid>")``. They go to local subscribers right away, and as
+one datagram to every other worker on the host. Each worker binds a Unix
+datagram socket in ``settings.invalidation_dir``, so workers started from
+the same directory find each other without any broker.
+
+Caches can either subscribe to notices or compare :meth:`InvalidationBus.generation`
+counters: a value read while the generation was ``g`` is still fresh as long
+as the generation is still ``g``. An id of ``"*"`` means "any row of this
+entity" (bulk ``UPDATE``/``DELETE`` statements).
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+from collections import defaultdict
+from collections.abc import Callable, Iterable
+from pathlib import Path
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from config import settings
+from core import metrics
+from models import Course, Enrollment, Lesson, ProgressEvent, User
+
+logger = logging.getLogger(__name__)
+
+ANY = "*"
+# Linux caps a Unix datagram at roughly the socket send buffer; stay well below.
+_MAX_NOTICES_PER_DATAGRAM = 500
+_MAX_DATAGRAM_BYTES = 256 * 1024
+_SEND_TIMEOUT = 0.05
+_PENDING_KEY = "invalidation_pending"
+
+INVALIDATIONS = metrics.counter(
+    "codeatlas_invalidations_total",
+    "Cache invalidation notices applied, by entity and origin (local/remote).",
+    ("entity", "origin"),
+)
+
+Notice = tuple[str, str]
+Subscriber = Callable[[str, str], None]
+
+
+# ── Mapping ORM changes to notices ───────────────────────────────────────────
+
+
+def _values(obj: object, attr: str) -> set[str]:
+    """Current and previous (pre-flush) values of a column attribute, without loading."""
+    state = inspect(obj)
+    values = {state.dict.get(attr)}
+    values.update(state.attrs[attr].history.deleted or ())
+    return {str(v) for v in values if v is not None}
+
+
+# ``course`` means anything about a course changed, enrollments included;
+# ``course_content`` only the course row itself or its lessons.
+
+
+def _course_notices(obj: Course) -> Iterable[Notice]:
+    yield "course", str(obj.id)
+    yield "course_content", str(obj.id)
+
+
+def _user_notices(obj: User) -> Iterable[Notice]:
+    yield "user", str(obj.id)
+
+
+def _lesson_notices(obj: Lesson) -> Iterable[Notice]:
+    yield "lesson", str(obj.id)
+    for course_id in _values(obj, "course_id"):
+        yield "course", course_id
+        yield "course_content", course_id
+
+
+def _enrollment_notices(obj: Enrollment) -> Iterable[Notice]:
+    yield "enrollment", str(obj.id)
+    for user_id in _values(obj, "user_id"):
+        yield "user", user_id
+    for course_id in _values(obj, "course_id"):
+        yield "course", course_id
+
+
+def _progress_notices(obj: ProgressEvent) -> Iterable[Notice]:
+    yield "progress", str(obj.course_id)
+    yield "user", str(obj.user_id)
+
+
+# Models not listed here (jobs, ...) never feed a cache and publish nothing.
+EXTRACTORS: dict[type, Callable[[object], Iterable[Notice]]] = {
+    Course: _course_notices,
+    User: _user_notices,
+    Lesson: _lesson_notices,
+    Enrollment: _enrollment_notices,
+    ProgressEvent: _progress_notices,
+}
+
+_ENTITY_BY_TABLE = {
+    Course.__tablename__: "course",
+    User.__tablename__: "user",
+    Lesson.__tablename__: "lesson",
+    Enrollment.__tablename__: "enrollment",
+}
+
+# Rows removed by ON DELETE CASCADE never pass through the ORM, so deleting
+# a parent stands in for "any" of the entities that hang off it.
+_CASCADED: dict[str, tuple[Notice, ...]] = {
+    "course": (("lesson", ANY), ("enrollment", ANY), ("progress", ANY), ("user", ANY)),
+    "user": (("enrollment", ANY), ("progress", ANY), ("course", ANY)),
+}
+
+
+# ── Bus ──────────────────────────────────────────────────────────────────────
+
+
+class InvalidationBus:
+    def __init__(self) -> None:
+        self._subscribers: dict[str, list[Subscriber]] = defaultdict(list)
+        self._generations: dict[str, int] = defaultdict(int)
+        self._sock: socket.socket | None = None
+        self._sender: socket.socket | None = None
+        self._path: Path | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    # Local side
+
+    def subscribe(self, entity: str, callback: Subscriber) -> None:
+        """Call ``callback(entity, id)`` for every notice about *entity*."""
+        self._subscribers[entity].append(callback)
+
+    def generation(self, entity: str) -> int:
+        """Counter bumped on every notice about *entity*, local or remote."""
+        return self._generations[entity]
+
+    def _apply(self, notices: Iterable[Notice], origin: str) -> None:
+        for entity, key in notices:
+            self._generations[entity] += 1
+            INVALIDATIONS.inc(entity, origin)
+            for callback in self._subscribers.get(entity, ()):
+                try:
+                    callback(entity, key)
+                except Exception:
+                    logger.exception("Invalidation subscriber failed for %s:%s", entity, key)
+
+    def publish(self, notices: Iterable[Notice]) -> None:
+        """Apply *notices* locally, then broadcast them to the other workers."""
+        notices = sorted(set(notices))
+        if not notices:
+            return
+        self._apply(notices, "local")
+        if settings.invalidation_enabled:
+            self._broadcast(notices)
+
+    # Transport
+
+    @property
+    def directory(self) -> Path:
+        return Path(settings.invalidation_dir)
+
+    def _broadcast(self, notices: list[Notice]) -> None:
+        if not hasattr(socket, "AF_UNIX") or not self.directory.is_dir():
+            return
+        if self._sender is None:
+            self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self._sender.settimeout(_SEND_TIMEOUT)
+
+        datagrams = [
+            json.dumps({"pid": os.getpid(), "n": notices[i:i + _MAX_NOTICES_PER_DATAGRAM]}).encode()
+            for i in range(0, len(notices), _MAX_NOTICES_PER_DATAGRAM)
+        ]
+        for peer in self.directory.glob("*.sock"):
+            if peer == self._path:
+                continue
+            for datagram in datagrams:
+                try:
+                    self._sender.sendto(datagram, str(peer))
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # The worker that owned this socket is gone.
+                    peer.unlink(missing_ok=True)
+                    break
+                except (BlockingIOError, TimeoutError):
+                    # A wedged peer must not stall commits in this worker.
+                    logger.warning("Invalidation queue full for %s; dropping notice", peer.name)
+                    break
+                except OSError as exc:
+                    logger.warning("Invalidation send to %s failed: %s", peer.name, exc)
+                    break
+
+    def start(self) -> None:
+        """Bind this worker's socket and start applying notices from peers."""
+        if self._sock is not None or not settings.invalidation_enabled or not hasattr(socket, "AF_UNIX"):
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._path = self.directory / f"{os.getpid()}.sock"
+        self._path.unlink(missing_ok=True)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.bind(str(self._path))
+        sock.setblocking(False)
+        self._sock = sock
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(sock.fileno(), self._receive)
+
+    def stop(self) -> None:
+        if self._sock is None:
+            return
+        if self._loop is not None:
+            self._loop.remove_reader(self._sock.fileno())
+        self._sock.close()
+        self._sock = None
+        if self._path is not None:
+            self._path.unlink(missing_ok=True)
+            self._path = None
+
+    def _receive(self) -> None:
+        while self._sock is not None:
+            try:
+                data = self._sock.recv(_MAX_DATAGRAM_BYTES)
+            except (BlockingIOError, InterruptedError):
+                return
+            try:
+                message = json.loads(data)
+                notices = [(str(entity), str(key)) for entity, key in message["n"]]
+            except (ValueError, KeyError, TypeError):
+                logger.warning("Ignoring malformed invalidation datagram")
+                continue
+            if message.get("pid") != os.getpid():
+                self._apply(notices, "remote")
+
+
+bus = InvalidationBus()
+
+
+# ── Session hooks ────────────────────────────────────────────────────────────
+
+
+def _pending(session: Session) -> set[Notice]:
+    return session.info.setdefault(_PENDING_KEY, set())
+
+
+@event.listens_for(Session, "after_flush")
+def _collect(session: Session, flush_context) -> None:
+    pending = _pending(session)
+    for obj in (*session.new, *session.deleted):
+        extractor = EXTRACTORS.get(type(obj))
+        if extractor is not None:
+            pending.update(extractor(obj))
+    for obj in session.deleted:
+        pending.update(_CASCADED.get(_ENTITY_BY_TABLE.get(obj.__tablename__), ()))
+    for obj in session.dirty:
+        extractor = EXTRACTORS.get(type(obj))
+        if extractor is not None and session.is_modified(obj, include_collections=False):
+            pending.update(extractor(obj))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk(orm_execute_state) -> None:
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    table = getattr(orm_execute_state.statement, "table", None)
+    entity = _ENTITY_BY_TABLE.get(getattr(table, "name", None))
+    if entity is not None:
+        pending = _pending(orm_execute_state.session)
+        pending.add((entity, ANY))
+        if orm_execute_state.is_delete:
+            pending.update(_CASCADED.get(entity, ()))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish(session: Session) -> None:
+    notices = session.info.pop(_PENDING_KEY, None)
+    if notices:
+        bus.publish(notices)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard(session: Session, previous_transaction) -> None:
+    if not session.in_transaction():
+        session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,382 @@
+"""Durable background jobs backed by the ``jobs`` table.
+
+Handlers register with :func:`job`. Coroutine handlers run on the event loop
+(use them for database work); plain functions run in a thread or process pool
+(``settings.jobs_executor``) so CPU-heavy work never blocks request handling.
+Delivery is at-least-once: a running job's lease is renewed while its
+handler runs, and a job whose worker dies is re-queued once the lease
+expires, so handlers must be idempotent. A runner that lost its lease can't
+record an outcome over the new owner's.
+"""
+
+import asyncio
+import inspect
+import logging
+import os
+import random
+import socket
+import uuid
+from collections.abc import Awaitable, Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from time import perf_counter
+from typing import Any
+
+from sqlalchemy import exists, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from config import settings
+from core import metrics
+from database import AsyncSessionLocal
+from models.job import (
+    JOB_FAILED,
+    JOB_QUEUED,
+    JOB_RUNNING,
+    JOB_SUCCEEDED,
+    Job,
+)
+
+logger = logging.getLogger(__name__)
+
+JobFunc = Callable[[dict[str, Any]], Any] | Callable[[dict[str, Any]], Awaitable[Any]]
+
+JOBS_COMPLETED = metrics.counter(
+    "codeatlas_jobs_total",
+    "Finished background job attempts by kind and outcome.",
+    ("kind", "outcome"),
+)
+JOB_DURATION = metrics.histogram(
+    "codeatlas_job_duration_seconds",
+    "Background job run time by kind.",
+    ("kind",),
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0),
+)
+
+
+# ── Registry ─────────────────────────────────────────────────────────────────
+
+
+@dataclass(frozen=True)
+class JobSpec:
+    kind: str
+    func: JobFunc
+    max_attempts: int
+
+    @property
+    def is_async(self) -> bool:
+        return inspect.iscoroutinefunction(self.func)
+
+
+_registry: dict[str, JobSpec] = {}
+
+
+def job(kind: str, *, max_attempts: int = 5) -> Callable[[JobFunc], JobFunc]:
+    """Register the decorated function as the handler for *kind* jobs.
+
+    The handler receives the job payload dict; its return value (which must be
+    JSON-serialisable) is stored as the job result.
+    """
+
+    def decorator(func: JobFunc) -> JobFunc:
+        _registry[kind] = JobSpec(kind, func, max_attempts)
+        return func
+
+    return decorator
+
+
+def registered_kinds() -> list[str]:
+    return sorted(_registry)
+
+
+# ── Enqueueing ───────────────────────────────────────────────────────────────
+
+
+async def _queued_job(db: AsyncSession, dedup_key: str) -> Job | None:
+    result = await db.execute(
+        select(Job).where(Job.dedup_key == dedup_key, Job.status == JOB_QUEUED)
+    )
+    return result.scalars().first()
+
+
+async def enqueue(
+    db: AsyncSession,
+    kind: str,
+    payload: dict[str, Any] | None = None,
+    *,
+    dedup_key: str | None = None,
+    delay: float = 0.0,
+) -> Job:
+    """Persist a job and wake the dispatcher. Commits *db*.
+
+    With a *dedup_key*, a job with the same key that is still queued is
+    returned instead of creating a second one. A running one is not reused:
+    it may have read its inputs before the change that called us. The new
+    job waits for it instead, as jobs sharing a key never run concurrently.
+    """
+    spec = _registry.get(kind)
+    if spec is None:
+        raise ValueError(f"Unknown job kind '{kind}'")
+
+    if dedup_key:
+        existing = await _queued_job(db, dedup_key)
+        if existing:
+            return existing
+
+    new_job = Job(
+        kind=kind,
+        payload=payload or {},
+        dedup_key=dedup_key,
+        max_attempts=spec.max_attempts,
+        run_after=datetime.now(UTC) + timedelta(seconds=delay),
+    )
+    db.add(new_job)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Lost a race with another enqueue of the same dedup key.
+        await db.rollback()
+        existing = await _queued_job(db, dedup_key) if dedup_key else None
+        if existing is None:
+            raise
+        return existing
+
+    dispatcher.wake()
+    return new_job
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with jitter, capped at ``jobs_retry_max_seconds``."""
+    delay = settings.jobs_retry_base_seconds * 2 ** max(attempts - 1, 0)
+    return min(delay, settings.jobs_retry_max_seconds) * random.uniform(0.8, 1.2)
+
+
+# ── Dispatcher ───────────────────────────────────────────────────────────────
+
+
+class JobDispatcher:
+    """Claims due jobs and runs up to ``jobs_workers`` of them at a time."""
+
+    def __init__(self) -> None:
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._running: set[asyncio.Task] = set()
+        self._executor: Executor | None = None
+        self._stopping = False
+        self._last_recovery = 0.0
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        workers = settings.jobs_workers
+        if settings.jobs_executor == "process":
+            self._executor = ProcessPoolExecutor(max_workers=workers)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._stopping = False
+        self._task = asyncio.create_task(self._run(), name="job-dispatcher")
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wake.set()
+        await self._task
+        self._task = None
+        if self._running:
+            # Unfinished jobs stay "running" and are re-queued after their lease.
+            await asyncio.wait(self._running, timeout=timeout)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await self._recover_expired_leases()
+                free = settings.jobs_workers - len(self._running)
+                claimed = await self._claim(free) if free > 0 else []
+                for claimed_job in claimed:
+                    task = asyncio.create_task(self._execute(claimed_job))
+                    self._running.add(task)
+                    task.add_done_callback(self._finished)
+                if claimed and len(claimed) == free:
+                    continue  # there may be more due jobs waiting
+            except Exception:
+                logger.exception("Job dispatcher poll failed")
+
+            try:
+                await asyncio.wait_for(self._wake.wait(), settings.jobs_poll_interval)
+            except TimeoutError:
+                pass
+            self._wake.clear()
+
+    def _finished(self, task: asyncio.Task) -> None:
+        self._running.discard(task)
+        self._wake.set()
+
+    async def _claim(self, limit: int) -> list[Job]:
+        now = datetime.now(UTC)
+        # A follow-up waits while a job with its dedup key runs, so the two
+        # never work on the same thing at once.
+        twin = aliased(Job)
+        busy = exists().where(twin.dedup_key == Job.dedup_key, twin.status == JOB_RUNNING)
+        due = (
+            select(Job.id)
+            .where(Job.status == JOB_QUEUED, Job.run_after <= now, ~busy)
+            .order_by(Job.run_after)
+            .limit(limit)
+            .scalar_subquery()
+        )
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(Job)
+                .where(Job.id.in_(due), Job.status == JOB_QUEUED)
+                .values(
+                    status=JOB_RUNNING,
+                    locked_by=self.worker_id,
+                    locked_at=now,
+                    attempts=Job.attempts + 1,
+                    updated_at=now,
+                )
+                .returning(Job)
+                .execution_options(synchronize_session=False)
+            )
+            claimed = list(result.scalars())
+            await db.commit()
+        return claimed
+
+    async def _recover_expired_leases(self) -> None:
+        loop_time = asyncio.get_running_loop().time()
+        if loop_time - self._last_recovery < settings.jobs_lease_seconds / 4:
+            return
+        self._last_recovery = loop_time
+        now = datetime.now(UTC)
+        expired = (Job.status == JOB_RUNNING, Job.locked_at < now - timedelta(seconds=settings.jobs_lease_seconds))
+        twin = aliased(Job)
+        has_queued_twin = exists().where(twin.dedup_key == Job.dedup_key, twin.status == JOB_QUEUED)
+        async with AsyncSessionLocal() as db:
+            # A follow-up with the same dedup key is already queued: it does the work.
+            superseded = await db.execute(
+                update(Job)
+                .where(*expired, has_queued_twin)
+                .values(
+                    status=JOB_FAILED, last_error="Lease expired; superseded by a queued job",
+                    locked_by=None, locked_at=None, finished_at=now, updated_at=now,
+                )
+            )
+            result = await db.execute(
+                update(Job)
+                .where(*expired)
+                .values(status=JOB_QUEUED, locked_by=None, locked_at=None, updated_at=now)
+            )
+            await db.commit()
+        if result.rowcount or superseded.rowcount:
+            logger.warning(
+                "Re-queued %d job(s) with expired leases (%d superseded)", result.rowcount, superseded.rowcount
+            )
+
+    async def _renew_lease(self, claimed: Job) -> None:
+        """Keep *claimed*'s lease fresh while its handler runs."""
+        while True:
+            await asyncio.sleep(settings.jobs_lease_seconds / 3)
+            try:
+                async with AsyncSessionLocal() as db:
+                    result = await db.execute(
+                        update(Job)
+                        .where(*self._owned(claimed))
+                        .values(locked_at=datetime.now(UTC))
+                    )
+                    await db.commit()
+            except Exception:
+                logger.exception("Renewing the lease of job %s failed", claimed.id)
+                continue
+            if not result.rowcount:
+                logger.warning("Job %s (%s) lost its lease while running", claimed.id, claimed.kind)
+                return
+
+    def _owned(self, claimed: Job) -> tuple:
+        """Conditions that still hold while this dispatcher owns *claimed*."""
+        return Job.id == claimed.id, Job.status == JOB_RUNNING, Job.locked_by == self.worker_id
+
+    async def _execute(self, claimed: Job) -> None:
+        spec = _registry.get(claimed.kind)
+        start = perf_counter()
+        renewal = asyncio.create_task(self._renew_lease(claimed), name=f"job-lease-{claimed.id}")
+        try:
+            try:
+                if spec is None:
+                    raise LookupError(f"No handler registered for job kind '{claimed.kind}'")
+                if spec.is_async:
+                    outcome = await spec.func(claimed.payload)
+                else:
+                    loop = asyncio.get_running_loop()
+                    outcome = await loop.run_in_executor(self._executor, spec.func, claimed.payload)
+            finally:
+                renewal.cancel()
+        except Exception as exc:
+            JOB_DURATION.observe(perf_counter() - start, claimed.kind)
+            await self._record_failure(claimed, exc)
+        else:
+            JOB_DURATION.observe(perf_counter() - start, claimed.kind)
+            await self._record_success(claimed, outcome)
+
+    async def _finish(self, claimed: Job, **values: Any) -> bool:
+        """Write *claimed*'s outcome unless its lease went to someone else."""
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(update(Job).where(*self._owned(claimed)).values(**values))
+            await db.commit()
+        if not result.rowcount:
+            logger.warning("Job %s (%s) finished after losing its lease; outcome dropped", claimed.id, claimed.kind)
+            JOBS_COMPLETED.inc(claimed.kind, "lease_lost")
+            return False
+        return True
+
+    async def _record_success(self, claimed: Job, outcome: Any) -> None:
+        now = datetime.now(UTC)
+        if await self._finish(
+            claimed,
+            status=JOB_SUCCEEDED,
+            result=outcome,
+            last_error=None,
+            locked_by=None,
+            locked_at=None,
+            finished_at=now,
+            updated_at=now,
+        ):
+            JOBS_COMPLETED.inc(claimed.kind, "succeeded")
+
+    async def _record_failure(self, claimed: Job, exc: Exception) -> None:
+        now = datetime.now(UTC)
+        error = f"{type(exc).__name__}: {exc}"
+        if claimed.attempts >= claimed.max_attempts:
+            values = {"status": JOB_FAILED, "finished_at": now}
+            outcome = "failed"
+            logger.error("Job %s (%s) failed permanently: %s", claimed.id, claimed.kind, error)
+        else:
+            delay = retry_delay(claimed.attempts)
+            values = {"status": JOB_QUEUED, "run_after": now + timedelta(seconds=delay)}
+            outcome = "retried"
+            logger.warning(
+                "Job %s (%s) attempt %d failed, retrying in %.1fs: %s",
+                claimed.id, claimed.kind, claimed.attempts, delay, error,
+            )
+        common = {"last_error": error, "locked_by": None, "locked_at": None, "updated_at": now}
+        try:
+            finished = await self._finish(claimed, **common, **values)
+        except IntegrityError:
+            # A follow-up with the same dedup key was queued meanwhile; it
+            # takes over instead of this retry.
+            finished = await self._finish(claimed, **common, status=JOB_FAILED, finished_at=now)
+            outcome = "superseded"
+        if finished:
+            JOBS_COMPLETED.inc(claimed.kind, outcome)
+
+
+dispatcher = JobDispatcher()
@@ -0,0 +1,175 @@
+"""Lesson order by sparse positions: moving a lesson rewrites only that lesson.
+
+A freshly numbered course has its lessons at ``POSITION_GAP``, ``2 *
+POSITION_GAP``, ... Moving a block of k lessons after another lesson gives
+them evenly spaced positions between that lesson and the next one, so it
+writes k rows however long the playlist is. Appending adds ``POSITION_GAP``
+to the last position; moving to the front subtracts from the first.
+
+Repeated moves into the same spot halve the gap each time. A move that
+leaves less than ``CROWDED_GAP`` between positions queues a
+``rebalance_lessons`` job, which renumbers the course evenly in the
+background. If there is no room at all, the move renumbers the course itself
+before it writes.
+
+Positions only order lessons. Pages number lessons by their index.
+"""
+
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Lesson
+from models.lesson import POSITION_GAP
+
+CROWDED_GAP = 8
+
+
+class ReorderError(ValueError):
+    """The requested move names lessons or a target that can't be used."""
+
+
+async def next_position(db: AsyncSession, course_id: str) -> int:
+    """Position for a lesson appended to *course_id*."""
+    last = await db.scalar(select(func.max(Lesson.position)).where(Lesson.course_id == course_id))
+    return (last or 0) + POSITION_GAP
+
+
+async def _positions(
+    db: AsyncSession, course_id: str, lesson_ids: list[str], after_id: str | None
+) -> tuple[list[int], int] | None:
+    """Positions for *lesson_ids* placed after *after_id* and the step between
+    them, or None if there's no room."""
+    moving = Lesson.id.not_in(lesson_ids)
+    count = len(lesson_ids)
+    if after_id is None:
+        first = await db.scalar(
+            select(Lesson.position)
+            .where(Lesson.course_id == course_id, moving)
+            .order_by(Lesson.position, Lesson.id)
+            .limit(1)
+        )
+        if first is None:
+            return [POSITION_GAP * (i + 1) for i in range(count)], POSITION_GAP
+        return [first - POSITION_GAP * (count - i) for i in range(count)], POSITION_GAP
+
+    low = await db.scalar(
+        select(Lesson.position).where(Lesson.id == after_id, Lesson.course_id == course_id)
+    )
+    if low is None:
+        raise ReorderError(f"Lesson '{after_id}' is not in this course")
+    high = await db.scalar(
+        select(Lesson.position)
+        .where(Lesson.course_id == course_id, Lesson.position > low, moving)
+        .order_by(Lesson.position, Lesson.id)
+        .limit(1)
+    )
+    if high is None:
+        return [low + POSITION_GAP * (i + 1) for i in range(count)], POSITION_GAP
+    step = (high - low) // (count + 1)
+    if step < 1:
+        return None
+    return [low + step * (i + 1) for i in range(count)], step
+
+
+async def move(
+    db: AsyncSession, course_id: str, lesson_ids: list[str], after_id: str | None = None
+) -> tuple[list[Lesson], bool]:
+    """Place *lesson_ids*, in that order, right after *after_id* (None: first).
+
+    Writes only the moved rows, unless the course has to be renumbered first.
+    Returns the moved lessons and whether the course is now crowded (see
+    ``CROWDED_GAP``) and should be rebalanced. Does not commit.
+    """
+    if len(set(lesson_ids)) != len(lesson_ids):
+        raise ReorderError("A lesson is listed more than once")
+    if after_id in lesson_ids:
+        raise ReorderError("Lessons can't be moved after one of themselves")
+
+    result = await db.execute(
+        select(Lesson)
+        .where(Lesson.course_id == course_id, Lesson.id.in_(lesson_ids))
+        .execution_options(populate_existing=True)
+    )
+    lessons = {lesson.id: lesson for lesson in result.scalars()}
+    missing = [lesson_id for lesson_id in lesson_ids if lesson_id not in lessons]
+    if missing:
+        raise ReorderError(f"Lesson '{missing[0]}' is not in this course")
+
+    placed = await _positions(db, course_id, lesson_ids, after_id)
+    if placed is None:
+        await rebalance(db, course_id)
+        placed = await _positions(db, course_id, lesson_ids, after_id)
+    positions, step = placed
+
+    moved = [lessons[lesson_id] for lesson_id in lesson_ids]
+    for lesson, position in zip(moved, positions):
+        lesson.position = position
+    await db.flush()
+    return moved, step < CROWDED_GAP
+
+
+async def shift(db: AsyncSession, lesson_ids: list[str], offset: int) -> tuple[list[Lesson], bool] | None:
+    """Move the given lessons of one course, as a block, one place up (-1) or down (+1).
+
+    Returns what :func:`move` returns, or None if the block is already at that end.
+    """
+    result = await db.execute(
+        select(Lesson).where(Lesson.id.in_(lesson_ids)).order_by(Lesson.position, Lesson.id)
+    )
+    block = list(result.scalars())
+    if not block:
+        return None
+    course_id = block[0].course_id
+    if any(lesson.course_id != course_id for lesson in block):
+        raise ReorderError("Only lessons of one course can be moved together")
+    ids = [lesson.id for lesson in block]
+    others = (Lesson.course_id == course_id, Lesson.id.not_in(ids))
+
+    if offset < 0:
+        before = (await db.execute(
+            select(Lesson.id)
+            .where(*others, Lesson.position < block[0].position)
+            .order_by(Lesson.position.desc(), Lesson.id.desc())
+            .limit(2)
+        )).scalars().all()
+        if not before:
+            return None
+        after_id = before[1] if len(before) == 2 else None
+    else:
+        after_id = await db.scalar(
+            select(Lesson.id)
+            .where(*others, Lesson.position > block[-1].position)
+            .order_by(Lesson.position, Lesson.id)
+            .limit(1)
+        )
+        if after_id is None:
+            return None
+    return await move(db, course_id, ids, after_id)
+
+
+async def rebalance(db: AsyncSession, course_id: str) -> int:
+    """Renumber a course's lessons to ``POSITION_GAP`` steps, keeping their order.
+
+    Returns the number of rows rewritten. Does not commit.
+    """
+    result = await db.execute(
+        select(Lesson.id, Lesson.position)
+        .where(Lesson.course_id == course_id)
+        .order_by(Lesson.position, Lesson.id)
+    )
+    changes = [
+        {"lesson_id": lesson_id, "new_position": POSITION_GAP * (i + 1)}
+        for i, (lesson_id, position) in enumerate(result)
+        if position != POSITION_GAP * (i + 1)
+    ]
+    if changes:
+        # The order is unchanged, so rendered pages are too: a plain
+        # executemany, without the ORM's per-row course touch.
+        table = Lesson.__table__
+        await db.execute(
+            update(table)
+            .where(table.c.id == bindparam("lesson_id"))
+            .values(position=bindparam("new_position")),
+            changes,
+        )
+    return len(changes)
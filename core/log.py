@@ -0,0 +1,215 @@
+"""Structured logging that never writes from the event loop.
+
+``setup()`` points the root logger at a :class:`BoundedQueueHandler`: a call
+like ``logger.info(...)`` only formats the message and puts the record on a
+bounded queue, and a :class:`logging.handlers.QueueListener` thread writes it
+to stderr as one JSON object per line (``log_format = "text"`` for humans).
+If the writer falls behind and the queue fills, records are dropped and
+counted rather than blocking a request.
+
+Every record carries the id of the request it was logged under
+(``request_id``, set by ``RequestLogMiddleware``) and, with tracing on, its
+``trace_id``, so the SQL, job and error lines of one request can be pulled
+out together. SQL is not echoed
+statement by statement: ``instrument_engine`` logs statements slower than
+``log_slow_query_ms`` with their duration, plus a ``log_sql_sample_rate``
+share of the rest.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import UTC, datetime
+from time import perf_counter
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config import settings
+from core import metrics, tracing
+
+REQUEST_ID_HEADER = b"x-request-id"
+_REQUEST_ID = re.compile(rb"[A-Za-z0-9._:-]{1,64}")
+
+request_id: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+LOG_RECORDS_DROPPED = metrics.counter(
+    "codeatlas_log_records_dropped_total",
+    "Log records discarded because the log queue was full.",
+)
+
+sql_logger = logging.getLogger("codeatlas.sql")
+access_logger = logging.getLogger("codeatlas.access")
+
+# Attributes every LogRecord has; anything else was passed through ``extra``.
+_STANDARD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message", "asctime", "request_id", "trace_id",
+}
+
+_handler: "BoundedQueueHandler | None" = None
+_listener: logging.handlers.QueueListener | None = None
+
+
+def new_request_id(supplied: bytes | None) -> str:
+    """The caller's ``X-Request-ID`` if it looks like an id, else a fresh one."""
+    if supplied and _REQUEST_ID.fullmatch(supplied):
+        return supplied.decode()
+    return uuid.uuid4().hex
+
+
+# ── Formatting ───────────────────────────────────────────────────────────────
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message, request id, extras."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, UTC).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        if getattr(record, "trace_id", None):
+            entry["trace_id"] = record.trace_id
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self) -> None:
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        if not hasattr(record, "request_id"):
+            record.request_id = None
+        return super().format(record)
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that stamps the request id and drops records when full."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Runs on the logging thread: resolve everything that can't cross
+        # to the listener (the context variable, args, the traceback object).
+        record = copy.copy(record)
+        record.request_id = request_id.get()
+        record.trace_id = tracing.current_trace_id()
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+
+# ── Setup ────────────────────────────────────────────────────────────────────
+
+
+def _start_listener() -> None:
+    """Give the handler a fresh queue and writer thread."""
+    global _listener
+    if _listener is not None and _listener._thread is not None:
+        return
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(TextFormatter() if settings.log_format == "text" else JsonFormatter())
+    _handler.queue = queue.Queue(maxsize=settings.log_queue_size)
+    _listener = logging.handlers.QueueListener(_handler.queue, output, respect_handler_level=True)
+    _listener.start()
+
+
+def setup() -> None:
+    """Route all logging through the queue; idempotent."""
+    global _handler
+    if _handler is not None:
+        return
+
+    _handler = BoundedQueueHandler(None)
+    _start_listener()
+    atexit.register(shutdown)
+    # Threads don't survive fork(), and one caught mid-write would leave its
+    # locks held in the child: drain and stop the writer around a fork (see
+    # serve.py), then start one on each side.
+    os.register_at_fork(
+        before=shutdown, after_in_parent=_start_listener, after_in_child=_start_listener
+    )
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(_handler)
+    root.setLevel(settings.log_level.upper())
+
+    # uvicorn installs its own synchronous stream handlers; send its records
+    # through the queue instead. Requests are logged by RequestLogMiddleware.
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers.clear()
+        uvicorn_logger.propagate = True
+    logging.getLogger("uvicorn.access").disabled = True
+
+    if settings.database_echo:
+        logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO)
+
+
+def shutdown() -> None:
+    """Write out what is still queued and stop the writer thread."""
+    if _listener is not None and _listener._thread is not None:
+        _listener.stop()
+
+
+# ── SQL ──────────────────────────────────────────────────────────────────────
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Log slow statements, and a sample of the others, with their duration."""
+    slow = settings.log_slow_query_ms / 1000
+    rate = settings.log_sql_sample_rate
+    if slow <= 0 and rate <= 0:
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany) -> None:
+        context._log_started = perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _finish(conn, cursor, statement, parameters, context, executemany) -> None:
+        elapsed = perf_counter() - context._log_started
+        if 0 < slow <= elapsed:
+            level, message = logging.WARNING, "slow query"
+        elif rate > 0 and random.random() < rate:
+            level, message = logging.INFO, "query"
+        else:
+            return
+        # Parameters are left out: they include password hashes and emails.
+        fields = {
+            "duration_ms": round(elapsed * 1000, 2),
+            "statement": " ".join(statement.split())[:2000],
+            "executemany": executemany,
+        }
+        if cursor.rowcount >= 0:  # -1 for SELECTs on SQLite
+            fields["rows"] = cursor.rowcount
+        sql_logger.log(level, message, extra=fields)
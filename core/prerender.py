@@ -0,0 +1,181 @@
+"""Static prerendering of the pages anonymous visitors see.
+
+The home page and every course page look the same to everyone who is not
+signed in, so they are rendered ahead of time into ``settings.prerender_dir``
+(``index.html``, ``course/<id>.html``) and served from there by
+``PrerenderMiddleware`` without touching the routers or the database.
+
+A run is incremental: ``manifest.json`` records the version each page was
+rendered from (the course's ``updated_at`` and newest recommendation; the
+course count and newest ``updated_at`` for the home page), and only pages
+whose version changed are rendered again. Course changes schedule a run
+through the invalidation bus (``PRERENDER_PAGES`` in ``core.tasks``), so a
+page trails an edit by about ``prerender_refresh_delay`` seconds. That is
+within the ``page_cache_max_age`` public pages are cached for anyway. The
+``?v=<video>`` lesson is picked client-side (static/js/main.js).
+
+Run ``python -m core.prerender`` (``--full`` to re-render everything) to
+build the files without the app, e.g. at deploy time.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import tempfile
+from pathlib import Path
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from core.catalog import load_course_page, load_courses
+from core.templating import templates
+from database import AsyncSessionLocal
+from models import Course, CourseRecommendation, Lesson
+
+HOME = "index.html"
+MANIFEST = "manifest.json"
+_COURSE_ID = re.compile(r"[A-Za-z0-9-]{1,64}")
+
+
+def _url_for(name: str, /, **path_params: str) -> str:
+    """Root-relative stand-in for ``request.url_for``; the pages only link static files."""
+    if name != "static":
+        raise ValueError(f"Prerendered pages can't link to route '{name}'")
+    return "/static/" + path_params["path"]
+
+
+def lookup(path: str) -> str | None:
+    """The prerendered file for a request path, relative to the directory, if one exists."""
+    if path == "/":
+        relative = HOME
+    elif path.startswith("/course/") and _COURSE_ID.fullmatch(path[8:]):
+        relative = f"course/{path[8:]}.html"
+    else:
+        return None
+    return relative if (Path(settings.prerender_dir) / relative).is_file() else None
+
+
+# ── Rendering ────────────────────────────────────────────────────────────────
+
+
+def render_home(courses: list[Course]) -> str:
+    return templates.get_template("base.html").render(
+        url_for=_url_for,
+        user=None,
+        courses=courses,
+        courses_by_id={c.id: c for c in courses},
+        enrolled_ids=frozenset(),
+    )
+
+
+def render_course(course: Course, lessons: list[Lesson], related_courses: list[Course]) -> str:
+    return templates.get_template("course.html").render(
+        url_for=_url_for,
+        user=None,
+        course=course,
+        lessons=lessons,
+        active_lesson=lessons[0],
+        active_video_id=lessons[0].youtube_video_id,
+        related_courses=related_courses,
+        is_enrolled=False,
+    )
+
+
+def _write(path: Path, content: str) -> None:
+    # Write-then-rename, so a request never sees a half-written page.
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _read_manifest(root: Path) -> dict:
+    try:
+        return json.loads((root / MANIFEST).read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+# ── Versions ─────────────────────────────────────────────────────────────────
+
+
+async def _versions(db: AsyncSession) -> tuple[str, dict[str, str]]:
+    """Version of the home page and of every course page, as currently stored."""
+    result = await db.execute(
+        select(Course.id, Course.updated_at, func.max(CourseRecommendation.computed_at))
+        .outerjoin(CourseRecommendation, CourseRecommendation.course_id == Course.id)
+        .group_by(Course.id)
+    )
+    courses, newest = {}, None
+    for course_id, updated_at, recommended_at in result:
+        courses[course_id] = f"{updated_at}|{recommended_at}"
+        if updated_at is not None and (newest is None or updated_at > newest):
+            newest = updated_at
+    return f"{len(courses)}|{newest}", courses
+
+
+async def check(db: AsyncSession) -> int:
+    """Number of pages whose prerendered copy is missing or out of date."""
+    root = Path(settings.prerender_dir)
+    manifest = await asyncio.to_thread(_read_manifest, root)
+    home, courses = await _versions(db)
+    rendered = manifest.get("courses", {})
+    stale = sum(rendered.get(course_id) != version for course_id, version in courses.items())
+    stale += len(rendered.keys() - courses.keys())
+    return stale + (manifest.get("home") != home)
+
+
+async def refresh(db: AsyncSession, *, full: bool = False) -> dict:
+    """Render the pages whose version changed and drop pages of deleted courses."""
+    root = Path(settings.prerender_dir)
+    manifest = {} if full else await asyncio.to_thread(_read_manifest, root)
+    previous: dict[str, str] = manifest.get("courses", {})
+    home, courses = await _versions(db)
+
+    rendered = {}
+    for course_id, version in courses.items():
+        path = root / "course" / f"{course_id}.html"
+        if previous.get(course_id) == version:
+            rendered[course_id] = version
+            continue
+        page = await load_course_page(db, course_id)
+        if page is None:
+            # No lessons: the route answers 404, so there is nothing to serve.
+            await asyncio.to_thread(path.unlink, missing_ok=True)
+        else:
+            await asyncio.to_thread(_write, path, render_course(*page))
+        rendered[course_id] = version
+
+    removed = previous.keys() - courses.keys()
+    for course_id in removed:
+        await asyncio.to_thread((root / "course" / f"{course_id}.html").unlink, missing_ok=True)
+
+    home_rendered = manifest.get("home") != home
+    if home_rendered:
+        await asyncio.to_thread(_write, root / HOME, render_home(await load_courses(db)))
+
+    changed = sum(previous.get(course_id) != version for course_id, version in rendered.items())
+    await asyncio.to_thread(
+        _write, root / MANIFEST, json.dumps({"home": home, "courses": rendered}, sort_keys=True)
+    )
+    return {"courses_rendered": changed, "courses_removed": len(removed), "home_rendered": home_rendered}
+
+
+async def _main(full: bool) -> None:
+    async with AsyncSessionLocal() as db:
+        print(await refresh(db, full=full))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prerender the anonymous home and course pages.")
+    parser.add_argument("--full", action="store_true", help="re-render every page")
+    asyncio.run(_main(parser.parse_args().full))
@@ -0,0 +1,135 @@
+"""On-demand cProfile capture for individual requests.
+
+Profiles are written to ``settings.profiling_dir`` as ``<stem>.pstats`` with a
+``<stem>.json`` sidecar describing the request, and the oldest files are pruned
+once ``settings.profiling_keep`` is exceeded.
+"""
+
+import cProfile
+import hmac
+import json
+import random
+import re
+import threading
+from dataclasses import asdict, dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+
+from config import settings
+
+PROFILE_HEADER = b"x-profile-token"
+
+# cProfile hooks the whole interpreter thread, so only one request can be
+# profiled at a time; concurrent candidates are simply not profiled.
+_active = threading.Lock()
+
+
+@dataclass
+class ProfileRecord:
+    stem: str
+    method: str
+    path: str
+    route: str
+    status: int
+    total_ms: float
+    created_at: str
+
+    @property
+    def filename(self) -> str:
+        return f"{self.stem}.pstats"
+
+
+def profile_dir() -> Path:
+    return Path(settings.profiling_dir)
+
+
+def is_enabled() -> bool:
+    return settings.profiling_sample_rate > 0 or settings.profiling_token is not None
+
+
+def should_profile(supplied_token: bytes | None) -> bool:
+    """Profile when the request carries the admin token or wins the sample draw."""
+    token = settings.profiling_token
+    if token is not None and supplied_token:
+        return hmac.compare_digest(supplied_token, token.get_secret_value().encode())
+    rate = settings.profiling_sample_rate
+    return rate > 0 and random.random() < rate
+
+
+def try_start() -> cProfile.Profile | None:
+    """Start a profiler, or return None if another request is being profiled."""
+    if not _active.acquire(blocking=False):
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiling tool (e.g. a debugger) owns the hook.
+        _active.release()
+        return None
+    return profiler
+
+
+def stop(profiler: cProfile.Profile) -> None:
+    profiler.disable()
+    _active.release()
+
+
+def save(
+    profiler: cProfile.Profile,
+    *,
+    method: str,
+    path: str,
+    route: str,
+    status: int,
+    total_ms: float,
+) -> ProfileRecord:
+    """Write the pstats dump and its sidecar, then prune old profiles. Blocking."""
+    now = datetime.now(UTC)
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", route).strip("-") or "root"
+    record = ProfileRecord(
+        stem=f"{now:%Y%m%dT%H%M%S%f}-{method.lower()}-{slug}",
+        method=method,
+        path=path,
+        route=route,
+        status=status,
+        total_ms=round(total_ms, 2),
+        created_at=now.isoformat(),
+    )
+
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    profiler.dump_stats(directory / record.filename)
+    (directory / f"{record.stem}.json").write_text(json.dumps(asdict(record)))
+
+    _prune(directory)
+    return record
+
+
+def _prune(directory: Path) -> None:
+    sidecars = sorted(directory.glob("*.json"))
+    for sidecar in sidecars[: max(len(sidecars) - settings.profiling_keep, 0)]:
+        sidecar.with_suffix(".pstats").unlink(missing_ok=True)
+        sidecar.unlink(missing_ok=True)
+
+
+def recent_profiles(limit: int = 100) -> list[ProfileRecord]:
+    """Return the newest profiles first."""
+    directory = profile_dir()
+    if not directory.is_dir():
+        return []
+    records = []
+    for sidecar in sorted(directory.glob("*.json"), reverse=True)[:limit]:
+        try:
+            records.append(ProfileRecord(**json.loads(sidecar.read_text())))
+        except (OSError, ValueError, TypeError):
+            continue
+    return records
+
+
+def resolve(filename: str) -> Path | None:
+    """Map a requested download name to a file inside the profile directory."""
+    if not re.fullmatch(r"[A-Za-z0-9-]+\.pstats", filename):
+        return None
+    path = profile_dir() / filename
+    return path if path.is_file() else None
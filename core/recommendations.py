@@ -0,0 +1,148 @@
+"""Course recommendations ("learners also took") from co-enrollment.
+
+The course × course co-occurrence matrix (``enrollments`` Aᵀ·A) is kept
+sparse in ``course_cooccurrence`` and updated incrementally: each refresh
+folds in only enrollments past the ``recommendations`` checkpoint (by
+rowid), counting every pair of a learner's enrollments exactly once, when
+the later of the two arrives. Courses touched by the delta are re-ranked by
+cosine similarity, ``shared / sqrt(n_a * n_b)``, and their top-K neighbours
+written to ``course_recommendations`` for a single indexed read per page.
+
+Deleted enrollments are not subtracted (nor are rows that reuse the rowid
+of a deleted newest enrollment); a ``full`` refresh rebuilds from scratch.
+"""
+
+import heapq
+import math
+from collections import defaultdict
+from collections.abc import Iterable
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from config import settings
+from core import checkpoints
+from models import CourseCooccurrence, CourseRecommendation
+
+CHECKPOINT = "recommendations"
+_CHUNK = 500  # ids per IN (...) list
+
+# Pairs (a, b) contributed by enrollments with rowid in (lo, hi]. A new
+# enrollment pairs with every earlier enrollment of the same learner,
+# including itself, which feeds the diagonal (per-course learner count).
+_DELTA_SQL = text("""
+    SELECT a, b, count(*) FROM (
+        SELECT n.course_id AS a, o.course_id AS b
+        FROM enrollments n
+        JOIN enrollments o ON o.user_id = n.user_id AND o.rowid <= n.rowid
+        WHERE n.rowid > :lo AND n.rowid <= :hi
+        UNION ALL
+        SELECT o.course_id, n.course_id
+        FROM enrollments n
+        JOIN enrollments o ON o.user_id = n.user_id AND o.rowid < n.rowid
+        WHERE n.rowid > :lo AND n.rowid <= :hi
+    )
+    GROUP BY a, b
+""")
+
+
+def _chunks(ids: Iterable[str]) -> Iterable[list[str]]:
+    ids = sorted(ids)
+    for i in range(0, len(ids), _CHUNK):
+        yield ids[i:i + _CHUNK]
+
+
+async def _fold(db: AsyncSession, lo: int, hi: int) -> set[str]:
+    """Add the pairs from enrollments in (lo, hi]; return the affected course ids."""
+    rows = (await db.execute(_DELTA_SQL, {"lo": lo, "hi": hi})).all()
+    if not rows:
+        return set()
+    stmt = insert(CourseCooccurrence)
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[CourseCooccurrence.course_id, CourseCooccurrence.other_course_id],
+            set_={"shared": CourseCooccurrence.shared + stmt.excluded.shared},
+        ),
+        [{"course_id": a, "other_course_id": b, "shared": n} for a, b, n in rows],
+    )
+    return {a for a, _, _ in rows}
+
+
+async def _rank(db: AsyncSession, course_ids: Iterable[str]) -> None:
+    """Rewrite the top-K neighbours of *course_ids*."""
+    pair = aliased(CourseCooccurrence)
+    own = aliased(CourseCooccurrence)
+    other = aliased(CourseCooccurrence)
+    top_k = settings.recommendations_top_k
+
+    for chunk in _chunks(course_ids):
+        result = await db.execute(
+            select(pair.course_id, pair.other_course_id, pair.shared, own.shared, other.shared)
+            .join(own, (own.course_id == pair.course_id) & (own.other_course_id == pair.course_id))
+            .join(other, (other.course_id == pair.other_course_id)
+                  & (other.other_course_id == pair.other_course_id))
+            .where(
+                pair.course_id.in_(chunk),
+                pair.other_course_id != pair.course_id,
+                pair.shared >= settings.recommendations_min_shared,
+            )
+        )
+        candidates: dict[str, list[tuple[float, int, str]]] = defaultdict(list)
+        for course_id, related_id, shared, n_course, n_related in result:
+            score = shared / math.sqrt(n_course * n_related)
+            candidates[course_id].append((score, shared, related_id))
+
+        await db.execute(delete(CourseRecommendation).where(CourseRecommendation.course_id.in_(chunk)))
+        rows = [
+            {
+                "course_id": course_id,
+                "rank": rank,
+                "related_course_id": related_id,
+                "score": round(score, 6),
+                "shared": shared,
+            }
+            for course_id, scored in candidates.items()
+            for rank, (score, shared, related_id) in enumerate(
+                heapq.nlargest(top_k, scored), start=1
+            )
+        ]
+        if rows:
+            await db.execute(insert(CourseRecommendation), rows)
+
+
+async def refresh(db: AsyncSession, *, full: bool = False) -> dict:
+    """Fold new enrollments into the matrix and re-rank affected courses.
+
+    Incremental runs commit after every ``recommendations_batch_size``
+    enrollments, together with the checkpoint. A full run starts over and
+    ranks every course once at the end.
+    """
+    if full:
+        await db.execute(delete(CourseRecommendation))
+        await db.execute(delete(CourseCooccurrence))
+        await checkpoints.save(db, CHECKPOINT, 0)
+        await db.commit()
+
+    lo = await checkpoints.load(db, CHECKPOINT)
+    hi = (await db.execute(text("SELECT max(rowid) FROM enrollments"))).scalar() or 0
+    start, ranked = lo, set()
+
+    while lo < hi:
+        upper = min(lo + settings.recommendations_batch_size, hi)
+        affected = await _fold(db, lo, upper)
+        if not full:
+            await _rank(db, affected)
+            ranked |= affected
+        await checkpoints.save(db, CHECKPOINT, upper)
+        await db.commit()
+        lo = upper
+
+    if full:
+        result = await db.execute(select(func.distinct(CourseCooccurrence.course_id)))
+        ranked = set(result.scalars())
+        await _rank(db, ranked)
+        await db.commit()
+
+    return {"checkpoint": max(hi, start), "courses_ranked": len(ranked)}
@@ -0,0 +1,86 @@
+"""Incremental analytics rollups over enrollments and progress events.
+
+Each source table is folded into ``course_daily_stats`` and
+``category_weekly_stats`` past its own checkpoint (``enrollments`` by rowid,
+``progress_events`` by id), one batch per transaction together with the
+checkpoint, so every row is counted exactly once even if a run dies. A
+first run against an existing database is simply a catch-up from zero; a
+``rebuild`` clears the rollups and starts over.
+"""
+
+from sqlalchemy import delete, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from core import checkpoints
+from models import CategoryWeeklyStats, CourseDailyStats
+
+# date(x, 'weekday 0', '-6 days') is the Monday starting x's ISO week.
+_WEEK_START = "date({}, 'weekday 0', '-6 days')"
+
+_UPSERT_DAILY = """
+    INSERT INTO course_daily_stats (course_id, day, enrollments, lessons_started, lessons_completed)
+    {select}
+    ON CONFLICT (course_id, day) DO UPDATE SET
+        enrollments = enrollments + excluded.enrollments,
+        lessons_started = lessons_started + excluded.lessons_started,
+        lessons_completed = lessons_completed + excluded.lessons_completed
+"""
+
+_UPSERT_WEEKLY = """
+    INSERT INTO category_weekly_stats (category, week_start, enrollments, lessons_started, lessons_completed)
+    {select}
+    ON CONFLICT (category, week_start) DO UPDATE SET
+        enrollments = enrollments + excluded.enrollments,
+        lessons_started = lessons_started + excluded.lessons_started,
+        lessons_completed = lessons_completed + excluded.lessons_completed
+"""
+
+_ENROLLMENT_COUNTS = "count(*), 0, 0"
+_PROGRESS_COUNTS = "0, sum(s.event = 'started'), sum(s.event = 'completed')"
+
+# (checkpoint name, source table, key column, timestamp column, counter columns)
+SOURCES = (
+    ("rollups:enrollments", "enrollments", "rowid", "enrolled_at", _ENROLLMENT_COUNTS),
+    ("rollups:progress", "progress_events", "id", "occurred_at", _PROGRESS_COUNTS),
+)
+
+
+def _statements(table: str, key: str, ts: str, counts: str) -> list:
+    where = f"WHERE s.{key} > :lo AND s.{key} <= :hi"
+    daily = (
+        f"SELECT s.course_id, date(s.{ts}), {counts} FROM {table} s {where} GROUP BY 1, 2"
+    )
+    weekly = (
+        f"SELECT coalesce(c.category, ''), {_WEEK_START.format('s.' + ts)}, {counts} "
+        f"FROM {table} s JOIN courses c ON c.id = s.course_id {where} GROUP BY 1, 2"
+    )
+    return [
+        text(_UPSERT_DAILY.format(select=daily)),
+        text(_UPSERT_WEEKLY.format(select=weekly)),
+    ]
+
+
+async def refresh(db: AsyncSession, *, rebuild: bool = False) -> dict:
+    """Fold rows past each checkpoint into the rollups; returns the new checkpoints."""
+    if rebuild:
+        await db.execute(delete(CourseDailyStats))
+        await db.execute(delete(CategoryWeeklyStats))
+        for name, *_ in SOURCES:
+            await checkpoints.save(db, name, 0)
+        await db.commit()
+
+    reached = {}
+    for name, table, key, ts, counts in SOURCES:
+        statements = _statements(table, key, ts, counts)
+        lo = start = await checkpoints.load(db, name)
+        hi = (await db.execute(text(f"SELECT max({key}) FROM {table}"))).scalar() or 0
+        while lo < hi:
+            upper = min(lo + settings.rollups_batch_size, hi)
+            for statement in statements:
+                await db.execute(statement, {"lo": lo, "hi": upper})
+            await checkpoints.save(db, name, upper)
+            await db.commit()
+            lo = upper
+        reached[name] = max(hi, start)
+    return reached
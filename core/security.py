@@ -7,9 +7,11 @@ from fastapi.security import OAuth2PasswordBearer
 from pwdlib import PasswordHash
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
 import models
 from config import settings
+from core import metrics, tracing
 from database import get_db
 
 password_hash = PasswordHash.recommended()
@@ -21,12 +23,24 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/users/token")
 
 def hash_password(password: str) -> str:
     """Return an Argon2id hash of *password*."""
-    return password_hash.hash(password)
+    with metrics.PASSWORD_HASH_DURATION.time("hash"), tracing.span("password.hash"):
+        return password_hash.hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Check *plain_password* against an existing *hashed_password*."""
-    return password_hash.verify(plain_password, hashed_password)
+    with metrics.PASSWORD_HASH_DURATION.time("verify"), tracing.span("password.verify"):
+        return password_hash.verify(plain_password, hashed_password)
+
+
+async def hash_password_async(password: str) -> str:
+    """``hash_password`` in the thread pool so Argon2 doesn't stall the event loop."""
+    return await run_in_threadpool(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """``verify_password`` in the thread pool so Argon2 doesn't stall the event loop."""
+    return await run_in_threadpool(verify_password, plain_password, hashed_password)
 
 
 # ── JWT helpers ──────────────────────────────────────────────────────────────
@@ -76,18 +90,19 @@ async def get_current_user(
     db: Annotated[AsyncSession, Depends(get_db)],
 ) -> models.User:
     """Get the current user based on the provided JWT token."""
-    user_id = verify_access_token(token)
-    if user_id is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
+    with tracing.span("dependency get_current_user"):
+        user_id = verify_access_token(token)
+        if user_id is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate credentials",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+
+        result = await db.execute(
+            select(models.User).where(models.User.id == user_id)
         )
-
-    result = await db.execute(
-        select(models.User).where(models.User.id == user_id)
-    )
-    user = result.scalars().first()
+        user = result.scalars().first()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -0,0 +1,38 @@
+"""Static file serving: long-lived caching for content-addressed assets, and
+page caching for prerendered HTML."""
+
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+from config import settings
+
+IMMUTABLE_PREFIXES = ("thumbs/",)
+
+
+class CachedStaticFiles(StaticFiles):
+    """``StaticFiles`` that marks content-addressed paths as immutable.
+
+    Thumbnail variants are named after a digest of their source image, so a
+    given URL never changes and browsers can keep it for a year.
+    """
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        response = await super().get_response(path, scope)
+        if response.status_code in (200, 304) and path.startswith(IMMUTABLE_PREFIXES):
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+
+class PrerenderedFiles(StaticFiles):
+    """Serves ``core.prerender`` output with the caching headers of a public page."""
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        response = await super().get_response(path, scope)
+        if response.status_code in (200, 304):
+            response.headers["Cache-Control"] = (
+                f"public, max-age={settings.page_cache_max_age}, "
+                f"stale-while-revalidate={settings.page_cache_max_age * 5}"
+            )
+            response.headers["Vary"] = "Cookie"
+        return response
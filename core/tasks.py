@@ -0,0 +1,222 @@
+"""Background job handlers. Import this module to register them."""
+
+import asyncio
+import logging
+import time
+from collections.abc import Callable
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from core import backup, lesson_order, prerender, recommendations, rollups, thumbnails
+from core.invalidation import bus
+from core.jobs import enqueue, job
+from database import AsyncSessionLocal
+from models import Course, Job, User
+from models.job import JOB_QUEUED
+
+logger = logging.getLogger(__name__)
+
+BACKUP_DATABASE = "backup_database"
+DELETE_COURSE = "delete_course"
+DELETE_USER = "delete_user"
+GENERATE_THUMBNAILS = "generate_thumbnails"
+PRERENDER_PAGES = "prerender_pages"
+REBALANCE_LESSONS = "rebalance_lessons"
+REFRESH_RECOMMENDATIONS = "refresh_recommendations"
+REFRESH_ROLLUPS = "refresh_rollups"
+
+
+@job(DELETE_COURSE)
+async def delete_course(payload: dict) -> dict:
+    """Delete a course; the database cascades to everything that references it."""
+    async with AsyncSessionLocal() as db:
+        course = await db.get(Course, payload["course_id"])
+        if course is None:
+            return {"deleted": False}
+        await db.delete(course)
+        await db.commit()
+    await asyncio.to_thread(thumbnails.remove_variants, payload["course_id"])
+    return {"deleted": True}
+
+
+@job(DELETE_USER)
+async def delete_user(payload: dict) -> dict:
+    """Delete a user; the database cascades to their enrollments and progress."""
+    async with AsyncSessionLocal() as db:
+        user = await db.get(User, payload["user_id"])
+        if user is None:
+            return {"deleted": False}
+        await db.delete(user)
+        await db.commit()
+    return {"deleted": True}
+
+
+async def request_thumbnails(db: AsyncSession, course_id: str, upload: str | None = None) -> Job:
+    """Queue variant generation for a course. Commits *db*.
+
+    A course has at most one queued job, and its jobs run one at a time. A
+    newer request replaces the queued job's upload (or clears it, so the job
+    reads the current URL when it runs) and drops the replaced upload.
+    """
+    payload = {"course_id": course_id, "upload": upload}
+    while True:
+        queued = await enqueue(
+            db, GENERATE_THUMBNAILS, payload, dedup_key=f"{GENERATE_THUMBNAILS}:{course_id}"
+        )
+        if queued.payload == payload:
+            return queued
+        replaced = queued.payload.get("upload")
+        result = await db.execute(
+            update(Job).where(Job.id == queued.id, Job.status == JOB_QUEUED).values(payload=payload)
+        )
+        await db.commit()
+        if result.rowcount:
+            if replaced:
+                await asyncio.to_thread(thumbnails.remove_upload, replaced)
+            return queued
+        # Claimed in the meantime: queue a follow-up behind it instead.
+
+
+async def request_prerender(db: AsyncSession) -> Job:
+    """Queue an incremental prerender run (deduplicated). Commits *db*."""
+    return await enqueue(db, PRERENDER_PAGES, dedup_key=PRERENDER_PAGES)
+
+
+async def request_backup(db: AsyncSession) -> Job:
+    """Queue a database snapshot (deduplicated). Commits *db*."""
+    return await enqueue(db, BACKUP_DATABASE, dedup_key=BACKUP_DATABASE)
+
+
+@job(BACKUP_DATABASE, max_attempts=3)
+def backup_database(payload: dict) -> dict:
+    """Take an online snapshot of the database and prune old ones."""
+    return backup.create_snapshot()
+
+
+async def request_rebalance(db: AsyncSession, course_id: str) -> Job:
+    """Queue renumbering a course's lesson positions (deduplicated). Commits *db*."""
+    return await enqueue(
+        db, REBALANCE_LESSONS, {"course_id": course_id}, dedup_key=f"{REBALANCE_LESSONS}:{course_id}"
+    )
+
+
+@job(REBALANCE_LESSONS)
+async def rebalance_lessons(payload: dict) -> dict:
+    """Spread a course's lesson positions evenly again after many moves."""
+    async with AsyncSessionLocal() as db:
+        rewritten = await lesson_order.rebalance(db, payload["course_id"])
+        await db.commit()
+    return {"rewritten": rewritten}
+
+
+@job(GENERATE_THUMBNAILS, max_attempts=3)
+async def generate_thumbnails(payload: dict) -> dict:
+    """Fetch (or take the uploaded) course image and record its WebP variants."""
+    course_id = payload["course_id"]
+    upload = payload.get("upload")
+    async with AsyncSessionLocal() as db:
+        course = await db.get(Course, course_id)
+        if course is None:
+            if upload:
+                await asyncio.to_thread(thumbnails.remove_upload, upload)
+            return {"variants": 0}
+        source = upload or course.thumbnail_url
+        if not source:
+            course.thumbnail_variants = None
+            await db.commit()
+            await asyncio.to_thread(thumbnails.remove_variants, course_id)
+            return {"variants": 0}
+
+    data = await asyncio.to_thread(thumbnails.load_source, source)
+    variants = await asyncio.to_thread(thumbnails.render_variants, course_id, data)
+
+    async with AsyncSessionLocal() as db:
+        course = await db.get(Course, course_id)
+        if course is not None:
+            course.thumbnail_variants = variants
+            await db.commit()
+    if course is None:
+        await asyncio.to_thread(thumbnails.remove_variants, course_id)
+    else:
+        # Only now: until the commit the course still points at the old files.
+        await asyncio.to_thread(thumbnails.remove_stale, course_id, variants)
+    # The upload goes last: a failed render or commit retries from it.
+    if upload:
+        await asyncio.to_thread(thumbnails.remove_upload, upload)
+    return {"variants": len(variants)}
+
+
+@job(REFRESH_RECOMMENDATIONS)
+async def refresh_recommendations(payload: dict) -> dict:
+    """Fold new enrollments into course recommendations (``full`` rebuilds)."""
+    async with AsyncSessionLocal() as db:
+        result = await recommendations.refresh(db, full=bool(payload.get("full")))
+        if result["courses_ranked"] and settings.prerender_enabled:
+            await request_prerender(db)  # course pages list the recommendations
+        return result
+
+
+@job(PRERENDER_PAGES)
+async def prerender_pages(payload: dict) -> dict:
+    """Re-render the anonymous pages whose course changed (``full`` renders all)."""
+    async with AsyncSessionLocal() as db:
+        return await prerender.refresh(db, full=bool(payload.get("full")))
+
+
+@job(REFRESH_ROLLUPS)
+async def refresh_rollups(payload: dict) -> dict:
+    """Fold new enrollments and progress events into the analytics rollups."""
+    async with AsyncSessionLocal() as db:
+        return await rollups.refresh(db, rebuild=bool(payload.get("rebuild")))
+
+
+# ── Change-driven scheduling ─────────────────────────────────────────────────
+
+
+def _debounced(kind: str, delay: float) -> Callable[[str, str], None]:
+    """Bus subscriber that enqueues at most one delayed *kind* job per *delay* window.
+
+    The job runs after the window closes and picks up everything committed
+    so far, so a burst of changes costs one run.
+    """
+    next_at = 0.0
+    pending: set[asyncio.Task] = set()  # keeps the tasks from being collected mid-run
+
+    async def schedule() -> None:
+        nonlocal next_at
+        try:
+            async with AsyncSessionLocal() as db:
+                await enqueue(db, kind, dedup_key=kind, delay=delay)
+        except Exception:
+            logger.exception("Scheduling a %s job failed", kind)
+            next_at = 0.0  # let the next change try again
+
+    def on_change(entity: str, key: str) -> None:
+        nonlocal next_at
+        now = time.monotonic()
+        if now < next_at:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # committed outside the app (scripts); the next app-side change catches up
+        next_at = now + delay
+        task = loop.create_task(schedule())
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+
+    return on_change
+
+
+_refresh_recommendations_soon = _debounced(
+    REFRESH_RECOMMENDATIONS, settings.recommendations_refresh_delay
+)
+_refresh_rollups_soon = _debounced(REFRESH_ROLLUPS, settings.rollups_refresh_delay)
+
+bus.subscribe("enrollment", _refresh_recommendations_soon)
+bus.subscribe("enrollment", _refresh_rollups_soon)
+bus.subscribe("progress", _refresh_rollups_soon)
+if settings.prerender_enabled:
+    bus.subscribe("course", _debounced(PRERENDER_PAGES, settings.prerender_refresh_delay))
@@ -0,0 +1,28 @@
+from time import perf_counter
+
+from fastapi.templating import Jinja2Templates
+
+from core import metrics, tracing
+
+
+class InstrumentedTemplates(Jinja2Templates):
+    """Jinja2Templates that records render time per template."""
+
+    def TemplateResponse(self, *args, **kwargs):
+        if args and isinstance(args[0], str):
+            name = args[0]
+        elif len(args) > 1:
+            name = args[1]
+        else:
+            name = kwargs.get("name", "unknown")
+
+        start = perf_counter()
+        try:
+            with tracing.span("render", template=name):
+                return super().TemplateResponse(*args, **kwargs)
+        finally:
+            metrics.TEMPLATE_RENDER_DURATION.observe(perf_counter() - start, name)
+
+
+# Shared by every router so templates are compiled and cached once per process.
+templates = InstrumentedTemplates(directory="templates")
@@ -0,0 +1,231 @@
+"""Course thumbnail pipeline: fetch a source image, write resized WebP variants.
+
+Variants are written to ``static/thumbs/<course_id>/<digest>-<width>.webp``.
+The digest is taken from the source bytes, so a variant URL never changes
+content and can be served with an immutable, year-long ``Cache-Control``.
+
+Resizing needs Pillow (``pip install 'pseudo-code-atlas[images]'``); it is
+imported lazily so the rest of the app runs without it.
+"""
+
+import hashlib
+import http.client
+import importlib
+import io
+import ipaddress
+import shutil
+import socket
+import urllib.request
+from pathlib import Path
+from typing import Protocol
+from urllib.parse import urlsplit
+
+from config import settings
+
+STATIC_DIR = Path("static")
+THUMBS_DIR = STATIC_DIR / "thumbs"
+UPLOADS_DIR = THUMBS_DIR / "_uploads"
+
+
+class ImageFetcher(Protocol):
+    """Anything that can turn a source URL into image bytes."""
+
+    def fetch(self, url: str) -> bytes: ...
+
+
+# ── Fetching remote sources ─────────────────────────────────────────────────
+# thumbnail_url comes from API callers, so the server must not be usable to
+# reach loopback, private or link-local (cloud metadata) addresses. Every
+# connection, redirects included, is checked where it is made, after DNS
+# resolution, so a hostname can't resolve to a public address for the check
+# and a private one for the request.
+
+
+def _check_url(url: str) -> None:
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https"):
+        raise ValueError(f"Unsupported thumbnail URL scheme: {url!r}")
+    host = (parts.hostname or "").lower()
+    if not host:
+        raise ValueError(f"Thumbnail URL has no host: {url!r}")
+    allowed = [h.lower() for h in settings.thumbnail_allowed_hosts]
+    if allowed and not any(host == h or host.endswith("." + h) for h in allowed):
+        raise ValueError(f"Thumbnail host not allowed: {host}")
+
+
+def _check_address(ip: str) -> None:
+    address = ipaddress.ip_address(ip.split("%", 1)[0])
+    if isinstance(address, ipaddress.IPv6Address) and address.ipv4_mapped:
+        address = address.ipv4_mapped
+    if not address.is_global or address.is_multicast:
+        raise ValueError(f"Refusing to fetch a thumbnail from non-public address {address}")
+
+
+def _public_connection(address, timeout=socket._GLOBAL_DEFAULT_TIMEOUT, source_address=None, **kwargs):
+    """``socket.create_connection`` that only connects to public addresses."""
+    host, port = address
+    candidates = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    for *_, sockaddr in candidates:
+        _check_address(sockaddr[0])
+    error: OSError | None = None
+    for family, type_, proto, _, sockaddr in candidates:
+        sock = socket.socket(family, type_, proto)
+        try:
+            if timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
+                sock.settimeout(timeout)
+            sock.connect(sockaddr)
+            return sock
+        except OSError as exc:
+            sock.close()
+            error = exc
+    raise error or OSError(f"Could not connect to {host}")
+
+
+class _PublicHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = _public_connection
+
+
+class _PublicHTTPSConnection(http.client.HTTPSConnection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = _public_connection
+
+
+class _PublicHTTPHandler(urllib.request.HTTPHandler):
+    def http_open(self, req):
+        return self.do_open(_PublicHTTPConnection, req)
+
+
+class _PublicHTTPSHandler(urllib.request.HTTPSHandler):
+    def https_open(self, req):
+        return self.do_open(_PublicHTTPSConnection, req, context=self._context)
+
+
+class _CheckedRedirectHandler(urllib.request.HTTPRedirectHandler):
+    max_redirections = 3
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        _check_url(newurl)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+class HttpFetcher:
+    """Fetch images over HTTP(S) with a timeout and a size cap.
+
+    Only public addresses are contacted (redirects included), never through
+    a proxy, and only ``thumbnail_allowed_hosts`` when that is set.
+    """
+
+    def __init__(self, timeout: float = 10.0, max_bytes: int | None = None):
+        self.timeout = timeout
+        self.max_bytes = max_bytes or settings.thumbnail_max_source_bytes
+        self.opener = urllib.request.build_opener(
+            urllib.request.ProxyHandler({}),
+            _PublicHTTPHandler, _PublicHTTPSHandler, _CheckedRedirectHandler,
+        )
+
+    def fetch(self, url: str) -> bytes:
+        _check_url(url)
+        request = urllib.request.Request(url, headers={"User-Agent": "CodeAtlas-Thumbnailer/1.0"})
+        with self.opener.open(request, timeout=self.timeout) as response:
+            data = response.read(self.max_bytes + 1)
+        if len(data) > self.max_bytes:
+            raise ValueError(f"Thumbnail source exceeds {self.max_bytes} bytes: {url}")
+        return data
+
+
+def get_fetcher() -> ImageFetcher:
+    """Instantiate ``settings.thumbnail_fetcher`` (``module:Class``), or HttpFetcher."""
+    if not settings.thumbnail_fetcher:
+        return HttpFetcher()
+    module_name, _, attr = settings.thumbnail_fetcher.partition(":")
+    return getattr(importlib.import_module(module_name), attr)()
+
+
+def save_upload(course_id: str, data: bytes) -> str:
+    """Stash uploaded bytes for the background job; returns a path relative to cwd."""
+    UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
+    path = UPLOADS_DIR / f"{course_id}-{hashlib.sha256(data).hexdigest()[:16]}"
+    path.write_bytes(data)
+    return str(path)
+
+
+def _upload_path(source: str) -> Path | None:
+    path = Path(source)
+    return path if path.is_relative_to(UPLOADS_DIR) else None
+
+
+def load_source(source: str) -> bytes:
+    """Read an uploaded file or fetch a remote URL. Blocking.
+
+    An upload is left in place so a retry can read it again; the job removes
+    it with :func:`remove_upload` once the variants are recorded.
+    """
+    path = _upload_path(source)
+    if path is not None:
+        if not path.is_file():
+            raise FileNotFoundError(f"Thumbnail upload is gone: {source}")
+        return path.read_bytes()
+    return get_fetcher().fetch(source)
+
+
+def remove_upload(source: str) -> None:
+    """Delete *source* if it is a stashed upload (remote URLs are left alone)."""
+    path = _upload_path(source)
+    if path is not None:
+        path.unlink(missing_ok=True)
+
+
+def render_variants(course_id: str, data: bytes) -> list[dict]:
+    """Write one WebP per configured width and return ``[{width, path}, ...]``.
+
+    Widths larger than the source are skipped (no upscaling), but at least
+    one variant is always produced. Blocking and CPU-bound.
+    """
+    try:
+        from PIL import Image, ImageOps
+    except ImportError as exc:  # pragma: no cover - depends on the environment
+        raise RuntimeError(
+            "Pillow is required for thumbnails: pip install 'pseudo-code-atlas[images]'"
+        ) from exc
+
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    out_dir = THUMBS_DIR / course_id
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    with Image.open(io.BytesIO(data)) as source:
+        image = ImageOps.exif_transpose(source)
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+
+    widths = sorted(w for w in settings.thumbnail_widths if w <= image.width)
+    widths = widths or [image.width]
+
+    variants = []
+    for width in widths:
+        height = max(round(image.height * width / image.width), 1)
+        target = out_dir / f"{digest}-{width}.webp"
+        if not target.exists():
+            resized = image.resize((width, height), Image.Resampling.LANCZOS)
+            tmp = target.with_suffix(".tmp")
+            resized.save(tmp, "WEBP", quality=settings.thumbnail_quality, method=6)
+            tmp.replace(target)
+        variants.append({"width": width, "path": target.relative_to(STATIC_DIR).as_posix()})
+    return variants
+
+
+def remove_stale(course_id: str, variants: list[dict]) -> None:
+    """Delete the course's variant files other than *variants*.
+
+    Call it once *variants* are committed: until then the course row still
+    points at the previous files.
+    """
+    keep = {Path(variant["path"]).name for variant in variants}
+    for path in (THUMBS_DIR / course_id).glob("*.webp"):
+        if path.name not in keep:
+            path.unlink(missing_ok=True)
+
+
+def remove_variants(course_id: str) -> None:
+    shutil.rmtree(THUMBS_DIR / course_id, ignore_errors=True)
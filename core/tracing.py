@@ -0,0 +1,365 @@
+"""Per-request tracing: spans in-process, tail-sampled, exported off-thread.
+
+``TracingMiddleware`` opens a trace for each request, continuing the
+caller's W3C ``traceparent`` when one is sent and answering with its own.
+While the request runs, :func:`span` records nested timings: each
+middleware layer, the ``get_db``/``get_current_user`` dependencies, pool
+checkouts, every SQL statement, template rendering and password hashing.
+
+The keep/drop decision is made when the request has finished (tail
+sampling): traces slower than ``tracing_slow_ms`` and failed ones (5xx or
+an exception) are always kept, the rest at ``tracing_sample_rate``. Kept
+traces go on a bounded queue; a background thread appends them to
+``tracing_file`` as JSON lines, or posts them to an OTLP/HTTP collector
+(``tracing_otlp_endpoint``, e.g. ``http://127.0.0.1:4318/v1/traces``).
+
+With tracing off, or outside a request, :func:`span` does nothing.
+"""
+
+import atexit
+import functools
+import json
+import os
+import queue
+import random
+import re
+import secrets
+import threading
+import time
+import urllib.request
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from time import perf_counter_ns
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config import settings
+from core import metrics
+
+TRACEPARENT_HEADER = b"traceparent"
+_TRACEPARENT = re.compile(rb"00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})")
+_INVALID_TRACE_ID = "0" * 32
+_INVALID_SPAN_ID = "0" * 16
+
+TRACES = metrics.counter(
+    "codeatlas_traces_total",
+    "Finished request traces, by outcome (exported, sampled_out, dropped, failed).",
+    ("outcome",),
+)
+
+
+@dataclass(slots=True)
+class Span:
+    name: str
+    span_id: str
+    parent_id: str | None
+    start_ns: int  # perf_counter_ns
+    end_ns: int = 0
+    kind: int = 1  # OTLP SpanKind: 1 internal, 2 server, 3 client
+    attributes: dict[str, Any] = field(default_factory=dict)
+    error: bool = False
+
+
+class Trace:
+    """The spans of one request, plus what's needed to place them in time."""
+
+    __slots__ = ("trace_id", "flags", "wall_ns", "perf_ns", "spans", "dropped", "tokens")
+
+    def __init__(self, trace_id: str, flags: str) -> None:
+        self.trace_id = trace_id
+        self.flags = flags
+        self.wall_ns = time.time_ns()
+        self.perf_ns = perf_counter_ns()
+        self.spans: list[Span] = []
+        self.dropped = 0
+        self.tokens: tuple = ()
+
+    def open(self, name: str, parent: Span | None, kind: int = 1, **attributes: Any) -> Span | None:
+        if len(self.spans) >= settings.tracing_max_spans:
+            self.dropped += 1
+            return None
+        span = Span(
+            name, secrets.token_hex(8), parent.span_id if parent else None,
+            perf_counter_ns(), kind=kind, attributes=attributes,
+        )
+        self.spans.append(span)
+        return span
+
+    def unix_ns(self, perf_ns: int) -> int:
+        return self.wall_ns + (perf_ns - self.perf_ns)
+
+
+_trace: ContextVar[Trace | None] = ContextVar("trace", default=None)
+_span: ContextVar[Span | None] = ContextVar("span", default=None)
+
+
+def current_trace_id() -> str | None:
+    trace = _trace.get()
+    return trace.trace_id if trace is not None else None
+
+
+def traceparent() -> str | None:
+    """``traceparent`` value for the current span, for responses and outgoing calls."""
+    trace, span = _trace.get(), _span.get()
+    if trace is None or span is None:
+        return None
+    return f"00-{trace.trace_id}-{span.span_id}-{trace.flags}"
+
+
+# ── Spans ────────────────────────────────────────────────────────────────────
+
+
+@contextmanager
+def span(name: str, kind: int = 1, **attributes: Any) -> Iterator[Span | None]:
+    """Time the ``with`` block as a child of the current span."""
+    trace = _trace.get()
+    current = trace.open(name, _span.get(), kind, **attributes) if trace is not None else None
+    if current is None:
+        yield None
+        return
+    token = _span.set(current)
+    try:
+        yield current
+    except BaseException:
+        current.error = True
+        raise
+    finally:
+        current.end_ns = perf_counter_ns()
+        _span.reset(token)
+
+
+def traced_middleware(cls: type) -> type:
+    """Class decorator: run an ASGI middleware's ``__call__`` inside a span."""
+    call = cls.__call__
+    name = f"middleware {cls.__name__}"
+
+    @functools.wraps(call)
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or _trace.get() is None:
+            await call(self, scope, receive, send)
+            return
+        with span(name):
+            await call(self, scope, receive, send)
+
+    cls.__call__ = __call__
+    return cls
+
+
+def instrument_engine(engine: Engine) -> None:
+    """One client span per SQL statement."""
+    if not settings.tracing_enabled:
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany) -> None:
+        trace = _trace.get()
+        context._trace_span = trace and trace.open(
+            "sql", _span.get(), 3,
+            **{"db.system": engine.dialect.name, "db.statement": " ".join(statement.split())[:1000]},
+        )
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _finish(conn, cursor, statement, parameters, context, executemany) -> None:
+        current = getattr(context, "_trace_span", None)
+        if current is not None:
+            current.end_ns = perf_counter_ns()
+            if cursor.rowcount >= 0:
+                current.attributes["db.rows"] = cursor.rowcount
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context) -> None:
+        current = getattr(context.execution_context, "_trace_span", None)
+        if current is not None:
+            current.end_ns = perf_counter_ns()
+            current.error = True
+
+
+# ── Traces ───────────────────────────────────────────────────────────────────
+
+
+def start_trace(header: bytes | None, name: str, **attributes: Any) -> Span:
+    """Open a trace (continuing *header* if it is a valid ``traceparent``) and its root span."""
+    match = _TRACEPARENT.fullmatch(header) if header else None
+    if match and match[1].decode() != _INVALID_TRACE_ID and match[2].decode() != _INVALID_SPAN_ID:
+        trace = Trace(match[1].decode(), match[3].decode())
+        parent_id = match[2].decode()
+    else:
+        trace = Trace(secrets.token_hex(16), "00")
+        parent_id = None
+    root = trace.open(name, None, 2, **attributes)
+    root.parent_id = parent_id
+    trace.tokens = (_trace.set(trace), _span.set(root))
+    return root
+
+
+def finish_trace(root: Span, *, error: bool = False) -> None:
+    """Close the current trace and hand it to the exporter if it is kept."""
+    trace = _trace.get()
+    trace_token, span_token = trace.tokens
+    _span.reset(span_token)
+    _trace.reset(trace_token)
+
+    root.end_ns = perf_counter_ns()
+    root.error = root.error or error
+    duration_ms = (root.end_ns - root.start_ns) / 1e6
+    keep = (
+        duration_ms >= settings.tracing_slow_ms
+        or any(s.error for s in trace.spans)
+        or random.random() < settings.tracing_sample_rate
+    )
+    if not keep:
+        TRACES.inc("sampled_out")
+        return
+    if trace.dropped:
+        root.attributes["trace.dropped_spans"] = trace.dropped
+    _exporter.submit(trace)
+
+
+# ── Export ───────────────────────────────────────────────────────────────────
+
+
+def _as_json_line(trace: Trace) -> dict:
+    root = trace.spans[0]
+    return {
+        "trace_id": trace.trace_id,
+        "name": root.name,
+        "start": trace.unix_ns(root.start_ns) / 1e9,
+        "duration_ms": round((root.end_ns - root.start_ns) / 1e6, 3),
+        "error": root.error,
+        "spans": [
+            {
+                "span_id": s.span_id,
+                "parent_id": s.parent_id,
+                "name": s.name,
+                "offset_ms": round((s.start_ns - root.start_ns) / 1e6, 3),
+                # An unfinished span (e.g. a streaming body) ends with the trace.
+                "duration_ms": round(((s.end_ns or root.end_ns) - s.start_ns) / 1e6, 3),
+                "error": s.error,
+                "attributes": s.attributes,
+            }
+            for s in trace.spans
+        ],
+    }
+
+
+def _otlp_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _as_otlp(traces: list[Trace]) -> dict:
+    spans = []
+    for trace in traces:
+        root_end = trace.spans[0].end_ns
+        for s in trace.spans:
+            otlp = {
+                "traceId": trace.trace_id,
+                "spanId": s.span_id,
+                "name": s.name,
+                "kind": s.kind,
+                "startTimeUnixNano": str(trace.unix_ns(s.start_ns)),
+                "endTimeUnixNano": str(trace.unix_ns(s.end_ns or root_end)),
+                "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s.attributes.items()],
+                "status": {"code": 2 if s.error else 0},
+            }
+            if s.parent_id:
+                otlp["parentSpanId"] = s.parent_id
+            spans.append(otlp)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": "codeatlas"}}]},
+            "scopeSpans": [{"scope": {"name": "core.tracing"}, "spans": spans}],
+        }]
+    }
+
+
+class Exporter:
+    """Writes kept traces from a bounded queue on a daemon thread, in batches."""
+
+    batch_size = 100
+
+    def __init__(self) -> None:
+        self._reset()
+        atexit.register(self.close)
+        # A forked worker starts its own thread on first use.
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self) -> None:
+        self._queue: queue.Queue[Trace | None] | None = None
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def submit(self, trace: Trace) -> None:
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            TRACES.inc("dropped")
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._queue = queue.Queue(maxsize=settings.tracing_queue_size)
+            self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+            self._thread.start()
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Flush what is queued and stop the thread."""
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        thread.join(timeout)
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = None in batch
+            batch = [t for t in batch if t is not None]
+            if not batch:
+                continue
+            try:
+                self._write(batch)
+                TRACES.inc("exported", amount=len(batch))
+            except Exception:  # noqa: BLE001 — a broken sink must not stop the thread
+                TRACES.inc("failed", amount=len(batch))
+
+    def _write(self, batch: list[Trace]) -> None:
+        if settings.tracing_otlp_endpoint:
+            request = urllib.request.Request(
+                settings.tracing_otlp_endpoint,
+                data=json.dumps(_as_otlp(batch)).encode(),
+                headers={"Content-Type": "application/json"},
+                method="POST",
+            )
+            with urllib.request.urlopen(request, timeout=5):
+                return
+        path = Path(settings.tracing_file)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("a", encoding="utf-8") as f:
+            for trace in batch:
+                f.write(json.dumps(_as_json_line(trace), default=str) + "\n")
+
+
+_exporter = Exporter()
@@ -0,0 +1,169 @@
+"""Group commit: many requests' small writes in one transaction.
+
+SQLite has one writer at a time, and each commit takes the write lock and
+syncs the file. Routers therefore hand their write to :func:`submit` as a
+*unit*: an async function that takes a session and returns a result. A
+writer task (one per process) collects whatever units are queued, up to
+``writes_max_batch``, and runs them in a single ``BEGIN IMMEDIATE``
+transaction with one commit.
+
+If a unit raises, or the commit fails, the batch is rolled back and run
+again with each unit in its own SAVEPOINT. The failing unit is then rolled
+back alone and its caller gets the exception, while the rest of the batch
+commits. A unit can therefore run twice, so it must do nothing but database
+work through the session it is given. Hash passwords and the like before
+submitting. Units also run one after another on the writer, so a unit's
+check-then-write (a uniqueness check, "enroll unless enrolled") can't race
+another unit of the same process.
+
+The writer task runs in an empty context, not that of the request that
+happened to submit first. Each unit runs under its own submitter's
+context, so its SQL is logged and traced under that request; the shared
+``BEGIN``/``COMMIT`` belong to no request.
+
+With ``writes_batching = false`` each unit gets its own session and commit.
+"""
+
+import asyncio
+import contextvars
+import logging
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any, TypeVar
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from core import metrics, tracing
+from database import AsyncSessionLocal, engine
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+Unit = Callable[[AsyncSession], Awaitable[T]]
+
+WRITE_BATCH_SIZE = metrics.histogram(
+    "codeatlas_write_batch_size",
+    "Units committed together by the group-commit writer.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+
+
+@dataclass(slots=True)
+class _Pending:
+    unit: Unit
+    future: asyncio.Future
+    context: contextvars.Context
+
+
+@dataclass(slots=True)
+class _Failed:
+    error: BaseException
+
+
+class WriteCoordinator:
+    """Queue of write units and the task that commits them in batches."""
+
+    def __init__(self) -> None:
+        self._queue: asyncio.Queue[_Pending | None] | None = None
+        self._task: asyncio.Task | None = None
+
+    async def submit(self, unit: Unit[T]) -> T:
+        """Run *unit* in the next batch and return its result (or raise its error)."""
+        if not settings.writes_batching:
+            async with AsyncSessionLocal() as session:
+                result = await unit(session)
+                await session.commit()
+                return result
+
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(_Pending(unit, future, contextvars.copy_context()))
+        with tracing.span("db.write_queue"):
+            return await future
+
+    def start(self) -> None:
+        """Start the writer on the running loop, unless it is already running there."""
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._queue = asyncio.Queue()
+            # A fresh context: the writer must not inherit the request id,
+            # trace or anything else of whoever starts it.
+            self._task = loop.create_task(self._run(), name="write-coordinator", context=contextvars.Context())
+
+    async def stop(self) -> None:
+        """Commit what is queued, then stop the writer."""
+        task, self._task = self._task, None
+        if task is None or task.done():
+            return
+        self._queue.put_nowait(None)
+        await task
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch = [await self._queue.get()]
+            while len(batch) < settings.writes_max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            stopping = None in batch
+            batch = [p for p in batch if p is not None and not p.future.cancelled()]
+            if batch:
+                await self._commit(batch)
+
+    async def _commit(self, batch: list[_Pending]) -> None:
+        WRITE_BATCH_SIZE.observe(len(batch))
+        try:
+            outcomes = await self._transaction(batch, isolated=False)
+        except Exception as exc:
+            if len(batch) == 1:
+                outcomes = [_Failed(exc)]
+            else:
+                # Someone's unit (or the commit) failed: run the batch again
+                # with a savepoint per unit, so only the failing ones drop out.
+                try:
+                    outcomes = await self._transaction(batch, isolated=True)
+                except Exception as exc:
+                    logger.exception("Group commit of %d write(s) failed", len(batch))
+                    outcomes = [_Failed(exc)] * len(batch)
+        for pending, outcome in zip(batch, outcomes):
+            if pending.future.done():
+                continue
+            if isinstance(outcome, _Failed):
+                pending.future.set_exception(outcome.error)
+            else:
+                pending.future.set_result(outcome)
+
+    async def _transaction(self, batch: list[_Pending], *, isolated: bool) -> list[Any]:
+        """Run *batch* in one transaction and commit; returns each unit's result.
+
+        Not *isolated*, the first failure aborts the whole transaction. That
+        saves two statements and a flush per unit, which is most of the cost.
+        """
+        outcomes = []
+        async with AsyncSessionLocal() as session:
+            if engine.dialect.name == "sqlite":
+                # Take the write lock up front, and open the transaction
+                # explicitly: pysqlite would otherwise let the first
+                # RELEASE SAVEPOINT commit on its own.
+                await session.execute(text("BEGIN IMMEDIATE"))
+            for pending in batch:
+                if not isolated:
+                    outcomes.append(await self._call(pending, session))
+                    continue
+                try:
+                    async with session.begin_nested():
+                        outcomes.append(await self._call(pending, session))
+                except Exception as exc:
+                    outcomes.append(_Failed(exc))
+            await session.commit()
+        return outcomes
+
+    @staticmethod
+    async def _call(pending: _Pending, session: AsyncSession) -> Any:
+        """Run *pending*'s unit in its submitter's context."""
+        return await asyncio.get_running_loop().create_task(pending.unit(session), context=pending.context)
+
+
+coordinator = WriteCoordinator()
+submit = coordinator.submit
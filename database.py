@@ -1,10 +1,47 @@
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from time import perf_counter
 
+from sqlalchemy import event
+from starlette.requests import Request
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from config import settings
+from core import log, metrics, tracing
+
+DATABASE_URL = settings.database_url
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waits for a connection."""
+
+    # Log under "sqlalchemy.pool" like the built-in pools, so it is just as quiet.
+    _sqla_logger_namespace = "sqlalchemy.pool.impl.InstrumentedQueuePool"
 
-DATABASE_URL = "sqlite+aiosqlite:///./codeatlas.db"
+    def _do_get(self):
+        start = perf_counter()
+        try:
+            with tracing.span("db.pool.checkout"):
+                return super()._do_get()
+        finally:
+            metrics.DB_POOL_CHECKOUT_WAIT.observe(perf_counter() - start)
+
+
+# ``database_echo`` is applied by core.log.setup(): echo=True here would write
+# each statement to stdout synchronously from the event loop.
+engine = create_async_engine(DATABASE_URL, poolclass=InstrumentedQueuePool)
+log.instrument_engine(engine.sync_engine)
+tracing.instrument_engine(engine.sync_engine)
+
+
+@event.listens_for(engine.sync_engine, "connect")
+def _enable_foreign_keys(dbapi_connection, connection_record) -> None:
+    """SQLite ignores foreign keys (and ON DELETE CASCADE) unless asked per connection."""
+    if engine.dialect.name == "sqlite":
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
 
-engine = create_async_engine(DATABASE_URL, echo=True)
 
 AsyncSessionLocal = async_sessionmaker(
     engine,
@@ -13,12 +50,65 @@ AsyncSessionLocal = async_sessionmaker(
 )
 
 
+def _pool_stats():
+    pool = engine.pool
+    yield "codeatlas_db_pool_size", "gauge", "Configured pool size.", pool.size()
+    yield "codeatlas_db_pool_checked_out", "gauge", "Connections currently checked out.", pool.checkedout()
+    yield "codeatlas_db_pool_checked_in", "gauge", "Idle connections in the pool.", pool.checkedin()
+    yield "codeatlas_db_pool_overflow", "gauge", "Connections open beyond the pool size.", pool.overflow()
+
+
+metrics.register_collector(_pool_stats)
+
+
 class Base(DeclarativeBase):
     pass
 
 
-async def get_db():
-    """FastAPI dependency that yields an async database session."""
+class RequestSession:
+    """One request's database session, created the first time it is asked for.
+
+    ``DatabaseSessionMiddleware`` puts one in the ASGI scope, so the auth
+    middleware, ``get_db`` and everything depending on it share a session.
+    The session checks a connection out of the pool only when it runs its
+    first statement, and the middleware closes it as soon as the response
+    starts, so a request holds at most one connection and only while it
+    queries.
+    """
+
+    __slots__ = ("_session",)
+
+    def __init__(self) -> None:
+        self._session: AsyncSession | None = None
+
+    def get(self) -> AsyncSession:
+        if self._session is None:
+            self._session = AsyncSessionLocal()
+        return self._session
+
+    async def close(self) -> None:
+        """Roll back anything uncommitted and return the connection."""
+        session, self._session = self._session, None
+        if session is not None:
+            await session.close()
+
+
+REQUEST_SESSION = "db_session"  # ASGI scope key
+
+
+def request_session(scope) -> AsyncSession | None:
+    """The request's shared session, or None outside ``DatabaseSessionMiddleware``."""
+    holder = scope.get(REQUEST_SESSION)
+    return holder.get() if holder is not None else None
+
+
+async def get_db(request: Request):
+    """FastAPI dependency that yields the request's async database session."""
+    with tracing.span("dependency get_db"):
+        session = request_session(request.scope)
+    if session is not None:
+        yield session
+        return
     async with AsyncSessionLocal() as session:
         yield session
 
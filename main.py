@@ -1,20 +1,33 @@
+import asyncio
 from typing import Annotated
 
 from fastapi import Depends, FastAPI, Request
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from admin import setup_admin
-from database import create_tables, get_db
-from middleware import AuthMiddleware
-from models import Course
+from config import settings
+from core import backup, course_index, dashboard, log, prerender, profiling, tasks, writes  # noqa: F401 — tasks registers job handlers
+from core.catalog import catalog_version, load_courses
+from core.http_cache import is_not_modified, make_etag, not_modified, validator_headers
+from core.invalidation import bus
+from core.jobs import dispatcher
+from core.static import CachedStaticFiles
+from core.templating import templates
+from database import AsyncSessionLocal, create_tables, get_db
+from middleware import (
+    AdmissionMiddleware, AuthMiddleware, DatabaseSessionMiddleware, MetricsMiddleware, PrerenderMiddleware,
+    ProfilingMiddleware, RequestLogMiddleware, TracingMiddleware,
+)
+from routers.metrics import router as metrics_router
 from routers.api.admin import user as admin_user_router
 from routers.api.admin import course as admin_course_router
+from routers.api.admin import job as admin_job_router
+from routers.api.courses import router as api_courses_router
 from routers.web.courses import router as web_courses_router
 from routers.web.users import router as web_users_router
 
+log.setup()
+
 app = FastAPI(title="CodeAtlas", version="0.1.0")
 
 # Admin panel (mounted at /admin)
@@ -22,28 +35,76 @@ setup_admin(app)
 
 # Middleware
 app.add_middleware(AuthMiddleware)
+app.add_middleware(DatabaseSessionMiddleware)
+if profiling.is_enabled():
+    app.add_middleware(ProfilingMiddleware)
+if settings.admission_enabled:
+    app.add_middleware(AdmissionMiddleware)
+if settings.prerender_enabled:
+    app.add_middleware(PrerenderMiddleware)
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+if settings.tracing_enabled:
+    app.add_middleware(TracingMiddleware)
+app.add_middleware(RequestLogMiddleware)
 
-# Static files & templates
-app.mount("/static", StaticFiles(directory="static"), name="static")
-templates = Jinja2Templates(directory="templates")
+# Static files
+app.mount("/static", CachedStaticFiles(directory="static"), name="static")
 
 # Register routers
 app.include_router(admin_user_router.router)
 app.include_router(admin_course_router.router)
+app.include_router(admin_job_router.router)
+app.include_router(api_courses_router)
 app.include_router(web_users_router)
 app.include_router(web_courses_router)
+if settings.metrics_enabled:
+    app.include_router(metrics_router)
 
 
 @app.on_event("startup")
 async def startup():
     """Create database tables on startup (dev only — Alembic handles prod)."""
     await create_tables()
+    bus.start()
+    writes.coordinator.start()
+    # Build the catalog facet index before the first /api/courses request.
+    async with AsyncSessionLocal() as db:
+        await course_index.index.refresh(db)
+    if settings.jobs_enabled:
+        await dispatcher.start()
+        if settings.backup_enabled:
+            app.state.backup_schedule = asyncio.create_task(backup.schedule())
+        if settings.prerender_enabled:
+            # Catch up on changes made while the app was down (seeds, scripts).
+            async with AsyncSessionLocal() as db:
+                if await prerender.check(db):
+                    await tasks.request_prerender(db)
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Stop claiming jobs, let in-flight ones finish and commit queued writes."""
+    if schedule := getattr(app.state, "backup_schedule", None):
+        schedule.cancel()
+    await dispatcher.stop()
+    await writes.coordinator.stop()
+    bus.stop()
 
 
 @app.get("/")
 async def home(request: Request, db: Annotated[AsyncSession, Depends(get_db)]):
-    result = await db.execute(select(Course))
-    courses = result.scalars().all()
+    count, last_modified = await catalog_version(db)
+    user = request.state.user
+    summary = await dashboard.get_summary(db, user.id) if user else dashboard.EMPTY_SUMMARY
+    etag = make_etag(
+        "catalog", count, last_modified, user and user.id, user and user.updated_at, summary.fingerprint
+    )
+    headers = validator_headers(etag, last_modified, public=user is None)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(headers)
+
+    courses = await load_courses(db)
     courses_by_id = {c.id: c for c in courses}
 
     return templates.TemplateResponse(
@@ -53,5 +114,7 @@ async def home(request: Request, db: Annotated[AsyncSession, Depends(get_db)]):
             "user": request.state.user,
             "courses": courses,
             "courses_by_id": courses_by_id,
+            "enrolled_ids": summary.enrolled_ids,
         },
+        headers=headers,
     )
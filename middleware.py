@@ -1,27 +1,389 @@
+import asyncio
+import logging
+from time import perf_counter
+
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from sqlalchemy import select
 
-from database import AsyncSessionLocal
+from config import settings
+from core import admission, log, metrics, prerender, profiling, tracing
+from core.static import PrerenderedFiles
+from database import REQUEST_SESSION, AsyncSessionLocal, RequestSession, request_session
 from models.user import User
 
 
+@tracing.traced_middleware
 class AuthMiddleware(BaseHTTPMiddleware):
-    """Read user_id cookie on every request and attach the User to request.state."""
+    """Read user_id cookie on every request and attach the User to request.state.
+
+    The user is loaded through the request's shared session (see
+    ``DatabaseSessionMiddleware``), so route handlers find it in the same
+    identity map instead of opening a second session.
+    """
 
     async def dispatch(self, request: Request, call_next):
         request.state.user = None
 
         user_id = request.cookies.get("user_id")
         if user_id:
+            session = request_session(request.scope)
             try:
-                async with AsyncSessionLocal() as session:
-                    result = await session.execute(
-                        select(User).where(User.id == user_id)
-                    )
-                    request.state.user = result.scalars().first()
+                if session is None:
+                    async with AsyncSessionLocal() as session:
+                        request.state.user = await self._load(session, user_id)
+                else:
+                    request.state.user = await self._load(session, user_id)
+                    # End the read so the connection goes back to the pool
+                    # while the route runs (or waits on the write queue); the
+                    # user stays in the identity map, as commits don't expire.
+                    await session.commit()
             except (ValueError, Exception):
-                pass
+                if session is not None:
+                    await session.rollback()
 
         response = await call_next(request)
         return response
+
+    @staticmethod
+    async def _load(session, user_id: str) -> User | None:
+        result = await session.execute(select(User).where(User.id == user_id))
+        return result.scalars().first()
+
+
+@tracing.traced_middleware
+class DatabaseSessionMiddleware:
+    """Give each request one lazily created session (see ``database.RequestSession``).
+
+    Wraps the auth middleware so both it and the route share the session.
+    The session is closed when the response starts, before the body is
+    sent, so a slow client doesn't keep a pooled connection checked out.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        holder = scope[REQUEST_SESSION] = RequestSession()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                await holder.close()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            await holder.close()
+
+
+def route_template(scope: Scope, root_path: str = "") -> str:
+    """Return the matched route path (e.g. ``/course/{course_id}``) for labelling."""
+    route = scope.get("route")
+    if route is not None and hasattr(route, "path"):
+        return route.path
+    if "prerendered" in scope:
+        return scope["prerendered"]
+    # Mounted apps (e.g. /static) rewrite root_path instead of setting a route.
+    mounted = scope.get("root_path", "")
+    if mounted and mounted != root_path:
+        return mounted + "/{path}"
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """Record request count and latency per route template and status.
+
+    Plain ASGI middleware rather than ``BaseHTTPMiddleware`` so that timing a
+    request costs two clock reads and two dict updates, nothing more.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        root_path = scope.get("root_path", "")
+        status_code = 500
+        start = perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = route_template(scope, root_path)
+            method = scope["method"]
+            metrics.HTTP_REQUESTS.inc(method, route, str(status_code))
+            metrics.HTTP_REQUEST_DURATION.observe(perf_counter() - start, method, route)
+
+
+@tracing.traced_middleware
+class ProfilingMiddleware:
+    """Run cProfile around sampled or token-authorized requests.
+
+    A request is profiled when it sends ``X-Profile-Token`` matching
+    ``settings.profiling_token`` or wins the ``profiling_sample_rate`` draw.
+    Because cProfile sees the whole event-loop thread, other requests running
+    concurrently show up in the same profile.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        supplied = next(
+            (v for k, v in scope["headers"] if k == profiling.PROFILE_HEADER), None
+        )
+        profiler = profiling.try_start() if profiling.should_profile(supplied) else None
+        if profiler is None:
+            await self.app(scope, receive, send)
+            return
+
+        root_path = scope.get("root_path", "")
+        status_code = 500
+        start = perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiling.stop(profiler)
+            await asyncio.to_thread(
+                profiling.save,
+                profiler,
+                method=scope["method"],
+                path=scope["path"],
+                route=route_template(scope, root_path),
+                status=status_code,
+                total_ms=(perf_counter() - start) * 1000,
+            )
+
+
+@tracing.traced_middleware
+class AdmissionMiddleware:
+    """Shed load per route class before requests reach auth, the DB or Argon2.
+
+    See ``core.admission`` for the classes. Rejections are cheap plain-text
+    responses: 503 with ``Retry-After`` when a class is saturated, 429 when a
+    client exceeds the login/signup rate.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self.limiters = admission.build_limiters()
+        self.auth_buckets = admission.TokenBucket(
+            rate=settings.auth_rate_per_minute / 60, burst=settings.auth_rate_burst
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_class = admission.classify(scope)
+        limiter = self.limiters.get(request_class) if request_class else None
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        if admission.is_rate_limited_route(scope):
+            client = scope.get("client")
+            wait = self.auth_buckets.take(client[0] if client else "unknown")
+            if wait:
+                admission.ADMISSION_REJECTED.inc(request_class, "rate_limited")
+                await self._reject(send, 429, "Too many attempts, slow down", wait)
+                return
+
+        if not await limiter.acquire():
+            await self._reject(send, 503, "Server busy, retry shortly", settings.admission_retry_after)
+            return
+        held = limiter
+        app_send = send
+        if request_class == admission.READ and admission.is_conditional(scope):
+            cached = self.limiters.get(admission.CACHED)
+
+            async def send_reclassified(message: Message) -> None:
+                nonlocal held
+                if message["type"] == "http.response.start" and message["status"] == 304 and held is limiter:
+                    # The validator matched, so what is left is cheap: charge
+                    # it to the cached class and free the read slot now.
+                    if cached is None or cached.try_acquire():
+                        held = cached
+                        limiter.release()
+                await send(message)
+
+            app_send = send_reclassified
+        try:
+            await self.app(scope, receive, app_send)
+        finally:
+            if held is not None:
+                held.release()
+
+    @staticmethod
+    async def _reject(send: Send, status_code: int, detail: str, retry_after: float) -> None:
+        body = detail.encode()
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [
+                (b"content-type", b"text/plain; charset=utf-8"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", admission.retry_after(retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+@tracing.traced_middleware
+class PrerenderMiddleware:
+    """Answer anonymous GETs of ``/`` and ``/course/{id}`` from prerendered files.
+
+    A request without a ``user_id`` cookie gets the page written by
+    ``core.prerender`` when one exists, through the static file layer (so
+    conditional requests get a 304), before auth, admission or any router
+    runs. Everything else passes through.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self.files = PrerenderedFiles(directory=settings.prerender_dir, check_dir=False)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD") or self._signed_in(scope):
+            await self.app(scope, receive, send)
+            return
+
+        relative = prerender.lookup(scope["path"])
+        if relative is None:
+            await self.app(scope, receive, send)
+            return
+
+        scope["prerendered"] = "/" if relative == prerender.HOME else "/course/{course_id}"
+        await self.files({**scope, "path": "/" + relative, "root_path": ""}, receive, send)
+
+    @staticmethod
+    def _signed_in(scope: Scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == b"cookie" and b"user_id=" in value:
+                return True
+        return False
+
+
+class RequestLogMiddleware:
+    """Give every request an id and log one access line when it finishes.
+
+    The id is the client's ``X-Request-ID`` when it sends a sane one, else a
+    fresh one; it is echoed in the response and attached to every record
+    logged while the request runs (see ``core.log``). Outermost, so requests
+    answered by the prerender or admission layers are logged too.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        supplied = next((v for k, v in scope["headers"] if k == log.REQUEST_ID_HEADER), None)
+        request_id = log.new_request_id(supplied)
+        token = log.request_id.set(request_id)
+        root_path = scope.get("root_path", "")
+        status_code = 500
+        start = perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [
+                    *message.get("headers", ()), (log.REQUEST_ID_HEADER, request_id.encode())
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if settings.log_requests:
+                client = scope.get("client")
+                log.access_logger.log(
+                    logging.ERROR if status_code >= 500 else logging.INFO,
+                    "%s %s %d", scope["method"], scope["path"], status_code,
+                    extra={
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "route": route_template(scope, root_path),
+                        "status": status_code,
+                        "duration_ms": round((perf_counter() - start) * 1000, 2),
+                        "client": client[0] if client else None,
+                    },
+                )
+            log.request_id.reset(token)
+
+
+class TracingMiddleware:
+    """Trace each request (see ``core.tracing``).
+
+    Continues the caller's ``traceparent`` and returns one for the root span
+    of this request. Sits inside ``RequestLogMiddleware``, so the root span
+    carries the request id.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        supplied = next((v for k, v in scope["headers"] if k == tracing.TRACEPARENT_HEADER), None)
+        root = tracing.start_trace(
+            supplied,
+            f"{scope['method']} {scope['path']}",
+            **{"http.method": scope["method"], "http.target": scope["path"], "request.id": log.request_id.get()},
+        )
+        root_path = scope.get("root_path", "")
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [
+                    *message.get("headers", ()),
+                    (tracing.TRACEPARENT_HEADER, tracing.traceparent().encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = route_template(scope, root_path)
+            root.name = f"{scope['method']} {route}"
+            root.attributes["http.route"] = route
+            root.attributes["http.status_code"] = status_code
+            tracing.finish_trace(root, error=status_code >= 500)
@@ -2,5 +2,14 @@ from models.user import User
 from models.course import Course
 from models.enrollment import Enrollment
 from models.lesson import Lesson
+from models.job import Job
+from models.checkpoint import Checkpoint
+from models.recommendation import CourseCooccurrence, CourseRecommendation
+from models.progress import ProgressEvent
+from models.rollup import CategoryWeeklyStats, CourseDailyStats
 
-__all__ = ["User", "Course", "Enrollment", "Lesson"]
\ No newline at end of file
+__all__ = [
+    "User", "Course", "Enrollment", "Lesson", "Job",
+    "Checkpoint", "CourseCooccurrence", "CourseRecommendation",
+    "ProgressEvent", "CourseDailyStats", "CategoryWeeklyStats",
+]
\ No newline at end of file
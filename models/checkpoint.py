@@ -0,0 +1,23 @@
+from datetime import UTC, datetime
+
+from sqlalchemy import BigInteger, DateTime, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from database import Base
+
+
+class Checkpoint(Base):
+    """Named high-water mark for incremental jobs (e.g. last processed rowid)."""
+
+    __tablename__ = "checkpoints"
+
+    name: Mapped[str] = mapped_column(String(100), primary_key=True)
+    value: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(UTC),
+        onupdate=lambda: datetime.now(UTC),
+    )
+
+    def __repr__(self) -> str:
+        return f"<Checkpoint {self.name}={self.value}>"
@@ -4,7 +4,7 @@ import uuid
 from datetime import UTC, datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import DateTime, Integer, String, Text
+from sqlalchemy import JSON, DateTime, Index, Integer, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from database import Base
@@ -17,14 +17,24 @@ if TYPE_CHECKING:
 class Course(Base):
     __tablename__ = "courses"
 
+    __table_args__ = (
+        Index("ix_courses_created_at", "created_at", "id"),
+    )
+
     id: Mapped[str] = mapped_column(
         String(36), primary_key=True, default=lambda: str(uuid.uuid4())
     )
     title: Mapped[str] = mapped_column(String(200), nullable=False)
     description: Mapped[str | None] = mapped_column(Text, nullable=True)
-    youtube_playlist_id: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    youtube_playlist_id: Mapped[str | None] = mapped_column(
+        String(64), index=True, nullable=True
+    )
     thumbnail_url: Mapped[str | None] = mapped_column(String(500), nullable=True)
+    # Locally generated WebP variants: [{"width": 320, "path": "thumbs/<id>/<digest>-320.webp"}, ...]
+    thumbnail_variants: Mapped[list[dict] | None] = mapped_column(JSON, nullable=True)
     category: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    # Programming language the course is taught in ("C", "Python", ...)
+    language: Mapped[str | None] = mapped_column(String(50), nullable=True)
     lesson_count: Mapped[int] = mapped_column(Integer, default=0)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), default=lambda: datetime.now(UTC)
@@ -35,10 +45,14 @@ class Course(Base):
         onupdate=lambda: datetime.now(UTC),
     )
 
-    # Relationships
-    enrollments: Mapped[list["Enrollment"]] = relationship(back_populates="course")
+    # Relationships — children are removed by ON DELETE CASCADE in the
+    # database; passive_deletes keeps the ORM from loading them first.
+    enrollments: Mapped[list["Enrollment"]] = relationship(
+        back_populates="course", cascade="all, delete-orphan", passive_deletes=True
+    )
     lessons: Mapped[list["Lesson"]] = relationship(
-        back_populates="course", order_by="Lesson.position"
+        back_populates="course", order_by="Lesson.position",
+        cascade="all, delete-orphan", passive_deletes=True,
     )
 
     def __repr__(self) -> str:
@@ -4,7 +4,7 @@ import uuid
 from datetime import UTC, datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import DateTime, ForeignKey, String, UniqueConstraint
+from sqlalchemy import DateTime, ForeignKey, Index, String, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from database import Base
@@ -18,16 +18,19 @@ class Enrollment(Base):
 
     __table_args__ = (
         UniqueConstraint("user_id", "course_id", name="uq_user_course"),
+        Index("ix_enrollments_enrolled_at", "enrolled_at", "id"),
+        # uq_user_course leads with user_id; a course's learners need their own.
+        Index("ix_enrollments_course_id", "course_id"),
     )
 
     id: Mapped[str] = mapped_column(
         String(36), primary_key=True, default=lambda: str(uuid.uuid4())
     )
     user_id: Mapped[str] = mapped_column(
-        String(36), ForeignKey("users.id"), nullable=False
+        String(36), ForeignKey("users.id", ondelete="CASCADE"), nullable=False
     )
     course_id: Mapped[str] = mapped_column(
-        String(36), ForeignKey("courses.id"), nullable=False
+        String(36), ForeignKey("courses.id", ondelete="CASCADE"), nullable=False
     )
     enrolled_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), default=lambda: datetime.now(UTC)
@@ -2,29 +2,34 @@ from __future__ import annotations
 
 import uuid
 from datetime import UTC, datetime
-from typing import TYPE_CHECKING
 
-from sqlalchemy import DateTime, ForeignKey, Integer, String
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String, event, func, inspect, select, update
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from database import Base
+from models.course import Course
 
-if TYPE_CHECKING:
-    from models.course import Course
+# Lessons are ordered by sparse positions (see core.lesson_order): the n-th
+# lesson of a freshly numbered course sits at n * POSITION_GAP.
+POSITION_GAP = 1024
 
 
 class Lesson(Base):
     __tablename__ = "lessons"
 
+    __table_args__ = (
+        Index("ix_lessons_course_position", "course_id", "position", "id"),
+    )
+
     id: Mapped[str] = mapped_column(
         String(36), primary_key=True, default=lambda: str(uuid.uuid4())
     )
     title: Mapped[str] = mapped_column(String(300), nullable=False)
-    youtube_video_id: Mapped[str] = mapped_column(String(20), nullable=False)
+    youtube_video_id: Mapped[str] = mapped_column(String(20), index=True, nullable=False)
     position: Mapped[int] = mapped_column(Integer, nullable=False)
     duration_seconds: Mapped[int] = mapped_column(Integer, default=0)
     course_id: Mapped[str] = mapped_column(
-        String(36), ForeignKey("courses.id"), nullable=False
+        String(36), ForeignKey("courses.id", ondelete="CASCADE"), nullable=False
     )
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), default=lambda: datetime.now(UTC)
@@ -41,3 +46,25 @@ class Lesson(Base):
 
     def __repr__(self) -> str:
         return f"<Lesson {self.position}: {self.title}>"
+
+
+# A course page is a view of the course *and* its lessons, so lesson writes bump
+# the course's updated_at — the version used for ETags and cache invalidation —
+# and recount its denormalized lesson_count.
+@event.listens_for(Lesson, "after_insert")
+@event.listens_for(Lesson, "after_update")
+@event.listens_for(Lesson, "after_delete")
+def _touch_course(mapper, connection, target: Lesson) -> None:
+    course_ids = {target.course_id}
+    course_ids.update(inspect(target).attrs.course_id.history.deleted)
+    courses, lessons = Course.__table__, Lesson.__table__
+    connection.execute(
+        update(courses)
+        .where(courses.c.id.in_(course_ids))
+        .values(
+            updated_at=datetime.now(UTC),
+            lesson_count=select(func.count())
+            .where(lessons.c.course_id == courses.c.id)
+            .scalar_subquery(),
+        )
+    )
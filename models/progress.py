@@ -0,0 +1,43 @@
+from datetime import UTC, datetime
+
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from database import Base
+
+PROGRESS_STARTED = "started"
+PROGRESS_COMPLETED = "completed"
+
+
+class ProgressEvent(Base):
+    """Append-only log of lesson activity; rolled up by ``core.rollups``.
+
+    The integer primary key doubles as the rollup high-water mark.
+    """
+
+    __tablename__ = "progress_events"
+
+    __table_args__ = (
+        Index("ix_progress_events_user_course", "user_id", "course_id"),
+        # Cascading deletes of a course or lesson look its events up by these.
+        Index("ix_progress_events_course_id", "course_id"),
+        Index("ix_progress_events_lesson_id", "lesson_id"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    user_id: Mapped[str] = mapped_column(
+        String(36), ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
+    course_id: Mapped[str] = mapped_column(
+        String(36), ForeignKey("courses.id", ondelete="CASCADE"), nullable=False
+    )
+    lesson_id: Mapped[str] = mapped_column(
+        String(36), ForeignKey("lessons.id", ondelete="CASCADE"), nullable=False
+    )
+    event: Mapped[str] = mapped_column(String(20), nullable=False)
+    occurred_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False
+    )
+
+    def __repr__(self) -> str:
+        return f"<ProgressEvent {self.event} lesson={self.lesson_id}>"
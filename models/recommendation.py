@@ -0,0 +1,54 @@
+from datetime import UTC, datetime
+
+from sqlalchemy import DateTime, Float, ForeignKey, Index, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from database import Base
+
+
+class CourseCooccurrence(Base):
+    """Sparse course × course co-enrollment counts (both directions stored).
+
+    The diagonal row ``(c, c)`` holds the number of learners enrolled in ``c``.
+    """
+
+    __tablename__ = "course_cooccurrence"
+
+    __table_args__ = (
+        # Deleting a course cascades to the rows that name it as the other side.
+        Index("ix_course_cooccurrence_other_course_id", "other_course_id"),
+    )
+
+    course_id: Mapped[str] = mapped_column(
+        String(36), ForeignKey("courses.id", ondelete="CASCADE"), primary_key=True
+    )
+    other_course_id: Mapped[str] = mapped_column(
+        String(36), ForeignKey("courses.id", ondelete="CASCADE"), primary_key=True
+    )
+    shared: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class CourseRecommendation(Base):
+    """Precomputed top-K "learners also took" neighbours of a course."""
+
+    __tablename__ = "course_recommendations"
+
+    __table_args__ = (
+        Index("ix_course_recommendations_related_course_id", "related_course_id"),
+    )
+
+    course_id: Mapped[str] = mapped_column(
+        String(36), ForeignKey("courses.id", ondelete="CASCADE"), primary_key=True
+    )
+    rank: Mapped[int] = mapped_column(Integer, primary_key=True)
+    related_course_id: Mapped[str] = mapped_column(
+        String(36), ForeignKey("courses.id", ondelete="CASCADE"), nullable=False
+    )
+    score: Mapped[float] = mapped_column(Float, nullable=False)
+    shared: Mapped[int] = mapped_column(Integer, nullable=False)
+    computed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False
+    )
+
+    def __repr__(self) -> str:
+        return f"<CourseRecommendation {self.course_id}#{self.rank} → {self.related_course_id}>"
@@ -0,0 +1,45 @@
+from datetime import date
+
+from sqlalchemy import Date, ForeignKey, Index, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from database import Base
+
+
+class CourseDailyStats(Base):
+    """Per course, per day activity counters maintained by ``core.rollups``."""
+
+    __tablename__ = "course_daily_stats"
+
+    __table_args__ = (
+        # Dashboard range scans across all courses: WHERE day >= ?
+        Index("ix_course_daily_stats_day", "day"),
+    )
+
+    course_id: Mapped[str] = mapped_column(
+        String(36), ForeignKey("courses.id", ondelete="CASCADE"), primary_key=True
+    )
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    enrollments: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    lessons_started: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    lessons_completed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class CategoryWeeklyStats(Base):
+    """Per category, per ISO week (starting Monday) activity counters.
+
+    The category is taken from the course when the activity is rolled up;
+    uncategorised courses count under ``""``.
+    """
+
+    __tablename__ = "category_weekly_stats"
+
+    __table_args__ = (
+        Index("ix_category_weekly_stats_week_start", "week_start"),
+    )
+
+    category: Mapped[str] = mapped_column(String(100), primary_key=True)
+    week_start: Mapped[date] = mapped_column(Date, primary_key=True)
+    enrollments: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    lessons_started: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    lessons_completed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
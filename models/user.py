@@ -4,7 +4,7 @@ import uuid
 from datetime import UTC, datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import DateTime, String
+from sqlalchemy import DateTime, Index, String, func, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from database import Base
@@ -16,6 +16,13 @@ if TYPE_CHECKING:
 class User(Base):
     __tablename__ = "users"
 
+    __table_args__ = (
+        Index("ix_users_created_at", "created_at", "id"),
+        # Signup, login and the admin API match names case-insensitively.
+        Index("ix_users_username_lower", func.lower(text("username"))),
+        Index("ix_users_email_lower", func.lower(text("email"))),
+    )
+
     id: Mapped[str] = mapped_column(
         String(36), primary_key=True, default=lambda: str(uuid.uuid4())
     )
@@ -38,7 +45,9 @@ class User(Base):
     )
 
     # Relationships
-    enrollments: Mapped[list["Enrollment"]] = relationship(back_populates="user")
+    enrollments: Mapped[list["Enrollment"]] = relationship(
+        back_populates="user", cascade="all, delete-orphan", passive_deletes=True
+    )
 
     def __repr__(self) -> str:
         return f"<User {self.username}>"
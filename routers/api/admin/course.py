@@ -1,10 +1,15 @@
+import asyncio
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import func, select
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile, status
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
+from config import settings
+from core import jobs, lesson_order, tasks, thumbnails
+from core.http_cache import is_not_modified, make_etag, not_modified, validator_headers
 from database import get_db
 from models import Course
 from schemas import *
@@ -25,7 +30,7 @@ async def list_courses(
 ):
     """List all courses with pagination."""
 
-    stmt = select(Course).offset(skip).limit(limit)
+    stmt = select(Course).order_by(Course.created_at, Course.id).offset(skip).limit(limit)
     result = await db.execute(stmt)
     return result.scalars().all()
 
@@ -47,13 +52,13 @@ async def create_course(course_in: CourseCreate, db: DB):
             detail=f"Course with title '{course_in.title}' already exists",
         )
 
-    course = Course(
-        title=course_in.title,
-        description=course_in.description,
-    )
+    course = Course(**course_in.model_dump())
     db.add(course)
     await db.commit()
     await db.refresh(course)
+
+    if course.thumbnail_url:
+        await tasks.request_thumbnails(db, course.id)
     return course
 
 
@@ -64,9 +69,26 @@ async def create_course(course_in: CourseCreate, db: DB):
 async def get_course(
     course_id: str,
     db: DB,
+    request: Request,
+    response: Response,
     load_enrollments: bool = Query(default=False),
 ):
-    """Fetch a single course by ID. Optionally eager-load enrollments."""
+    """Fetch a single course by ID. Optionally eager-load enrollments.
+
+    Without enrollments the response carries an ETag from ``updated_at`` and a
+    matching ``If-None-Match`` gets a 304 without loading the row.
+    """
+
+    if not load_enrollments:
+        result = await db.execute(select(Course.updated_at).where(Course.id == course_id))
+        updated_at = result.scalar_one_or_none()
+        if updated_at is not None:
+            headers = validator_headers(
+                make_etag("course", course_id, updated_at), updated_at, public=False
+            )
+            if is_not_modified(request, headers["ETag"], updated_at):
+                return not_modified(headers)
+            response.headers.update(headers)
 
     stmt = select(Course).where(Course.id == course_id)
 
@@ -117,20 +139,82 @@ async def update_course(course_id: str, course_in: CourseUpdate, db: DB):
                 detail=f"Course with title '{update_data['title']}' already exists",
             )
 
+    thumbnail_changed = (
+        "thumbnail_url" in update_data
+        and update_data["thumbnail_url"] != course.thumbnail_url
+    )
+
     for field, value in update_data.items():
         setattr(course, field, value)
 
     await db.commit()
     await db.refresh(course)
+
+    if thumbnail_changed:
+        await tasks.request_thumbnails(db, course.id)
     return course
 
 
+# ── POST /api/admin/courses/{course_id}/thumbnail ────────────────────────────
+
+
+@router.post(
+    "/courses/{course_id}/thumbnail",
+    response_model=JobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def upload_course_thumbnail(course_id: str, db: DB, file: UploadFile = File(...)):
+    """Upload a course image; resized WebP variants are generated in the background."""
+
+    course = await db.get(Course, course_id)
+    if not course:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Course with id '{course_id}' not found",
+        )
+
+    data = await file.read(settings.thumbnail_max_source_bytes + 1)
+    if len(data) > settings.thumbnail_max_source_bytes:
+        raise HTTPException(
+            status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+            detail="Thumbnail image is too large",
+        )
+
+    upload = await asyncio.to_thread(thumbnails.save_upload, course_id, data)
+    return await tasks.request_thumbnails(db, course_id, upload=upload)
+
+
+# ── POST /api/admin/courses/{course_id}/lessons/reorder ──────────────────────
+
+
+@router.post("/courses/{course_id}/lessons/reorder", response_model=list[LessonResponse])
+async def reorder_lessons(course_id: str, body: LessonReorder, db: DB):
+    """Move lessons, as a block and in the given order, right after ``after_id``
+    (or to the front). Only the moved lessons are rewritten."""
+
+    if await db.get(Course, course_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Course with id '{course_id}' not found",
+        )
+
+    try:
+        moved, crowded = await lesson_order.move(db, course_id, body.lesson_ids, body.after_id)
+    except lesson_order.ReorderError as exc:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_CONTENT, detail=str(exc))
+    await db.commit()
+
+    if crowded:
+        await tasks.request_rebalance(db, course_id)
+    return moved
+
+
 # ── DELETE /api/admin/courses/{course_id} ────────────────────────────────────
 
 
 @router.delete("/courses/{course_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_course(course_id: str, db: DB):
-    """Delete a course by ID."""
+async def delete_course(course_id: str, db: DB, defer: bool = Query(default=False)):
+    """Delete a course by ID. With ``defer=true`` the delete runs as a background job (202)."""
 
     result = await db.execute(select(Course).where(Course.id == course_id))
     course = result.scalars().first()
@@ -141,5 +225,41 @@ async def delete_course(course_id: str, db: DB):
             detail=f"Course with id '{course_id}' not found",
         )
 
+    if defer:
+        job = await jobs.enqueue(
+            db,
+            tasks.DELETE_COURSE,
+            {"course_id": course_id},
+            dedup_key=f"{tasks.DELETE_COURSE}:{course_id}",
+        )
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content=JobResponse.model_validate(job).model_dump(mode="json"),
+        )
+
     await db.delete(course)
     await db.commit()
+    await asyncio.to_thread(thumbnails.remove_variants, course_id)
+
+
+# ── POST /api/admin/courses/bulk-delete ──────────────────────────────────────
+
+
+@router.post("/courses/bulk-delete", response_model=BulkDeleteResponse)
+async def bulk_delete_courses(body: BulkDelete, db: DB):
+    """Delete many courses in one statement; the database cascades to lessons,
+    enrollments, progress, recommendations and rollups."""
+
+    ids = set(body.ids)
+    result = await db.execute(
+        delete(Course)
+        .where(Course.id.in_(ids))
+        .returning(Course.id)
+        .execution_options(synchronize_session=False)
+    )
+    deleted = result.scalars().all()
+    await db.commit()
+
+    for course_id in deleted:
+        await asyncio.to_thread(thumbnails.remove_variants, course_id)
+    return BulkDeleteResponse(requested=len(ids), deleted=len(deleted))
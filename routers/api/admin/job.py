@@ -0,0 +1,75 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core import jobs
+from database import get_db
+from models import Job
+from schemas import *
+
+router = APIRouter(prefix="/api/admin", tags=["admin - jobs"])
+
+DB = Annotated[AsyncSession, Depends(get_db)]
+
+
+# ── POST /api/admin/jobs ─────────────────────────────────────────────────────
+
+
+@router.post("/jobs", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def enqueue_job(job_in: JobCreate, db: DB):
+    """Enqueue a background job. Returns the existing job for a live dedup key."""
+
+    try:
+        return await jobs.enqueue(
+            db,
+            job_in.kind,
+            job_in.payload,
+            dedup_key=job_in.dedup_key,
+            delay=job_in.delay_seconds,
+        )
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail=f"{exc}. Known kinds: {', '.join(jobs.registered_kinds())}",
+        )
+
+
+# ── GET /api/admin/jobs ──────────────────────────────────────────────────────
+
+
+@router.get("/jobs", response_model=list[JobResponse])
+async def list_jobs(
+    db: DB,
+    status_filter: str | None = Query(default=None, alias="status"),
+    kind: str | None = Query(default=None),
+    skip: int = Query(default=0, ge=0),
+    limit: int = Query(default=100, ge=1, le=500),
+):
+    """List jobs, newest first, optionally filtered by status and kind."""
+
+    stmt = select(Job).order_by(Job.created_at.desc(), Job.id.desc()).offset(skip).limit(limit)
+    if status_filter:
+        stmt = stmt.where(Job.status == status_filter)
+    if kind:
+        stmt = stmt.where(Job.kind == kind)
+
+    result = await db.execute(stmt)
+    return result.scalars().all()
+
+
+# ── GET /api/admin/jobs/{job_id} ─────────────────────────────────────────────
+
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str, db: DB):
+    """Fetch a single job by ID."""
+
+    job = await db.get(Job, job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job with id '{job_id}' not found",
+        )
+    return job
@@ -1,11 +1,14 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import func, select
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from core.security import hash_password
+from core import jobs, tasks, writes
+from core.http_cache import is_not_modified, make_etag, not_modified, validator_headers
+from core.security import hash_password_async
 from database import get_db
 from models import User
 from schemas import *
@@ -19,40 +22,43 @@ DB = Annotated[AsyncSession, Depends(get_db)]
 
 
 @router.post("/users", response_model=UserProfile, status_code=status.HTTP_201_CREATED)
-async def create_user(user_in: UserCreate, db: DB):
+async def create_user(user_in: UserCreate):
     """Create a new user. Username and email must be unique (case-insensitive)."""
 
-    # Check username uniqueness
-    result = await db.execute(
-        select(User).where(func.lower(User.username) == user_in.username.lower())
-    )
-    if result.scalars().first():
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail=f"Username '{user_in.username}' is already taken",
+    hashed_password = await hash_password_async(user_in.password)
+
+    async def create(db: AsyncSession) -> User:
+        # Check username uniqueness
+        result = await db.execute(
+            select(User).where(func.lower(User.username) == user_in.username.lower())
         )
+        if result.scalars().first():
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Username '{user_in.username}' is already taken",
+            )
 
-    # Check email uniqueness
-    result = await db.execute(
-        select(User).where(func.lower(User.email) == user_in.email.lower())
-    )
-    if result.scalars().first():
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail=f"Email '{user_in.email}' is already registered",
+        # Check email uniqueness
+        result = await db.execute(
+            select(User).where(func.lower(User.email) == user_in.email.lower())
         )
+        if result.scalars().first():
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Email '{user_in.email}' is already registered",
+            )
 
-    user = User(
-        username=user_in.username,
-        email=user_in.email,
-        hashed_password=hash_password(user_in.password),
-        first_name=user_in.first_name,
-        last_name=user_in.last_name,
-    )
-    db.add(user)
-    await db.commit()
-    await db.refresh(user)
-    return user
+        user = User(
+            username=user_in.username,
+            email=user_in.email,
+            hashed_password=hashed_password,
+            first_name=user_in.first_name,
+            last_name=user_in.last_name,
+        )
+        db.add(user)
+        return user
+
+    return await writes.submit(create)
 
 
 # ── GET /api/admin/users/{user_id} ───────────────────────────────────────────
@@ -62,9 +68,26 @@ async def create_user(user_in: UserCreate, db: DB):
 async def get_user(
     user_id: str,
     db: DB,
+    request: Request,
+    response: Response,
     load_enrollments: bool = Query(default=False),
 ):
-    """Fetch a single user by ID. Optionally eager-load enrollments."""
+    """Fetch a single user by ID. Optionally eager-load enrollments.
+
+    Without enrollments the response carries an ETag from ``updated_at`` and a
+    matching ``If-None-Match`` gets a 304 without loading the row.
+    """
+
+    if not load_enrollments:
+        result = await db.execute(select(User.updated_at).where(User.id == user_id))
+        updated_at = result.scalar_one_or_none()
+        if updated_at is not None:
+            headers = validator_headers(
+                make_etag("user", user_id, updated_at), updated_at, public=False
+            )
+            if is_not_modified(request, headers["ETag"], updated_at):
+                return not_modified(headers)
+            response.headers.update(headers)
 
     stmt = select(User).where(User.id == user_id)
 
@@ -95,7 +118,7 @@ async def list_users(
 ):
     """List all users with pagination. Optionally eager-load enrollments."""
 
-    stmt = select(User).offset(skip).limit(limit)
+    stmt = select(User).order_by(User.created_at, User.id).offset(skip).limit(limit)
 
     if load_enrollments:
         stmt = stmt.options(selectinload(User.enrollments))
@@ -162,8 +185,8 @@ async def update_user(user_id: str, user_in: UserUpdate, db: DB):
 
 
 @router.delete("/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_user(user_id: str, db: DB):
-    """Delete a user by ID."""
+async def delete_user(user_id: str, db: DB, defer: bool = Query(default=False)):
+    """Delete a user by ID. With ``defer=true`` the delete runs as a background job (202)."""
 
     result = await db.execute(select(User).where(User.id == user_id))
     user = result.scalars().first()
@@ -174,5 +197,35 @@ async def delete_user(user_id: str, db: DB):
             detail=f"User with id '{user_id}' not found",
         )
 
+    if defer:
+        job = await jobs.enqueue(
+            db,
+            tasks.DELETE_USER,
+            {"user_id": user_id},
+            dedup_key=f"{tasks.DELETE_USER}:{user_id}",
+        )
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content=JobResponse.model_validate(job).model_dump(mode="json"),
+        )
+
     await db.delete(user)
     await db.commit()
+
+
+# ── POST /api/admin/users/bulk-delete ────────────────────────────────────────
+
+
+@router.post("/users/bulk-delete", response_model=BulkDeleteResponse)
+async def bulk_delete_users(body: BulkDelete, db: DB):
+    """Delete many users in one statement; the database cascades to their
+    enrollments and progress."""
+
+    ids = set(body.ids)
+    result = await db.execute(
+        delete(User)
+        .where(User.id.in_(ids))
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return BulkDeleteResponse(requested=len(ids), deleted=result.rowcount)
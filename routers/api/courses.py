@@ -0,0 +1,61 @@
+from typing import Annotated, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core import course_index
+from database import get_db
+from models import Course
+from schemas import *
+
+router = APIRouter(prefix="/api", tags=["courses"])
+
+DB = Annotated[AsyncSession, Depends(get_db)]
+
+
+# ── GET /api/courses ─────────────────────────────────────────────────────────
+
+
+@router.get("/courses", response_model=CoursePage)
+async def list_courses(
+    db: DB,
+    category: str | None = Query(default=None, max_length=100),
+    language: str | None = Query(default=None, max_length=50),
+    sort: Literal["popular", "recent"] = Query(default=course_index.POPULAR),
+    after: str | None = Query(default=None, max_length=512),
+    limit: int = Query(default=20, ge=1, le=100),
+):
+    """Browse the catalog: filter, sort, page forward with ``after``.
+
+    Filtering, ordering and the facet counts come from the per-worker
+    ``core.course_index``; only the page's rows are read, by primary key.
+    """
+    index = course_index.index
+    try:
+        cursor = course_index.decode_cursor(sort, after) if after else None
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_CONTENT, detail=str(exc))
+
+    await index.refresh(db)
+    entries, last = index.page(sort, category=category, language=language, after=cursor, limit=limit)
+    total, categories, languages = index.facets(category, language)
+
+    courses = {}
+    if entries:
+        result = await db.execute(select(Course).where(Course.id.in_([e.id for e in entries])))
+        courses = {course.id: course for course in result.scalars()}
+    items = []
+    for entry in entries:
+        course = courses.get(entry.id)
+        if course is None:
+            continue  # deleted since the index last heard; gone on the next read
+        item = CourseSummary.model_validate(course)
+        item.enrollment_count = entry.enrollments
+        items.append(item)
+    return CoursePage(
+        items=items,
+        total=total,
+        facets=CourseFacets(category=categories, language=languages),
+        next_cursor=course_index.encode_cursor(sort, last) if last else None,
+    )
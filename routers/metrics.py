@@ -0,0 +1,18 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from core import metrics
+
+router = APIRouter(tags=["metrics"])
+
+
+# ── GET /metrics ──────────────────────────────────────────────────────────────
+
+
+@router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Expose in-process counters and histograms in Prometheus text format."""
+    return PlainTextResponse(
+        metrics.render_latest(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
@@ -1,16 +1,19 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, Request, status
-from fastapi.templating import Jinja2Templates
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import RedirectResponse
+from sqlalchemy import exists, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
+from core import writes
+from core.catalog import load_course_page
+from core.http_cache import is_not_modified, make_etag, not_modified, validator_headers
+from core.templating import templates
 from database import get_db
-from models import Course, Lesson
+from models import Course, CourseRecommendation, Enrollment, Lesson, ProgressEvent
+from schemas import ProgressCreate
 
 router = APIRouter(tags=["web-courses"])
-templates = Jinja2Templates(directory="templates")
 
 DB = Annotated[AsyncSession, Depends(get_db)]
 
@@ -20,18 +23,39 @@ async def course_page(course_id: str, request: Request, db: DB, v: str | None =
     """
     Render the course detail page.
     Optional query param `v` selects a specific video by youtube_video_id.
+    Answers 304 from a single ``updated_at`` lookup when the client is current.
     """
+    recommended_at = (
+        select(func.max(CourseRecommendation.computed_at))
+        .where(CourseRecommendation.course_id == course_id)
+        .scalar_subquery()
+    )
+    user = request.state.user
+    enrolled = (
+        exists().where(Enrollment.course_id == course_id, Enrollment.user_id == user.id)
+        if user
+        else None
+    )
     result = await db.execute(
-        select(Course)
-        .where(Course.id == course_id)
-        .options(selectinload(Course.lessons))
+        select(Course.updated_at, recommended_at, enrolled).where(Course.id == course_id)
     )
-    course = result.scalars().first()
-
-    if not course or not course.lessons:
+    row = result.one_or_none()
+    if row is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Course not found")
+    updated_at, recommended_at, is_enrolled = row
+
+    etag = make_etag(
+        "course", course_id, updated_at, recommended_at,
+        user and user.id, user and user.updated_at, is_enrolled,
+    )
+    headers = validator_headers(etag, updated_at, public=user is None)
+    if is_not_modified(request, etag, updated_at):
+        return not_modified(headers)
 
-    lessons = sorted(course.lessons, key=lambda l: l.position)
+    page = await load_course_page(db, course_id)
+    if page is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Course not found")
+    course, lessons, related_courses = page
 
     if v:
         active_lesson = next((l for l in lessons if l.youtube_video_id == v), lessons[0])
@@ -47,5 +71,57 @@ async def course_page(course_id: str, request: Request, db: DB, v: str | None =
             "lessons": lessons,
             "active_lesson": active_lesson,
             "active_video_id": active_lesson.youtube_video_id,
+            "related_courses": related_courses,
+            "is_enrolled": bool(is_enrolled),
         },
+        headers=headers,
     )
+
+
+# ── POST /course/{course_id}/enroll ───────────────────────────────────────────
+
+
+@router.post("/course/{course_id}/enroll")
+async def enroll(course_id: str, request: Request):
+    """Enroll the signed-in user (idempotent) and go back to the course page."""
+    user = request.state.user
+    if not user:
+        return RedirectResponse(url=f"/course/{course_id}", status_code=303)
+
+    async def add(db: AsyncSession) -> None:
+        if not await db.get(Course, course_id):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Course not found")
+
+        result = await db.execute(
+            select(Enrollment.id).where(Enrollment.user_id == user.id, Enrollment.course_id == course_id)
+        )
+        if result.scalar_one_or_none() is None:
+            db.add(Enrollment(user_id=user.id, course_id=course_id))
+
+    await writes.submit(add)
+    return RedirectResponse(url=f"/course/{course_id}", status_code=303)
+
+
+# ── POST /course/{course_id}/progress ─────────────────────────────────────────
+
+
+@router.post("/course/{course_id}/progress", status_code=status.HTTP_204_NO_CONTENT)
+async def record_progress(course_id: str, progress: ProgressCreate, request: Request):
+    """Append a lesson activity event for the signed-in user."""
+    user = request.state.user
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not signed in")
+
+    async def add(db: AsyncSession) -> None:
+        result = await db.execute(
+            select(Lesson.id).where(Lesson.id == progress.lesson_id, Lesson.course_id == course_id)
+        )
+        if result.scalar_one_or_none() is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lesson not found")
+
+        db.add(ProgressEvent(
+            user_id=user.id, course_id=course_id, lesson_id=progress.lesson_id, event=progress.event,
+        ))
+
+    await writes.submit(add)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -2,16 +2,16 @@ from typing import Annotated
 
 from fastapi import APIRouter, Depends, Form, HTTPException, Request, status
 from fastapi.responses import JSONResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from core.security import hash_password, verify_password
+from core import dashboard, writes
+from core.security import hash_password_async, verify_password_async
+from core.templating import templates
 from database import get_db
 from models import User
 
 router = APIRouter(tags=["web-auth"])
-templates = Jinja2Templates(directory="templates")
 
 DB = Annotated[AsyncSession, Depends(get_db)]
 
@@ -37,7 +37,6 @@ async def signup_page(request: Request):
 
 @router.post("/signup")
 async def signup(
-    db: DB,
     username: str = Form(...),
     email: str = Form(...),
     password: str = Form(...),
@@ -46,36 +45,40 @@ async def signup(
 ):
     """Create a new user with hashed password and set session cookie."""
 
-    # Check username uniqueness (case-insensitive)
-    result = await db.execute(
-        select(User).where(func.lower(User.username) == username.lower())
-    )
-    if result.scalars().first():
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail=f"Username '{username}' is already taken",
-        )
+    hashed_password = await hash_password_async(password)
 
-    # Check email uniqueness (case-insensitive)
-    result = await db.execute(
-        select(User).where(func.lower(User.email) == email.lower())
-    )
-    if result.scalars().first():
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail=f"Email '{email}' is already registered",
+    async def create(db: AsyncSession) -> User:
+        # Check username uniqueness (case-insensitive)
+        result = await db.execute(
+            select(User).where(func.lower(User.username) == username.lower())
         )
+        if result.scalars().first():
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Username '{username}' is already taken",
+            )
+
+        # Check email uniqueness (case-insensitive)
+        result = await db.execute(
+            select(User).where(func.lower(User.email) == email.lower())
+        )
+        if result.scalars().first():
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Email '{email}' is already registered",
+            )
+
+        user = User(
+            username=username,
+            email=email,
+            hashed_password=hashed_password,
+            first_name=first_name or None,
+            last_name=last_name or None,
+        )
+        db.add(user)
+        return user
 
-    new_user = User(
-        username=username,
-        email=email,
-        hashed_password=hash_password(password),
-        first_name=first_name or None,
-        last_name=last_name or None,
-    )
-    db.add(new_user)
-    await db.commit()
-    await db.refresh(new_user)
+    new_user = await writes.submit(create)
 
     response = JSONResponse(
         content={"id": new_user.id, "username": new_user.username},
@@ -101,7 +104,7 @@ async def login(
     )
     user = result.scalars().first()
 
-    if not user or not verify_password(password, user.hashed_password):
+    if not user or not await verify_password_async(password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid username or password",
@@ -129,11 +132,13 @@ async def signout():
 
 
 @router.get("/account")
-async def account_page(request: Request):
-    """Show account page. Redirect to home if not authenticated."""
+async def account_page(request: Request, db: DB):
+    """Show the learner dashboard. Redirect to home if not authenticated."""
     if not request.state.user:
         return RedirectResponse(url="/", status_code=302)
 
+    summary = await dashboard.get_summary(db, request.state.user.id)
     return templates.TemplateResponse(
-        "account.html", {"request": request, "user": request.state.user}
+        "account.html",
+        {"request": request, "user": request.state.user, "summary": summary},
     )
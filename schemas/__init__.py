@@ -2,3 +2,6 @@ from schemas.user import *
 from schemas.course import *
 from schemas.enrollment import *
 from schemas.lesson import *
+from schemas.job import *
+from schemas.progress import *
+from schemas.bulk import *
@@ -0,0 +1,17 @@
+from pydantic import BaseModel, Field
+
+
+# ── Bulk Operation Schemas ────────────────────────────────────────────────────
+
+
+class BulkDelete(BaseModel):
+    """Ids of the rows to delete in one statement."""
+
+    ids: list[str] = Field(min_length=1, max_length=1000)
+
+
+class BulkDeleteResponse(BaseModel):
+    """How many of the requested rows existed and were deleted."""
+
+    requested: int
+    deleted: int
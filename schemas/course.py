@@ -8,12 +8,20 @@ from schemas.enrollment import EnrollmentBrief
 # ── Course Schemas ────────────────────────────────────────────────────────────
 
 
+class ThumbnailVariant(BaseModel):
+    """One resized WebP rendition; *path* is relative to ``/static``."""
+
+    width: int
+    path: str
+
+
 class CourseBase(BaseModel):
     title: str = Field(min_length=1, max_length=300)
     description: str | None = Field(default=None, max_length=2000)
     youtube_playlist_id: str | None = Field(default=None, max_length=64)
     thumbnail_url: str | None = Field(default=None, max_length=500)
     category: str | None = Field(default=None, max_length=100)
+    language: str | None = Field(default=None, max_length=50)
 
 
 class CourseCreate(CourseBase):
@@ -30,6 +38,7 @@ class CourseUpdate(BaseModel):
     youtube_playlist_id: str | None = Field(default=None, max_length=64)
     thumbnail_url: str | None = Field(default=None, max_length=500)
     category: str | None = Field(default=None, max_length=100)
+    language: str | None = Field(default=None, max_length=50)
 
 
 class CourseResponse(BaseModel):
@@ -42,7 +51,9 @@ class CourseResponse(BaseModel):
     description: str | None
     youtube_playlist_id: str | None
     thumbnail_url: str | None
+    thumbnail_variants: list[ThumbnailVariant] | None = None
     category: str | None
+    language: str | None
     lesson_count: int
     created_at: datetime
     updated_at: datetime
@@ -52,3 +63,39 @@ class CourseWithUsers(CourseResponse):
     """Course response with nested enrollments."""
 
     enrollments: list[EnrollmentBrief] = []
+
+
+# ── Public catalog ────────────────────────────────────────────────────────────
+
+
+class CourseSummary(BaseModel):
+    """A course as listed by the public catalog API."""
+
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    title: str
+    description: str | None
+    thumbnail_url: str | None
+    thumbnail_variants: list[ThumbnailVariant] | None = None
+    category: str | None
+    language: str | None
+    lesson_count: int
+    enrollment_count: int = 0
+    created_at: datetime
+
+
+class CourseFacets(BaseModel):
+    """Course counts per facet value, most courses first."""
+
+    category: dict[str, int]
+    language: dict[str, int]
+
+
+class CoursePage(BaseModel):
+    """One page of the catalog; pass ``next_cursor`` as ``after`` for the next."""
+
+    items: list[CourseSummary]
+    total: int
+    facets: CourseFacets
+    next_cursor: str | None
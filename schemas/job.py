@@ -0,0 +1,36 @@
+from datetime import datetime
+from typing import Any
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+# ── Job Schemas ───────────────────────────────────────────────────────────────
+
+
+class JobCreate(BaseModel):
+    """Schema for enqueueing a background job."""
+
+    kind: str = Field(min_length=1, max_length=100)
+    payload: dict[str, Any] = Field(default_factory=dict)
+    dedup_key: str | None = Field(default=None, max_length=200)
+    delay_seconds: float = Field(default=0, ge=0, le=7 * 24 * 3600)
+
+
+class JobResponse(BaseModel):
+    """Standard job response schema."""
+
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    kind: str
+    payload: dict[str, Any]
+    status: str
+    dedup_key: str | None
+    attempts: int
+    max_attempts: int
+    run_after: datetime
+    last_error: str | None
+    result: Any | None
+    created_at: datetime
+    updated_at: datetime
+    finished_at: datetime | None
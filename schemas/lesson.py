@@ -14,6 +14,13 @@ class LessonCreate(LessonBase):
     course_id: str
 
 
+class LessonReorder(BaseModel):
+    """Lessons to place, in this order, right after ``after_id`` (null: first)."""
+
+    lesson_ids: list[str] = Field(min_length=1, max_length=500)
+    after_id: str | None = None
+
+
 class LessonResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
@@ -0,0 +1,13 @@
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
+
+# ── Progress Schemas ──────────────────────────────────────────────────────────
+
+
+class ProgressCreate(BaseModel):
+    """Lesson activity reported by the course page."""
+
+    lesson_id: str = Field(min_length=1, max_length=36)
+    event: Literal["started", "completed"] = "started"
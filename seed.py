@@ -1,11 +1,39 @@
-"""Seed the database with Neso Academy's C Programming playlist."""
+"""Seed the database: the hand-curated C course plus optional synthetic data.
 
-import asyncio
+Usage::
 
-from sqlalchemy import select
+    python seed.py                              # C Programming course only
+    python seed.py --users 2000000 --courses 20000 \
+        --lessons-per-course 60 --enrollments 5000000
 
-from database import AsyncSessionLocal, create_tables
-from models import Course, Lesson
+Synthetic rows are generated deterministically from ``--seed`` and entity
+index, so the same arguments always give the same database, and re-running
+with larger targets tops up an existing one. Users, courses and lessons are
+then exactly the rows a fresh run would have produced. Enrollments are only
+added for users who have none yet, spread over what is still needed: they
+never exceed the target but fall short when those users run out, and they
+differ from a fresh run's at the same size. Rows are written with
+chunked Core ``executemany`` inserts inside large transactions on a
+synchronous connection tuned for bulk load.
+"""
+
+import argparse
+import math
+import random
+import time
+import uuid
+from bisect import bisect
+from collections.abc import Iterable, Iterator
+from datetime import UTC, datetime, timedelta
+from itertools import accumulate
+
+from sqlalchemy import Engine, create_engine, event, func, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from config import settings
+from database import Base
+from models import Course, Enrollment, Lesson, User
+from models.lesson import POSITION_GAP
 
 NESO_C_PLAYLIST = "PLBlnK6fEyqRggZZgYpPMUxdY1CYkZtARR"
 
@@ -53,42 +81,406 @@ LESSONS = [
 ]
 
 
-async def seed():
-    await create_tables()
+# Synthetic rows are recognisable by these prefixes, which is how top-up runs
+# find where the previous run stopped.
+USER_PREFIX = "learner"
+PLAYLIST_PREFIX = "SYN"
 
-    async with AsyncSessionLocal() as session:
-        existing = await session.execute(
-            select(Course).where(Course.youtube_playlist_id == NESO_C_PLAYLIST)
-        )
-        if existing.scalars().first():
+CATEGORIES = [
+    ("Programming Languages", 40),
+    ("Data Structures", 15),
+    ("Algorithms", 15),
+    ("Operating Systems", 10),
+    ("Database Management", 10),
+    ("Computer Networks", 10),
+]
+LANGUAGES = ["C", "C++", "C#", "Python", "Java", "Go", "Rust", "JavaScript"]
+TOPICS = ["Fundamentals", "Deep Dive", "Crash Course", "Projects", "Interview Prep", "Internals"]
+
+EPOCH = datetime(2024, 1, 1, tzinfo=UTC)
+
+BULK_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=OFF",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-262144",
+    "PRAGMA mmap_size=1073741824",
+)
+
+
+# ── Bulk-load plumbing ───────────────────────────────────────────────────────
+
+
+def bulk_engine(url: str) -> Engine:
+    """Synchronous engine for *url* with PRAGMAs tuned for bulk loading."""
+    engine = create_engine(url.replace("+aiosqlite", ""))
+
+    @event.listens_for(engine, "connect")
+    def _tune(dbapi_connection, _record):
+        cursor = dbapi_connection.cursor()
+        for pragma in BULK_PRAGMAS:
+            cursor.execute(pragma)
+        cursor.close()
+
+    return engine
+
+
+def _chunks(rows: Iterable[dict], size: int) -> Iterator[list[dict]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def bulk_insert(
+    engine: Engine,
+    label: str,
+    stmt,
+    rows: Iterable[dict],
+    *,
+    chunk_size: int,
+    commit_every: int,
+) -> int:
+    """executemany *rows* in chunks, committing every *commit_every* rows."""
+    started = time.perf_counter()
+    total = since_commit = 0
+    with engine.connect() as conn:
+        conn.begin()
+        for chunk in _chunks(rows, chunk_size):
+            conn.execute(stmt, chunk)
+            total += len(chunk)
+            since_commit += len(chunk)
+            if since_commit >= commit_every:
+                conn.commit()
+                conn.begin()
+                since_commit = 0
+                _report(label, total, started, end="\r")
+        conn.commit()
+    _report(label, total, started)
+    return total
+
+
+def _report(label: str, rows: int, started: float, end: str = "\n") -> None:
+    elapsed = time.perf_counter() - started
+    rate = rows / elapsed if elapsed else 0
+    print(f"  {label:<12} {rows:>12,} rows  {elapsed:8.1f}s  {rate:>12,.0f} rows/s", end=end, flush=True)
+
+
+# ── Deterministic generators ─────────────────────────────────────────────────
+
+
+def _uuid(seed: int, kind: str, index: int | str) -> str:
+    return str(uuid.uuid5(uuid.NAMESPACE_OID, f"codeatlas:{seed}:{kind}:{index}"))
+
+
+def _username(index: int) -> str:
+    return f"{USER_PREFIX}{index:08d}"
+
+
+def _playlist_id(index: int) -> str:
+    return f"{PLAYLIST_PREFIX}{index:08d}"
+
+
+def _user_created_at(index: int) -> datetime:
+    # Spread sign-ups over ~two years without a per-row RNG.
+    return EPOCH + timedelta(seconds=(index * 7919) % (2 * 365 * 86400))
+
+
+def user_rows(seed: int, start: int, stop: int, hashed_password: str) -> Iterator[dict]:
+    for i in range(start, stop):
+        created = _user_created_at(i)
+        yield {
+            "id": _uuid(seed, "user", i),
+            "username": _username(i),
+            "email": f"{_username(i)}@example.com",
+            "hashed_password": hashed_password,
+            "first_name": None,
+            "last_name": None,
+            "created_at": created,
+            "updated_at": created,
+        }
+
+
+def _playlist_length(rng: random.Random, median: int) -> int:
+    """Log-normal playlist lengths: most near *median*, a long tail of huge ones."""
+    return max(3, min(int(rng.lognormvariate(math.log(median), 0.75)), 500))
+
+
+def course_and_lesson_rows(
+    seed: int, start: int, stop: int, median_lessons: int
+) -> tuple[list[dict], Iterator[dict]]:
+    categories = [c for c, _ in CATEGORIES]
+    weights = list(accumulate(w for _, w in CATEGORIES))
+    courses = []
+    lengths = []
+    for i in range(start, stop):
+        rng = random.Random(f"{seed}:course:{i}")
+        category = categories[bisect(weights, rng.random() * weights[-1])]
+        subject = rng.choice(LANGUAGES) if category == "Programming Languages" else category
+        created = EPOCH + timedelta(minutes=rng.randrange(2 * 365 * 24 * 60))
+        length = _playlist_length(rng, median_lessons)
+        lengths.append(length)
+        title = f"{subject} {rng.choice(TOPICS)} #{i}"
+        # Drawn last, so courses seeded before the column existed keep their other values.
+        language = subject if category == "Programming Languages" else rng.choice(LANGUAGES)
+        courses.append({
+            "id": _uuid(seed, "course", i),
+            "title": title,
+            "description": f"Synthetic {subject} course with {length} lessons.",
+            "youtube_playlist_id": _playlist_id(i),
+            "thumbnail_url": None,
+            "category": category,
+            "language": language,
+            "lesson_count": length,
+            "created_at": created,
+            "updated_at": created,
+        })
+
+    def lessons() -> Iterator[dict]:
+        for course, i, length in zip(courses, range(start, stop), lengths):
+            rng = random.Random(f"{seed}:lessons:{i}")
+            for position in range(1, length + 1):
+                yield {
+                    "id": _uuid(seed, f"lesson:{i}", position),
+                    "title": f"{course['title']} — Part {position}",
+                    "youtube_video_id": f"{rng.getrandbits(64):011x}"[:11],
+                    "position": position * POSITION_GAP,
+                    "duration_seconds": int(rng.triangular(120, 3600, 600)),
+                    "course_id": course["id"],
+                    "created_at": course["created_at"],
+                }
+
+    return courses, lessons()
+
+
+def enrollment_rows(
+    seed: int,
+    user_start: int,
+    user_stop: int,
+    course_ids: list[str],
+    needed: int,
+) -> Iterator[dict]:
+    """Enroll users in order; course popularity follows a Zipf-like curve.
+
+    The per-user mean adapts to what is still needed, so the target is reached
+    by the last user even though popular courses cause duplicate draws. Exactly
+    *needed* rows are produced unless the users run out first.
+    """
+    popularity = random.Random(f"{seed}:popularity").sample(course_ids, len(course_ids))
+    cumulative = list(accumulate(1 / (rank + 1) ** 1.1 for rank in range(len(popularity))))
+    total_weight = cumulative[-1]
+
+    produced = 0
+    for i in range(user_start, user_stop):
+        if produced >= needed:
+            return
+        rng = random.Random(f"{seed}:enroll:{i}")
+        mean = (needed - produced) / (user_stop - i)
+        wanted = min(1 + int(rng.expovariate(1 / max(mean - 1, 0.01))), len(popularity))
+        chosen: set[str] = set()
+        for _ in range(wanted * 4):
+            chosen.add(popularity[bisect(cumulative, rng.random() * total_weight)])
+            if len(chosen) >= wanted:
+                break
+        base = _user_created_at(i)
+        # Sorted: set order follows str hashing, which differs between runs.
+        for course_id in sorted(chosen):
+            if produced >= needed:
+                return
+            yield {
+                "id": _uuid(seed, f"enrollment:{i}", course_id),
+                "user_id": _uuid(seed, "user", i),
+                "course_id": course_id,
+                "enrolled_at": base + timedelta(minutes=rng.randrange(180 * 24 * 60)),
+            }
+            produced += 1
+
+
+# ── Seeding steps ────────────────────────────────────────────────────────────
+
+
+def _synthetic(column, prefix: str):
+    """Index-friendly ``column LIKE 'prefix%'``."""
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return (column >= prefix) & (column < upper)
+
+
+def _max_suffix(conn, column, prefix: str) -> int:
+    """Highest synthetic index already present (``-1`` when none)."""
+    value = conn.execute(
+        select(func.max(column)).where(_synthetic(column, prefix))
+    ).scalar()
+    return int(value[len(prefix):]) if value else -1
+
+
+def seed_c_course(engine: Engine) -> None:
+    """Insert the hand-curated Neso Academy C course if it is missing."""
+    with engine.begin() as conn:
+        exists = conn.execute(
+            select(Course.id).where(Course.youtube_playlist_id == NESO_C_PLAYLIST)
+        ).first()
+        if exists:
             print("C Programming course already seeded. Skipping.")
             return
 
-        course = Course(
-            title="C Programming",
-            description="Complete C programming course by Neso Academy covering "
+        course_id = str(uuid.uuid4())
+        now = datetime.now(UTC)
+        conn.execute(insert(Course), {
+            "id": course_id,
+            "title": "C Programming",
+            "description": "Complete C programming course by Neso Academy covering "
             "variables, data types, operators, control flow, and more.",
-            youtube_playlist_id=NESO_C_PLAYLIST,
-            category="Programming Languages",
-            lesson_count=len(LESSONS),
+            "youtube_playlist_id": NESO_C_PLAYLIST,
+            "category": "Programming Languages",
+            "language": "C",
+            "lesson_count": len(LESSONS),
+            "created_at": now,
+            "updated_at": now,
+        })
+        conn.execute(insert(Lesson), [
+            {
+                "id": str(uuid.uuid4()),
+                "title": title,
+                "youtube_video_id": video_id,
+                "position": position * POSITION_GAP,
+                "duration_seconds": duration,
+                "course_id": course_id,
+                "created_at": now,
+            }
+            for position, (video_id, title, duration) in enumerate(LESSONS, start=1)
+        ])
+        print(f"Seeded course 'C Programming' with {len(LESSONS)} lessons (id: {course_id})")
+
+
+def generate(
+    url: str,
+    *,
+    users: int = 0,
+    courses: int = 0,
+    lessons_per_course: int = 40,
+    enrollments: int = 0,
+    seed: int = 42,
+    password: str = "password123",
+    chunk_size: int = 10_000,
+    commit_every: int = 500_000,
+    include_c_course: bool = True,
+) -> None:
+    """Top the database at *url* up to the requested synthetic row counts."""
+    from core.security import hash_password
+
+    engine = bulk_engine(url)
+    Base.metadata.create_all(engine)
+    if include_c_course:
+        seed_c_course(engine)
+
+    with engine.connect() as conn:
+        users_start = _max_suffix(conn, User.username, USER_PREFIX) + 1
+        courses_start = _max_suffix(conn, Course.youtube_playlist_id, PLAYLIST_PREFIX) + 1
+        existing_enrollments = conn.execute(
+            select(func.count()).select_from(Enrollment)
+            .join(User, User.id == Enrollment.user_id)
+            .where(_synthetic(User.username, USER_PREFIX))
+        ).scalar()
+        enrolled_through = conn.execute(
+            select(func.max(User.username))
+            .join(Enrollment, Enrollment.user_id == User.id)
+            .where(_synthetic(User.username, USER_PREFIX))
+        ).scalar()
+
+    started = time.perf_counter()
+    total = 0
+    print(f"Seeding {url} (seed={seed})")
+
+    if users > users_start:
+        hashed = hash_password(password)
+        total += bulk_insert(
+            engine, "users", insert(User),
+            user_rows(seed, users_start, users, hashed),
+            chunk_size=chunk_size, commit_every=commit_every,
         )
-        session.add(course)
-        await session.flush()
-
-        for position, (video_id, title, duration) in enumerate(LESSONS, start=1):
-            session.add(
-                Lesson(
-                    title=title,
-                    youtube_video_id=video_id,
-                    position=position,
-                    duration_seconds=duration,
-                    course_id=course.id,
-                )
+
+    if courses > courses_start:
+        for block in range(courses_start, courses, 1_000):
+            course_rows, lesson_rows = course_and_lesson_rows(
+                seed, block, min(block + 1_000, courses), lessons_per_course
             )
+            total += bulk_insert(
+                engine, "courses", insert(Course), course_rows,
+                chunk_size=chunk_size, commit_every=commit_every,
+            )
+            total += bulk_insert(
+                engine, "lessons", insert(Lesson), lesson_rows,
+                chunk_size=chunk_size, commit_every=commit_every,
+            )
+
+    needed = enrollments - existing_enrollments
+    if needed > 0:
+        with engine.connect() as conn:
+            course_ids = list(conn.execute(
+                select(Course.id)
+                .where(_synthetic(Course.youtube_playlist_id, PLAYLIST_PREFIX))
+                .order_by(Course.youtube_playlist_id)
+            ).scalars())
+        user_total = max(users, users_start)
+        first_user = int(enrolled_through[len(USER_PREFIX):]) + 1 if enrolled_through else 0
+        if course_ids and first_user < user_total:
+            total += bulk_insert(
+                engine, "enrollments",
+                sqlite_insert(Enrollment).on_conflict_do_nothing(),
+                enrollment_rows(seed, first_user, user_total, course_ids, needed),
+                chunk_size=chunk_size, commit_every=commit_every,
+            )
+        else:
+            print("  enrollments  skipped: every synthetic user already has enrollments")
+
+    with engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA optimize")
+    engine.dispose()
+    # WAL is for the load only, but the journal mode is stored in the file:
+    # switch back (checkpointing and removing the -wal file) so the database
+    # is one self-contained file again, safe to copy.
+    with engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA journal_mode=DELETE")
+    engine.dispose()
+
+    elapsed = time.perf_counter() - started
+    print(f"Done: {total:,} rows in {elapsed:.1f}s ({total / elapsed if elapsed else 0:,.0f} rows/s)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Seed CodeAtlas with curated and synthetic data.")
+    parser.add_argument("--database-url", default=settings.database_url)
+    parser.add_argument("--users", type=int, default=0, help="Target number of synthetic users.")
+    parser.add_argument("--courses", type=int, default=0, help="Target number of synthetic courses.")
+    parser.add_argument("--lessons-per-course", type=int, default=40,
+                        help="Median playlist length; lengths are log-normally distributed.")
+    parser.add_argument("--enrollments", type=int, default=0,
+                        help="Target number of synthetic enrollments.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--password", default="password123",
+                        help="Password shared by every synthetic user.")
+    parser.add_argument("--chunk-size", type=int, default=10_000)
+    parser.add_argument("--commit-every", type=int, default=500_000)
+    parser.add_argument("--skip-c-course", action="store_true")
+    args = parser.parse_args()
 
-        await session.commit()
-        print(f"Seeded course '{course.title}' with {len(LESSONS)} lessons (id: {course.id})")
+    generate(
+        args.database_url,
+        users=args.users,
+        courses=args.courses,
+        lessons_per_course=args.lessons_per_course,
+        enrollments=args.enrollments,
+        seed=args.seed,
+        password=args.password,
+        chunk_size=args.chunk_size,
+        commit_every=args.commit_every,
+        include_c_course=not args.skip_c_course,
+    )
 
 
 if __name__ == "__main__":
-    asyncio.run(seed())
+    main()
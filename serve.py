@@ -0,0 +1,337 @@
+"""Production entry point: a pre-forking master with uvicorn workers.
+
+Usage::
+
+    python -m serve                          # SERVE_* settings
+    python -m serve --workers 8 --port 8000 --max-requests 20000
+
+The master imports the application once (``main``, the models, the admin,
+every template compiled) and creates the tables, then opens the listening
+socket and forks the workers. Each worker serves the shared socket with
+uvicorn, on uvloop and httptools when they are installed. Forked workers
+share the master's memory pages copy-on-write; ``gc.freeze()`` before the
+fork keeps the garbage collector from touching (and so copying) them.
+
+* A worker that exits is replaced. A worker exits on its own after about
+  ``--max-requests`` requests (with per-worker jitter so they don't all
+  restart at once), which bounds slow leaks.
+* ``SIGHUP`` reloads the code gracefully: the master checks that ``main``
+  still imports, re-executes itself on the same socket, forks new workers,
+  then lets the old ones finish their in-flight requests and exit.
+* ``SIGTERM``/``SIGINT`` shut down gracefully, giving workers
+  ``--graceful-timeout`` seconds before they are killed.
+* Every ``serve_memory_report_seconds`` the master logs each worker's
+  memory: RSS, PSS and the unique (USS) and shared parts, so the
+  copy-on-write sharing can be watched.
+
+Limits such as admission control, caches and the job dispatcher are per
+worker; size them for one worker.
+"""
+
+import argparse
+import asyncio
+import gc
+import logging
+import os
+import random
+import select
+import signal
+import socket
+import subprocess
+import sys
+import time
+import warnings
+
+from config import settings
+
+logger = logging.getLogger("codeatlas.serve")
+
+# Carried across the re-exec on SIGHUP.
+_ENV_FD = "CODEATLAS_SERVE_FD"
+_ENV_RETIRING = "CODEATLAS_SERVE_RETIRING"
+
+
+# ── Memory ───────────────────────────────────────────────────────────────────
+
+
+def memory(pid: int) -> dict[str, int] | None:
+    """RSS, PSS, USS and shared bytes of *pid* (Linux ``smaps_rollup``), or None."""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            fields = {}
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1]) * 1024
+    except OSError:
+        return None
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "uss": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+        "shared": fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+    }
+
+
+# ── Workers ──────────────────────────────────────────────────────────────────
+
+
+def _uvicorn_config(app, args: argparse.Namespace):
+    import uvicorn
+
+    try:
+        import uvloop  # noqa: F401
+        loop = "uvloop"
+    except ImportError:
+        loop = "asyncio"
+    try:
+        import httptools  # noqa: F401
+        http = "httptools"
+    except ImportError:
+        http = "h11"
+
+    max_requests = None
+    if args.max_requests:
+        max_requests = args.max_requests + random.randint(0, args.max_requests_jitter)
+    return uvicorn.Config(
+        app,
+        loop=loop,
+        http=http,
+        lifespan="on",
+        log_config=None,  # core.log is already set up
+        access_log=False,  # RequestLogMiddleware logs requests
+        server_header=False,
+        backlog=args.backlog,
+        limit_max_requests=max_requests,
+        timeout_graceful_shutdown=int(args.graceful_timeout),
+    )
+
+
+def _run_worker(app, sock: socket.socket, args: argparse.Namespace) -> None:
+    import uvicorn
+    from database import engine
+
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)  # reloads are the master's business
+    # uvicorn handles SIGTERM/SIGINT while it serves and re-raises the signal
+    # once it has shut down; ignored, that returns here so the worker can
+    # flush its logs and traces and exit 0.
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.set_wakeup_fd(-1)
+    # Never share pooled connections with the master or a sibling.
+    engine.sync_engine.dispose(close=False)
+    uvicorn.Server(_uvicorn_config(app, args)).run(sockets=[sock])
+
+
+class Master:
+    def __init__(self, app, sock: socket.socket, args: argparse.Namespace) -> None:
+        self.app = app
+        self.sock = sock
+        self.args = args
+        self.workers: set[int] = set()
+        self.retiring: set[int] = set()  # workers of the previous generation
+        self.stopping = False
+        self.kill_at: dict[int, float] = {}  # pid -> monotonic deadline
+        self._signals: list[int] = []
+        self._wakeup: tuple[int, int] | None = None
+
+    def spawn(self) -> None:
+        with warnings.catch_warnings():
+            # The log writer, the master's only other thread, is stopped for
+            # the fork (core.log); the OS may still count it as it exits.
+            warnings.filterwarnings("ignore", "This process .* is multi-threaded", DeprecationWarning)
+            pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                for fd in self._wakeup:
+                    os.close(fd)
+                _run_worker(self.app, self.sock, self.args)
+            except BaseException:
+                logger.exception("Worker %d crashed", os.getpid())
+                code = 1
+            finally:
+                from core import log, tracing
+
+                tracing._exporter.close()
+                log.shutdown()
+                os._exit(code)
+        self.workers.add(pid)
+        logger.info("Started worker %d", pid)
+
+    def run(self) -> None:
+        read_fd, write_fd = self._wakeup = os.pipe()
+        os.set_blocking(write_fd, False)
+        signal.set_wakeup_fd(write_fd)
+        for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+            signal.signal(signum, lambda signum, frame: self._signals.append(signum))
+
+        for _ in range(self.args.workers):
+            self.spawn()
+        self._retire(self.retiring)
+
+        next_report = time.monotonic() + settings.serve_memory_report_seconds
+        while self.workers or self.retiring:
+            timeout = max(0.0, min([next_report, *self.kill_at.values()]) - time.monotonic())
+            if select.select([read_fd], [], [], timeout)[0]:
+                os.read(read_fd, 512)
+            while self._signals:
+                signum = self._signals.pop(0)
+                if signum == signal.SIGHUP and not self.stopping:
+                    self.reload()
+                elif signum in (signal.SIGTERM, signal.SIGINT):
+                    self.stop()
+            self.reap()
+            self._kill_overdue()
+            if time.monotonic() >= next_report:
+                self.report()
+                next_report = time.monotonic() + settings.serve_memory_report_seconds
+        logger.info("All workers stopped")
+
+    def reap(self) -> None:
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            code = os.waitstatus_to_exitcode(status)
+            self.kill_at.pop(pid, None)
+            if pid in self.retiring:
+                self.retiring.discard(pid)
+                logger.info("Worker %d stopped (%d)", pid, code)
+            elif pid in self.workers:
+                # Recycled after max_requests (0) or crashed: replace it.
+                self.workers.discard(pid)
+                if code == 0:
+                    logger.info("Worker %d exited; starting a replacement", pid)
+                else:
+                    logger.warning("Worker %d died (%d); starting a replacement", pid, code)
+                    time.sleep(1)  # don't spin if every new worker crashes at startup
+                self.spawn()
+
+    def report(self) -> None:
+        for pid in sorted(self.workers):
+            usage = memory(pid)
+            if usage is not None:
+                logger.info(
+                    "Worker %d memory: rss %.1f MiB, pss %.1f MiB, uss %.1f MiB, shared %.1f MiB",
+                    pid, *(usage[k] / 2**20 for k in ("rss", "pss", "uss", "shared")),
+                    extra={"worker": pid, **usage},
+                )
+
+    def stop(self) -> None:
+        if self.stopping:
+            return
+        self.stopping = True
+        logger.info("Shutting down %d worker(s)", len(self.workers))
+        self._retire(self.workers | self.retiring)
+        self.retiring |= self.workers
+        self.workers.clear()
+
+    def _retire(self, pids: set[int]) -> None:
+        """Ask *pids* to finish in-flight requests and exit; kill them after the timeout."""
+        deadline = time.monotonic() + self.args.graceful_timeout + 5
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                continue
+            self.kill_at.setdefault(pid, deadline)
+
+    def _kill_overdue(self) -> None:
+        now = time.monotonic()
+        for pid, deadline in list(self.kill_at.items()):
+            if deadline <= now:
+                logger.warning("Worker %d did not stop in time; killing it", pid)
+                del self.kill_at[pid]
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+
+    def reload(self) -> None:
+        """Re-execute the master with fresh code, keeping the socket and old workers."""
+        check = subprocess.run([sys.executable, "-c", "import main"], capture_output=True)
+        if check.returncode != 0:
+            logger.error("Reload aborted: the new code does not import",
+                         extra={"stderr": check.stderr.decode(errors="replace")[-4000:]})
+            return
+        logger.info("Reloading; %d worker(s) will finish in-flight requests", len(self.workers))
+        from core import log
+
+        log.shutdown()
+        self.sock.set_inheritable(True)
+        env = {
+            **os.environ,
+            _ENV_FD: str(self.sock.fileno()),
+            _ENV_RETIRING: ",".join(map(str, self.workers | self.retiring)),
+        }
+        os.execve(sys.executable, [sys.executable, "-m", "serve", *sys.argv[1:]], env)
+
+
+# ── Startup ──────────────────────────────────────────────────────────────────
+
+
+def listen(args: argparse.Namespace) -> socket.socket:
+    inherited = os.environ.pop(_ENV_FD, None)
+    if inherited is not None:
+        sock = socket.socket(fileno=int(inherited))
+    else:
+        family = socket.AF_INET6 if ":" in args.host else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((args.host, args.port))
+        sock.listen(args.backlog)
+    sock.set_inheritable(False)
+    return sock
+
+
+def preload():
+    """Import and warm everything workers would otherwise each load on their own."""
+    import main
+    from core.templating import templates
+    from database import create_tables, engine
+
+    for name in templates.env.list_templates(extensions=["html"]):
+        templates.env.get_template(name)
+
+    async def prepare() -> None:
+        await create_tables()
+        await engine.dispose()  # no connection may cross the fork
+
+    asyncio.run(prepare())
+    # Move everything imported so far out of the collector's reach, so the
+    # workers' collections don't write to (and un-share) these pages.
+    gc.collect()
+    gc.freeze()
+    return main.app
+
+
+def cli() -> None:
+    parser = argparse.ArgumentParser(description="Serve the app with pre-forked uvicorn workers.")
+    parser.add_argument("--host", default=settings.serve_host)
+    parser.add_argument("--port", type=int, default=settings.serve_port)
+    parser.add_argument("--workers", type=int, default=settings.serve_workers or os.cpu_count() or 1)
+    parser.add_argument("--backlog", type=int, default=settings.serve_backlog)
+    parser.add_argument("--max-requests", type=int, default=settings.serve_max_requests,
+                        help="recycle a worker after about this many requests (0: never)")
+    parser.add_argument("--max-requests-jitter", type=int, default=settings.serve_max_requests_jitter)
+    parser.add_argument("--graceful-timeout", type=float, default=settings.serve_graceful_timeout)
+    args = parser.parse_args()
+
+    app = preload()
+    sock = listen(args)
+    retiring = {int(pid) for pid in os.environ.pop(_ENV_RETIRING, "").split(",") if pid}
+    host, port = sock.getsockname()[:2]
+    logger.info("Listening on %s:%d with %d worker(s)", host, port, args.workers)
+
+    master = Master(app, sock, args)
+    master.retiring = retiring
+    master.run()
+
+
+if __name__ == "__main__":
+    cli()
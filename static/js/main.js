@@ -101,6 +101,32 @@
   if (!player || !titleEl) return;
 
   const lessonItems = document.querySelectorAll(".lesson-item");
+  const lessonList = document.querySelector(".lesson-list");
+  const progressUrl = lessonList ? lessonList.dataset.progressUrl : null;
+
+  function recordProgress(lessonId, event) {
+    if (!progressUrl) return;
+    fetch(progressUrl, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ lesson_id: lessonId, event: event }),
+      keepalive: true,
+    }).catch(function () {});
+  }
+
+  // Prerendered pages always start on the first lesson; honour ?v= here.
+  const requested = new URLSearchParams(window.location.search).get("v");
+  if (requested) {
+    lessonItems.forEach(function (item) {
+      if (item.dataset.videoId !== requested || item.classList.contains("active")) return;
+      player.src = "https://www.youtube.com/embed/" + requested + "?rel=0";
+      titleEl.textContent = item.dataset.lessonTitle;
+      lessonItems.forEach(function (el) {
+        el.classList.remove("active");
+      });
+      item.classList.add("active");
+    });
+  }
 
   lessonItems.forEach(function (item) {
     item.addEventListener("click", function (e) {
@@ -117,6 +143,7 @@
       item.classList.add("active");
 
       history.replaceState(null, "", window.location.pathname + "?v=" + videoId);
+      recordProgress(item.dataset.lessonId, "started");
 
       item.scrollIntoView({ block: "nearest", behavior: "smooth" });
     });